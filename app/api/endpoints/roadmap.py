@@ -1,9 +1,16 @@
-from fastapi import APIRouter, Depends, HTTPException, Query
+import json
+from fastapi import APIRouter, Depends, HTTPException, Query, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
 from typing import Optional, Literal
 from enum import Enum
 
+from app.api.errors import http_errors
+from app.core.metrics import metrics
+from app.db.repositories import JobRepository, RoadmapRepository
+from app.models.job import JobAccepted, JobState, JobStatus
 from app.models.roadmap import PersonalRoadmap
 from app.services.roadmap_generator import RoadmapGeneratorService
+from app.services.roadmap_jobs import RoadmapJobQueue, check_callback_url, get_roadmap_jobs
 
 router = APIRouter()
 
@@ -11,25 +18,194 @@ class RoadmapFormat(str, Enum):
     WEEKLY = "weekly"
     DAILY = "daily"
 
-@router.post("/generate", response_model=PersonalRoadmap)
+@router.post(
+    "/generate",
+    response_model=PersonalRoadmap,
+    responses={202: {"model": JobAccepted, "description": "Queued as a background job"}}
+)
 async def generate_roadmap(
+    request: Request,
     persona_type: str,
     duration_months: int = 1,
     user_id: Optional[str] = None,
     format_type: RoadmapFormat = RoadmapFormat.WEEKLY,
-    roadmap_generator: RoadmapGeneratorService = Depends()
+    chunked: Optional[bool] = None,
+    background: bool = False,
+    priority: int = 0,
+    callback_url: Optional[str] = None,
+    roadmap_generator: RoadmapGeneratorService = Depends(),
+    roadmaps: RoadmapRepository = Depends(),
+    roadmap_jobs: RoadmapJobQueue = Depends(get_roadmap_jobs)
 ):
-    """Generate a personalized roadmap based on persona type"""
-    try:
+    """Generate a personalized roadmap based on persona type.
+
+    With background=true the roadmap is generated as a job: the response is
+    202 with a job id to poll, and callback_url (if given) receives the final status.
+    Job priorities are clamped to 0..ROADMAP_JOB_MAX_PRIORITY, and callbacks only
+    go to public or allowlisted hosts.
+    """
+    with http_errors():
         if duration_months < 1 or duration_months > 12:
             raise HTTPException(status_code=400, detail="Duration must be between 1 and 12 months")
+        
+        if background:
+            if callback_url:
+                try:
+                    await check_callback_url(callback_url)
+                except ValueError as e:
+                    raise HTTPException(status_code=400, detail=str(e))
+            job_id = await roadmap_jobs.submit(
+                {
+                    "persona_type": persona_type,
+                    "duration_months": duration_months,
+                    "user_id": user_id,
+                    "format_type": format_type.value,
+                    "chunked": chunked,
+                },
+                priority=priority,
+                callback_url=callback_url
+            )
+            accepted = JobAccepted(
+                job_id=job_id,
+                status=JobState.QUEUED,
+                status_url=str(request.url_for("get_roadmap_job", job_id=job_id))
+            )
+            return JSONResponse(status_code=202, content=accepted.model_dump(mode="json"))
             
         roadmap = await roadmap_generator.generate_roadmap(
             persona_type=persona_type, 
             duration_months=duration_months, 
             user_id=user_id,
-            format_type=format_type
+            format_type=format_type,
+            chunked=chunked
         )
-        return roadmap
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        # Serialized once, for both storage and the response
+        with metrics.stage("serialize"):
+            body = roadmap.model_dump_json()
+        if roadmap.user_id:
+            await roadmaps.save(roadmap, data=body)
+        return Response(content=body, media_type="application/json")
+
+@router.post("/generate/stream")
+async def stream_roadmap(
+    persona_type: str,
+    duration_months: int = 1,
+    user_id: Optional[str] = None,
+    format_type: RoadmapFormat = RoadmapFormat.WEEKLY,
+    chunked: Optional[bool] = None,
+    roadmap_generator: RoadmapGeneratorService = Depends(),
+    roadmaps: RoadmapRepository = Depends()
+):
+    """Stream a roadmap as NDJSON: header, overall goals, then each week or daily card"""
+    if duration_months < 1 or duration_months > 12:
+        raise HTTPException(status_code=400, detail="Duration must be between 1 and 12 months")
+
+    async def events():
+        # Reassemble the roadmap from the streamed pieces so it can be stored
+        roadmap = {"weeks": [], "daily_cards": [] if format_type == RoadmapFormat.DAILY else None}
+        try:
+            async for event in roadmap_generator.stream_roadmap(
+                persona_type=persona_type,
+                duration_months=duration_months,
+                user_id=user_id,
+                format_type=format_type,
+                chunked=chunked
+            ):
+                if event["type"] == "roadmap":
+                    roadmap.update(event["data"])
+                elif event["type"] == "overall_goals":
+                    roadmap["overall_goals"] = event["data"]
+                elif event["type"] == "week":
+                    roadmap["weeks"].append(event["data"])
+                elif event["type"] == "daily_card":
+                    roadmap["daily_cards"].append(event["data"])
+                with metrics.stage("serialize"):
+                    line = json.dumps(event) + "\n"
+                yield line
+            if user_id:
+                await roadmaps.save(PersonalRoadmap.model_validate(roadmap))
+            yield json.dumps({"type": "done"}) + "\n"
+        except Exception as e:
+            # Headers are already sent, so report failures in-band
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+
+@router.get("/jobs/{job_id}", response_model=JobStatus)
+async def get_roadmap_job(
+    job_id: str,
+    jobs: JobRepository = Depends()
+):
+    """Poll a background roadmap job; the roadmap is included once it is done"""
+    job = await jobs.get(job_id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found")
+    return job
+
+@router.get("/{user_id}/latest", response_model=PersonalRoadmap)
+async def get_latest_roadmap(
+    user_id: str,
+    format_type: Optional[RoadmapFormat] = None,
+    roadmaps: RoadmapRepository = Depends()
+):
+    """Return the most recent stored roadmap for a user, optionally of one format"""
+    data = await roadmaps.latest_json(user_id, format_type.value if format_type else None)
+    if data is None:
+        raise HTTPException(status_code=404, detail="No roadmap stored for this user")
+    # Stored as validated JSON, so it is served as is
+    return Response(content=data, media_type="application/json")
+
+async def _latest_roadmap(roadmaps: RoadmapRepository, user_id: str, format_type: Optional[RoadmapFormat]) -> PersonalRoadmap:
+    roadmap = await roadmaps.latest(user_id, format_type.value if format_type else None)
+    if roadmap is None:
+        raise HTTPException(status_code=404, detail="No roadmap stored for this user")
+    return roadmap
+
+async def _save_response(roadmaps: RoadmapRepository, roadmap: PersonalRoadmap) -> Response:
+    """Store a new version of a roadmap and return it, serialized once for both"""
+    with metrics.stage("serialize"):
+        body = roadmap.model_dump_json()
+    await roadmaps.save(roadmap, data=body)
+    return Response(content=body, media_type="application/json")
+
+@router.post("/{user_id}/extend", response_model=PersonalRoadmap)
+async def extend_roadmap(
+    user_id: str,
+    additional_months: int = 1,
+    format_type: Optional[RoadmapFormat] = None,
+    roadmap_generator: RoadmapGeneratorService = Depends(),
+    roadmaps: RoadmapRepository = Depends()
+):
+    """Add months to the user's latest stored roadmap, generating only the new weeks or daily cards"""
+    with http_errors():
+        roadmap = await _latest_roadmap(roadmaps, user_id, format_type)
+        if additional_months < 1 or roadmap.duration_months + additional_months > 12:
+            raise HTTPException(status_code=400, detail="Extended duration must be between 1 and 12 months")
+        
+        roadmap = await roadmap_generator.extend_roadmap(roadmap, additional_months)
+        return await _save_response(roadmaps, roadmap)
+
+@router.post("/{user_id}/regenerate", response_model=PersonalRoadmap)
+async def regenerate_roadmap(
+    user_id: str,
+    first: int,
+    last: Optional[int] = None,
+    format_type: Optional[RoadmapFormat] = None,
+    roadmap_generator: RoadmapGeneratorService = Depends(),
+    roadmaps: RoadmapRepository = Depends()
+):
+    """Regenerate part of the user's latest stored roadmap, keeping the rest.
+
+    first and last (default: first) are week numbers for a weekly roadmap and
+    day numbers, counted from the start date, for a daily one.
+    """
+    with http_errors():
+        roadmap = await _latest_roadmap(roadmaps, user_id, format_type)
+        last = first if last is None else last
+        size = roadmap_generator.range_size(roadmap)
+        if not 1 <= first <= last <= size:
+            raise HTTPException(status_code=400, detail=f"Range must be within 1 to {size}")
+        
+        roadmap = await roadmap_generator.regenerate_range(roadmap, first, last)
+        return await _save_response(roadmaps, roadmap)
@@ -1,132 +1,158 @@
-from fastapi import APIRouter, Depends, HTTPException
-from typing import List, Dict
+import json
+from fastapi import APIRouter, Depends, HTTPException, Request
+from fastapi.responses import Response, StreamingResponse
+from pydantic import ValidationError
+from typing import Any, List, Dict, Optional, Union
 
-from app.models.survey import SurveySubmission, SurveyQuestion
+from app.api.errors import http_errors
+from app.data.question_bank import question_bank
+from app.db.repositories import PersonaResultRepository
+from app.models.survey import SurveySubmission, SurveyQuestions
 from app.models.persona import PersonaResult
-from app.services.persona_detector import PersonaDetectorService
-from app.services.career_matcher import CareerMatcherService
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.services.survey_batch import SurveyBatchService
+from app.services.survey_pipeline import SurveyPipelineService
 
 router = APIRouter()
 
-@router.get("/questions", response_model=Dict[str, List[SurveyQuestion]])
-async def get_survey_questions():
-    """Retrieve the survey questions"""
-    # In a real app, these might come from a database
-    questions = [
-        SurveyQuestion(
-            id="q1",
-            text="How do you typically approach problem-solving?",
-            type="multiple_choice",
-            options=[
-                "Break it down logically step by step",
-                "Consider how it affects everyone involved",
-                "Act quickly and decisively",
-                "Explore multiple creative possibilities"
-            ]
-        ),
-        SurveyQuestion(
-            id="q2",
-            text="In a group setting, you are most likely to:",
-            type="multiple_choice",
-            options=[
-                "Lead the discussion and make decisions",
-                "Facilitate and ensure everyone is heard",
-                "Analyze and provide critical insights",
-                "Generate creative ideas and possibilities"
-            ]
-        ),
-        SurveyQuestion(
-            id="q3",
-            text="When facing a setback, your first reaction is to:",
-            type="multiple_choice",
-            options=[
-                "Analyze what went wrong and create a plan",
-                "Consider how everyone is feeling",
-                "Push harder and overcome the obstacle",
-                "Step back and look for alternative approaches"
-            ]
-        ),
-        SurveyQuestion(
-            id="q4",
-            text="What energizes you most?",
-            type="multiple_choice",
-            options=[
-                "Solving complex problems",
-                "Meaningful conversations with others",
-                "Achieving goals and getting results",
-                "Exploring new ideas and possibilities"
-            ]
-        ),
-        SurveyQuestion(
-            id="q5",
-            text="In your ideal career, what would you value most?",
-            type="multiple_choice",
-            options=[
-                "Intellectual challenge and expertise",
-                "Making a difference in people's lives",
-                "Leadership and achievement",
-                "Innovation and creativity"
-            ]
-        ),
-        SurveyQuestion(
-            id="q6",
-            text="How do you make important decisions?",
-            type="multiple_choice",
-            options=[
-                "Analyze all data and consider logical consequences",
-                "Consider how it will impact others and align with values",
-                "Make a quick decision based on what will get results",
-                "Consider multiple alternatives and follow intuition"
-            ]
-        ),
-        SurveyQuestion(
-            id="q7",
-            text="When learning something new, you prefer to:",
-            type="multiple_choice",
-            options=[
-                "Understand the underlying principles and structure",
-                "Learn alongside others in a supportive environment",
-                "Jump in and learn through trial and error",
-                "Explore connections to other concepts and possibilities"
-            ]
-        ),
-        SurveyQuestion(
-            id="q8",
-            text="What type of work environment helps you thrive?",
-            type="multiple_choice",
-            options=[
-                "Quiet, organized, and structured",
-                "Collaborative, harmonious, and supportive",
-                "Fast-paced, challenging, and results-oriented",
-                "Flexible, innovative, and open to new ideas"
-            ]
-        )
-    ]
-    return {"questions": questions}
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison, as If-None-Match requires"""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    return any(tag.strip().removeprefix("W/") == etag for tag in if_none_match.split(","))
+
+@router.get("/questions", response_model=SurveyQuestions)
+async def get_survey_questions(
+    request: Request,
+    survey: Optional[str] = None,
+    version: Optional[str] = None,
+    locale: Optional[str] = None
+):
+    """Retrieve the survey questions.
+
+    Defaults to the latest version of the default survey, in the locale
+    preferred by Accept-Language. Answers 304 when If-None-Match matches.
+    """
+    bank = question_bank.negotiate(survey, version, locale, request.headers.get("accept-language", ""))
+    if bank is None:
+        raise HTTPException(status_code=404, detail="Unknown survey, version or locale")
+
+    headers = {
+        "ETag": bank.etag,
+        "Cache-Control": f"public, max-age={settings.SURVEY_QUESTIONS_MAX_AGE}",
+        "Content-Language": bank.locale,
+        "Vary": "Accept-Language",
+    }
+    if _etag_matches(request.headers.get("if-none-match"), bank.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=bank.body, media_type="application/json", headers=headers)
+
+@router.get("/versions", response_model=List[Dict[str, str]])
+async def list_survey_versions():
+    """List the available surveys, versions and locales with their ETags"""
+    return question_bank.catalog()
 
 @router.post("/submit", response_model=PersonaResult)
 async def submit_survey(
     submission: SurveySubmission,
-    persona_detector: PersonaDetectorService = Depends(),
-    career_matcher: CareerMatcherService = Depends()
+    survey_pipeline: SurveyPipelineService = Depends(),
+    persona_results: PersonaResultRepository = Depends()
 ):
     """Submit survey answers and get persona detection results"""
-    try:
-        # Detect persona
-        persona = await persona_detector.detect_persona(submission.responses)
-        
-        # Match careers
-        careers = await career_matcher.match_careers(persona)
-        
-        # Combine results
-        result = PersonaResult(
-            user_id=submission.user_id,
-            primary_persona=persona["primary"],
-            secondary_persona=persona.get("secondary"),
-            career_matches=careers,
-            analysis=persona["analysis"]
+    with http_errors():
+        result = await survey_pipeline.submit(submission)
+        if result.user_id:
+            await persona_results.save(result)
+        with metrics.stage("serialize"):
+            body = result.model_dump_json()
+        return Response(content=body, media_type="application/json")
+
+def _parse_batch(body: bytes, content_type: str) -> List[Union[SurveySubmission, Exception]]:
+    """Read submissions from a JSON array, {"submissions": [...]} or NDJSON body.
+
+    Entries that fail to parse or validate become exceptions at their position.
+    """
+    if "ndjson" in content_type or "jsonl" in content_type:
+        raw: List[Any] = []
+        for line in body.decode("utf-8").splitlines():
+            if not line.strip():
+                continue
+            try:
+                raw.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raw.append(ValueError(f"Invalid JSON line: {e}"))
+    else:
+        try:
+            raw = json.loads(body)
+        except json.JSONDecodeError as e:
+            raise HTTPException(status_code=400, detail=f"Invalid JSON body: {e}")
+        if isinstance(raw, dict):
+            raw = raw.get("submissions")
+        if not isinstance(raw, list):
+            raise HTTPException(status_code=400, detail="Expected a list of submissions")
+
+    items = []
+    for entry in raw:
+        if isinstance(entry, Exception):
+            items.append(entry)
+            continue
+        try:
+            items.append(SurveySubmission.model_validate(entry))
+        except ValidationError as e:
+            items.append(ValueError(f"Invalid submission: {e.errors()[0]['msg']}"))
+    return items
+
+@router.post("/batch")
+async def submit_survey_batch(
+    request: Request,
+    survey_batch: SurveyBatchService = Depends(),
+    persona_results: PersonaResultRepository = Depends()
+):
+    """Score many survey submissions sent as a JSON array or NDJSON.
+
+    Streams NDJSON back: one result or error line per submission in input
+    order, interleaved with progress lines, and a final summary line.
+    """
+    items = _parse_batch(await request.body(), request.headers.get("content-type", ""))
+    if len(items) > settings.SURVEY_BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=413, detail=f"At most {settings.SURVEY_BATCH_MAX_ITEMS} submissions per batch"
         )
-        
-        return result
-    except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+
+    async def events():
+        stored = []
+        try:
+            async for event in survey_batch.stream(items):
+                if event["type"] == "result":
+                    result = event["data"]
+                    if result.user_id:
+                        stored.append(result)
+                    with metrics.stage("serialize"):
+                        event["data"] = result.model_dump(mode="json")
+                elif event["type"] == "progress" and stored:
+                    await persona_results.save_many(stored)
+                    stored = []
+                with metrics.stage("serialize"):
+                    line = json.dumps(event) + "\n"
+                yield line
+            if stored:
+                await persona_results.save_many(stored)
+        except Exception as e:
+            # Headers are already sent, so report failures in-band
+            yield json.dumps({"type": "error", "detail": str(e)}) + "\n"
+
+    return StreamingResponse(events(), media_type="application/x-ndjson")
+
+@router.get("/results/{user_id}/latest", response_model=PersonaResult)
+async def get_latest_result(
+    user_id: str,
+    persona_results: PersonaResultRepository = Depends()
+):
+    """Return the most recent stored survey result for a user"""
+    result = await persona_results.latest(user_id)
+    if result is None:
+        raise HTTPException(status_code=404, detail="No survey result stored for this user")
+    return result
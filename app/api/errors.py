@@ -0,0 +1,25 @@
+import math
+from contextlib import contextmanager
+from typing import Iterator
+
+from fastapi import HTTPException
+
+from app.utils.resilience import UpstreamError
+
+@contextmanager
+def http_errors() -> Iterator[None]:
+    """Turn errors raised by an endpoint body into HTTP errors.
+
+    HTTPExceptions pass through, an unavailable or throttled Gemini becomes
+    503 with Retry-After, and anything else becomes 500.
+    """
+    try:
+        yield
+    except HTTPException:
+        raise
+    except UpstreamError as e:
+        raise HTTPException(
+            status_code=503, detail=str(e), headers={"Retry-After": str(math.ceil(e.retry_after))}
+        )
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
@@ -15,9 +15,116 @@ class Settings(BaseSettings):
     # Gemini AI settings
     GEMINI_API_KEY: str = os.getenv("GEMINI_API_KEY", "")
     GEMINI_MODEL: str = os.getenv("GEMINI_MODEL", "gemini-1.5-flash")
+    # Model-wide output limit; each call asks for less, sized from its prompt template
+    GEMINI_MAX_OUTPUT_TOKENS: int = int(os.getenv("GEMINI_MAX_OUTPUT_TOKENS", "8192"))
+    # Per-call output cap as a multiple of the template's output estimate
+    PROMPT_OUTPUT_HEADROOM: float = float(os.getenv("PROMPT_OUTPUT_HEADROOM", "1.5"))
+    # Requests estimated to produce more output than this are generated in chunks
+    PROMPT_SINGLE_CALL_MAX_TOKENS: int = int(os.getenv("PROMPT_SINGLE_CALL_MAX_TOKENS", "3000"))
+    # Send a response schema derived from the pydantic models instead of a JSON example in the prompt
+    GEMINI_STRUCTURED_OUTPUT: bool = os.getenv("GEMINI_STRUCTURED_OUTPUT", "false").lower() == "true"
+    # "gemini" calls the API; "fake" answers offline for tests and benchmarks
+    GEMINI_BACKEND: str = os.getenv("GEMINI_BACKEND", "gemini")
+    # Append real prompt/response pairs to this JSONL file for later replay by the fake backend
+    GEMINI_RECORD_PATH: str = os.getenv("GEMINI_RECORD_PATH", "")
+    FAKE_GEMINI_LATENCY_MS: float = float(os.getenv("FAKE_GEMINI_LATENCY_MS", "800"))
+    FAKE_GEMINI_JITTER_MS: float = float(os.getenv("FAKE_GEMINI_JITTER_MS", "200"))
+    FAKE_GEMINI_ERROR_RATE: float = float(os.getenv("FAKE_GEMINI_ERROR_RATE", "0"))
+    # Share of calls rejected with a quota error (HTTP 429), as when the project runs out of quota
+    FAKE_GEMINI_THROTTLE_RATE: float = float(os.getenv("FAKE_GEMINI_THROTTLE_RATE", "0"))
+    # Share of schema-less responses given typical model formatting mistakes
+    FAKE_GEMINI_MALFORMED_RATE: float = float(os.getenv("FAKE_GEMINI_MALFORMED_RATE", "0"))
+    # Multiplies the length of synthesized text and the number of quests per week
+    FAKE_GEMINI_OUTPUT_SCALE: int = int(os.getenv("FAKE_GEMINI_OUTPUT_SCALE", "1"))
+    FAKE_GEMINI_SEED: int = int(os.getenv("FAKE_GEMINI_SEED", "0"))
+    FAKE_GEMINI_RECORDINGS: str = os.getenv("FAKE_GEMINI_RECORDINGS", "")
+    # Maximum number of Gemini calls running at once; extra calls wait in a queue
+    GEMINI_MAX_CONCURRENCY: int = int(os.getenv("GEMINI_MAX_CONCURRENCY", "8"))
+    # Client-side quota; 0 disables a limit
+    GEMINI_REQUESTS_PER_MINUTE: int = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "60"))
+    GEMINI_TOKENS_PER_MINUTE: int = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+    # Retries for quota and transient upstream errors
+    GEMINI_MAX_RETRIES: int = int(os.getenv("GEMINI_MAX_RETRIES", "3"))
+    GEMINI_RETRY_BASE_DELAY: float = float(os.getenv("GEMINI_RETRY_BASE_DELAY", "0.5"))
+    GEMINI_RETRY_MAX_DELAY: float = float(os.getenv("GEMINI_RETRY_MAX_DELAY", "8"))
+    # Circuit breaker opens after this many consecutive upstream failures
+    GEMINI_BREAKER_FAILURE_THRESHOLD: int = int(os.getenv("GEMINI_BREAKER_FAILURE_THRESHOLD", "5"))
+    GEMINI_BREAKER_RESET_SECONDS: float = float(os.getenv("GEMINI_BREAKER_RESET_SECONDS", "30"))
+    
+    # Observability: Prometheus metrics at /metrics and structured logs ("json" or "text")
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    LOG_LEVEL: str = os.getenv("LOG_LEVEL", "INFO")
+    LOG_FORMAT: str = os.getenv("LOG_FORMAT", "json")
     
     # Database settings if needed
     DATABASE_URL: str = os.getenv("DATABASE_URL", "sqlite:///./app.db")
+    DATABASE_POOL_SIZE: int = int(os.getenv("DATABASE_POOL_SIZE", "4"))
+
+    # Survey question banks: JSON files of {survey, version, locale, questions}
+    SURVEY_BANK_DIR: str = os.getenv("SURVEY_BANK_DIR", os.path.join(os.path.dirname(os.path.dirname(__file__)), "data", "surveys"))
+    SURVEY_DEFAULT: str = os.getenv("SURVEY_DEFAULT", "personality")
+    SURVEY_DEFAULT_LOCALE: str = os.getenv("SURVEY_DEFAULT_LOCALE", "en")
+    SURVEY_QUESTIONS_MAX_AGE: int = int(os.getenv("SURVEY_QUESTIONS_MAX_AGE", "3600"))
+
+    # Persona detection cache (memory LRU, optionally backed by DATABASE_URL)
+    PERSONA_CACHE_SIZE: int = int(os.getenv("PERSONA_CACHE_SIZE", "4096"))
+    PERSONA_CACHE_TTL_SECONDS: int = int(os.getenv("PERSONA_CACHE_TTL_SECONDS", "86400"))
+    PERSONA_CACHE_PERSISTENT: bool = os.getenv("PERSONA_CACHE_PERSISTENT", "false").lower() == "true"
+    # Local scoring falls back to Gemini when the top two archetypes are closer than this share
+    PERSONA_AMBIGUITY_MARGIN: float = float(os.getenv("PERSONA_AMBIGUITY_MARGIN", "0.1"))
+    # "pipelined" prefetches careers for the predicted persona; "sequential" waits for detection
+    SURVEY_PIPELINE_MODE: str = os.getenv("SURVEY_PIPELINE_MODE", "pipelined")
+    # Respondents packed into one persona or career prompt
+    PERSONA_PACK_SIZE: int = int(os.getenv("PERSONA_PACK_SIZE", "8"))
+    # Concurrent persona/career requests arriving within this window share one prompt; 0 disables
+    PROMPT_BATCH_WINDOW_MS: int = int(os.getenv("PROMPT_BATCH_WINDOW_MS", "30"))
+
+    # Bulk scoring (POST /survey/batch): unique answer sets per chunk and chunks in flight
+    SURVEY_BATCH_MAX_ITEMS: int = int(os.getenv("SURVEY_BATCH_MAX_ITEMS", "10000"))
+    SURVEY_BATCH_CHUNK_SIZE: int = int(os.getenv("SURVEY_BATCH_CHUNK_SIZE", "32"))
+    SURVEY_BATCH_CONCURRENCY: int = int(os.getenv("SURVEY_BATCH_CONCURRENCY", "4"))
+
+    # Persona -> careers memo table
+    CAREER_CACHE_SIZE: int = int(os.getenv("CAREER_CACHE_SIZE", "256"))
+    CAREER_CACHE_TTL_SECONDS: int = int(os.getenv("CAREER_CACHE_TTL_SECONDS", "86400"))
+    # Keep memoized careers in the database too, shared by worker processes and restarts
+    CAREER_CACHE_PERSISTENT: bool = os.getenv("CAREER_CACHE_PERSISTENT", "false").lower() == "true"
+    CAREER_CACHE_PREWARM: bool = os.getenv("CAREER_CACHE_PREWARM", "false").lower() == "true"
+
+    # Weekly roadmaps too large for one call (PROMPT_SINGLE_CALL_MAX_TOKENS) are generated month by month
+    ROADMAP_CHUNK_CONCURRENCY: int = int(os.getenv("ROADMAP_CHUNK_CONCURRENCY", "4"))
+    # Daily roadmaps are generated one week of cards per call, this many at a time
+    ROADMAP_DAILY_CONCURRENCY: int = int(os.getenv("ROADMAP_DAILY_CONCURRENCY", "4"))
+    # Lines of summary (weeks, or runs of days) extension and regeneration prompts see of the rest of a roadmap
+    ROADMAP_SUMMARY_MAX_ITEMS: int = int(os.getenv("ROADMAP_SUMMARY_MAX_ITEMS", "12"))
+
+    # Date-independent roadmap templates: hot ones in memory, the rest in DATABASE_URL
+    ROADMAP_TEMPLATE_CACHE_SIZE: int = int(os.getenv("ROADMAP_TEMPLATE_CACHE_SIZE", "128"))
+    ROADMAP_TEMPLATE_STORE_SIZE: int = int(os.getenv("ROADMAP_TEMPLATE_STORE_SIZE", "2048"))
+    ROADMAP_TEMPLATE_TTL_SECONDS: int = int(os.getenv("ROADMAP_TEMPLATE_TTL_SECONDS", "604800"))
+    ROADMAP_TEMPLATE_PERSISTENT: bool = os.getenv("ROADMAP_TEMPLATE_PERSISTENT", "true").lower() == "true"
+
+    # Background roadmap jobs (POST /roadmap/generate?background=true)
+    ROADMAP_JOB_WORKERS: int = int(os.getenv("ROADMAP_JOB_WORKERS", "2"))
+    ROADMAP_JOB_CALLBACK_TIMEOUT: float = float(os.getenv("ROADMAP_JOB_CALLBACK_TIMEOUT", "10"))
+    # Hosts job callbacks may be sent to (comma-separated); empty allows any host with only
+    # public addresses, so a callback_url cannot reach this server's own network
+    ROADMAP_JOB_CALLBACK_HOSTS: str = os.getenv("ROADMAP_JOB_CALLBACK_HOSTS", "")
+    # Client-supplied job priorities are clamped to 0..ROADMAP_JOB_MAX_PRIORITY
+    ROADMAP_JOB_MAX_PRIORITY: int = int(os.getenv("ROADMAP_JOB_MAX_PRIORITY", "3"))
+    # A running job's worker renews its lease every third of this; once it lapses, because the
+    # worker crashed or was recycled, any worker sharing the database reclaims the job
+    ROADMAP_JOB_LEASE_SECONDS: float = float(os.getenv("ROADMAP_JOB_LEASE_SECONDS", "60"))
+    # Requeue jobs interrupted by a restart when the app starts; gunicorn.conf.py does this
+    # once for all workers instead
+    ROADMAP_JOB_RECOVERY: bool = os.getenv("ROADMAP_JOB_RECOVERY", "true").lower() == "true"
+
+    # Multi-worker mode: a SQLite file the worker processes share for in-flight Gemini
+    # calls and rate-limit buckets; empty keeps that state per process
+    SHARED_STATE_PATH: str = os.getenv("SHARED_STATE_PATH", "")
+    # A worker holding a lease longer than this is presumed dead and another takes over
+    SHARED_LEASE_SECONDS: float = float(os.getenv("SHARED_LEASE_SECONDS", "120"))
+    SHARED_POLL_INTERVAL_MS: int = int(os.getenv("SHARED_POLL_INTERVAL_MS", "50"))
     
     class Config:
         env_file = ".env"
@@ -0,0 +1,164 @@
+import time
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from functools import wraps
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+from fastapi import Request
+
+from app.core.config import settings
+
+# Route template of the request being served, e.g. "/api/survey/submit"
+current_endpoint: ContextVar[str] = ContextVar("current_endpoint", default="background")
+
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+class Counter:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        for key, value in sorted(self._values.items()):
+            lines.append(f"{self.name}{_labels(self.label_names, key)} {value:g}")
+        return lines
+
+class Histogram:
+    def __init__(self, name: str, help_text: str, labels: Sequence[str] = (), buckets: Sequence[float] = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.label_names = tuple(labels)
+        self.buckets = tuple(sorted(buckets))
+        # label values -> [per-bucket counts..., +Inf count, sum]
+        self._series: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, **labels: str):
+        key = tuple(str(labels[name]) for name in self.label_names)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = [0] * (len(self.buckets) + 1) + [0.0]
+        for index, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[index] += 1
+                break
+        else:
+            series[len(self.buckets)] += 1
+        series[-1] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        for key, series in sorted(self._series.items()):
+            cumulative = 0
+            for bound, count in zip(self.buckets + (float("inf"),), series):
+                cumulative += count
+                le = "+Inf" if bound == float("inf") else f"{bound:g}"
+                labels = _labels(self.label_names, key, 'le="' + le + '"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+            lines.append(f"{self.name}_sum{_labels(self.label_names, key)} {series[-1]:g}")
+            lines.append(f"{self.name}_count{_labels(self.label_names, key)} {cumulative}")
+        return lines
+
+class Metrics:
+    """Process-wide counters and histograms rendered in the Prometheus text format.
+
+    Every recording method returns immediately when disabled, so call sites
+    don't need their own checks. All recording happens on the event loop.
+    """
+    def __init__(self, enabled: bool):
+        self.enabled = enabled
+        self.stage_seconds = Histogram(
+            "app_stage_seconds", "Time spent in each hot-path stage", ("endpoint", "stage")
+        )
+        self.request_seconds = Histogram(
+            "app_request_seconds", "HTTP request latency", ("endpoint", "method", "status")
+        )
+        self.llm_tokens = Counter(
+            "app_llm_tokens_total", "Prompt and output tokens sent to and received from the model", ("endpoint", "kind")
+        )
+        self.llm_calls = Counter(
+            "app_llm_calls_total", "Model calls by outcome", ("endpoint", "outcome")
+        )
+        self.llm_parses = Counter(
+            "app_llm_parses_total", "Model output parses: clean JSON, repaired or failed", ("endpoint", "outcome")
+        )
+        self.cache_requests = Counter(
+            "app_cache_requests_total", "Cache lookups by cache and result", ("endpoint", "cache", "result")
+        )
+
+    @contextmanager
+    def _stage(self, stage: str) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.stage_seconds.observe(
+                time.perf_counter() - started, endpoint=current_endpoint.get(), stage=stage
+            )
+
+    def stage(self, stage: str):
+        """Context manager timing one stage: prompt_build, llm_call, json_parse, model_build or serialize"""
+        if not self.enabled:
+            return nullcontext()
+        return self._stage(stage)
+
+    def timed(self, stage: str) -> Callable:
+        """Decorator timing every call of a synchronous function as a stage"""
+        def decorate(func: Callable) -> Callable:
+            @wraps(func)
+            def wrapper(*args, **kwargs):
+                with self.stage(stage):
+                    return func(*args, **kwargs)
+            return wrapper
+        return decorate
+
+    def record_tokens(self, prompt_tokens: int, output_tokens: int):
+        if not self.enabled:
+            return
+        endpoint = current_endpoint.get()
+        self.llm_tokens.inc(prompt_tokens, endpoint=endpoint, kind="prompt")
+        self.llm_tokens.inc(output_tokens, endpoint=endpoint, kind="output")
+
+    def record_llm_call(self, outcome: str):
+        if self.enabled:
+            self.llm_calls.inc(endpoint=current_endpoint.get(), outcome=outcome)
+
+    def record_parse(self, outcome: str):
+        if self.enabled:
+            self.llm_parses.inc(endpoint=current_endpoint.get(), outcome=outcome)
+
+    def record_cache(self, cache: str, hit: bool):
+        if self.enabled:
+            self.cache_requests.inc(endpoint=current_endpoint.get(), cache=cache, result="hit" if hit else "miss")
+
+    def record_request(self, endpoint: str, method: str, status: int, seconds: float):
+        if self.enabled:
+            self.request_seconds.observe(seconds, endpoint=endpoint, method=method, status=status)
+
+    def render(self) -> str:
+        lines = []
+        for metric in (self.request_seconds, self.stage_seconds, self.llm_calls, self.llm_parses, self.llm_tokens, self.cache_requests):
+            lines.extend(metric.render())
+        return "\n".join(lines) + "\n"
+
+metrics = Metrics(settings.METRICS_ENABLED)
+
+async def track_endpoint(request: Request):
+    """Router dependency labelling everything recorded during the request with its route"""
+    route = request.scope.get("route")
+    current_endpoint.set(getattr(route, "path", request.url.path))
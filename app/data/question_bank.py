@@ -0,0 +1,126 @@
+import glob
+import hashlib
+import json
+import os
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from app.core.config import settings
+from app.models.survey import SurveyQuestion, SurveyQuestions
+
+@dataclass(frozen=True)
+class SurveyBank:
+    """One version of a survey in one locale, with its public response already serialized"""
+    survey: str
+    version: str
+    locale: str
+    # Raw questions including each option's archetype tag, for the scorer
+    questions: List[Dict[str, Any]]
+    body: bytes
+    etag: str
+
+def load_bank(path: str) -> SurveyBank:
+    """Read and validate one question bank file"""
+    with open(path, encoding="utf-8") as file:
+        data = json.load(file)
+
+    # Validated once here; requests only ever see the serialized bytes
+    public = SurveyQuestions(
+        survey=data["survey"],
+        version=str(data["version"]),
+        locale=data["locale"],
+        questions=[
+            SurveyQuestion(
+                id=question["id"],
+                text=question["text"],
+                type=question["type"],
+                options=[option["text"] for option in question["options"]] if question.get("options") else None,
+            )
+            for question in data["questions"]
+        ],
+    )
+    body = public.model_dump_json().encode("utf-8")
+    return SurveyBank(
+        survey=public.survey,
+        version=public.version,
+        locale=public.locale,
+        questions=data["questions"],
+        body=body,
+        etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+    )
+
+def _version_key(version: str) -> Tuple:
+    return tuple((int(part), "") if part.isdigit() else (-1, part) for part in version.split("."))
+
+def _accept_languages(header: str) -> List[str]:
+    """Language tags from an Accept-Language header, most preferred first, each followed by its primary subtag"""
+    ranked = []
+    for position, entry in enumerate(header.split(",")):
+        tag, _, params = entry.strip().partition(";")
+        tag = tag.strip().lower()
+        if not tag or tag == "*":
+            continue
+        quality = 1.0
+        if params.strip().startswith("q="):
+            try:
+                quality = float(params.strip()[2:])
+            except ValueError:
+                continue
+        if quality > 0:
+            ranked.append((-quality, position, tag))
+
+    tags = []
+    for _, _, tag in sorted(ranked):
+        for candidate in (tag, tag.split("-")[0]):
+            if candidate not in tags:
+                tags.append(candidate)
+    return tags
+
+class QuestionBank:
+    """Every survey version and locale in the bank directory, keyed for lookup"""
+    def __init__(self, banks: List[SurveyBank], default_survey: str, default_locale: str):
+        self.default_survey = default_survey
+        self.default_locale = default_locale
+        self._banks: Dict[Tuple[str, str, str], SurveyBank] = {}
+        # (survey, locale) -> highest version
+        self._latest: Dict[Tuple[str, str], SurveyBank] = {}
+        for bank in sorted(banks, key=lambda bank: _version_key(bank.version)):
+            self._banks[(bank.survey, bank.version, bank.locale)] = bank
+            self._latest[(bank.survey, bank.locale)] = bank
+
+    @classmethod
+    def load(cls, directory: str) -> "QuestionBank":
+        paths = sorted(glob.glob(os.path.join(directory, "*.json")))
+        if not paths:
+            raise ValueError(f"No survey question banks found in {directory}")
+        return cls([load_bank(path) for path in paths], settings.SURVEY_DEFAULT, settings.SURVEY_DEFAULT_LOCALE)
+
+    def get(self, survey: Optional[str] = None, version: Optional[str] = None, locale: Optional[str] = None) -> Optional[SurveyBank]:
+        """A specific bank; the default survey and locale and the latest version when not given"""
+        survey = survey or self.default_survey
+        locale = (locale or self.default_locale).lower()
+        if version:
+            return self._banks.get((survey, version, locale))
+        return self._latest.get((survey, locale))
+
+    def negotiate(self, survey: Optional[str], version: Optional[str], locale: Optional[str], accept_language: str = "") -> Optional[SurveyBank]:
+        """An explicit locale must exist; otherwise the best Accept-Language match, then the default locale"""
+        candidates = [locale] if locale else _accept_languages(accept_language) + [self.default_locale]
+        for candidate in candidates:
+            bank = self.get(survey, version, candidate)
+            if bank is not None:
+                return bank
+        return None
+
+    def catalog(self) -> List[Dict[str, str]]:
+        return [
+            {"survey": bank.survey, "version": bank.version, "locale": bank.locale, "etag": bank.etag}
+            for bank in self._banks.values()
+        ]
+
+    def all_questions(self) -> List[Dict[str, Any]]:
+        """Questions of every version and locale; answer texts differ per locale, so the scorer knows them all"""
+        return [question for bank in self._banks.values() for question in bank.questions]
+
+# Loaded once at import, i.e. at startup, and immutable afterwards
+question_bank = QuestionBank.load(settings.SURVEY_BANK_DIR)
@@ -0,0 +1,69 @@
+import asyncio
+import sqlite3
+from typing import Any, Callable, Dict, List, Optional, Sequence
+
+from fastapi import Request
+
+from app.utils.cache import sqlite_path_from_url
+
+class SQLitePool:
+    """Fixed-size pool of SQLite connections driven from worker threads.
+
+    Connections use WAL journaling so readers never wait for the writer, and
+    every query runs in asyncio.to_thread to keep the event loop free. A
+    connection only returns to the pool once its thread is done with it.
+    """
+    def __init__(self, path: str, size: int = 4, busy_timeout: float = 5.0):
+        self.size = max(1, size)
+        self._connections: List[sqlite3.Connection] = []
+        self._idle: asyncio.Queue = asyncio.Queue()
+        for _ in range(self.size):
+            conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._connections.append(conn)
+            self._idle.put_nowait(conn)
+
+    async def run(self, func: Callable[..., Any], *args) -> Any:
+        """Run func(conn, *args) on a pooled connection in a worker thread"""
+        conn = await self._idle.get()
+        task = asyncio.ensure_future(asyncio.to_thread(func, conn, *args))
+        task.add_done_callback(lambda _: self._idle.put_nowait(conn))
+        return await asyncio.shield(task)
+
+    async def execute(self, sql: str, params: Sequence[Any] = ()) -> int:
+        """Run one write statement, commit and return the last inserted row id"""
+        def execute(conn: sqlite3.Connection) -> int:
+            with conn:
+                return conn.execute(sql, params).lastrowid
+        return await self.run(execute)
+
+    async def executescript(self, script: str):
+        def executescript(conn: sqlite3.Connection):
+            with conn:
+                conn.executescript(script)
+        await self.run(executescript)
+
+    async def fetchone(self, sql: str, params: Sequence[Any] = ()) -> Optional[tuple]:
+        return await self.run(lambda conn: conn.execute(sql, params).fetchone())
+
+    async def fetchall(self, sql: str, params: Sequence[Any] = ()) -> List[tuple]:
+        return await self.run(lambda conn: conn.execute(sql, params).fetchall())
+
+    def close(self):
+        for conn in self._connections:
+            conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {"size": self.size, "idle": self._idle.qsize()}
+
+def create_pool(database_url: str, size: int) -> SQLitePool:
+    path = sqlite_path_from_url(database_url)
+    if path is None:
+        raise ValueError(f"Unsupported DATABASE_URL {database_url!r}; only sqlite:/// is supported")
+    return SQLitePool(path, size)
+
+def get_db(request: Request) -> SQLitePool:
+    """Dependency returning the process-wide connection pool created in the app lifespan"""
+    return request.app.state.db
@@ -0,0 +1,276 @@
+import json
+import time
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from fastapi import Depends
+
+from app.db.pool import SQLitePool, get_db
+from app.models.job import JobState, JobStatus
+from app.models.persona import PersonaResult
+from app.models.roadmap import PersonalRoadmap
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS persona_results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    primary_type TEXT NOT NULL,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_persona_results_user_created
+    ON persona_results (user_id, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS roadmaps (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    user_id TEXT NOT NULL,
+    persona_type TEXT NOT NULL,
+    format TEXT NOT NULL,
+    duration_months INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    data TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_roadmaps_user_created
+    ON roadmaps (user_id, created_at DESC);
+CREATE INDEX IF NOT EXISTS ix_roadmaps_user_format_created
+    ON roadmaps (user_id, format, created_at DESC);
+
+CREATE TABLE IF NOT EXISTS jobs (
+    id TEXT PRIMARY KEY,
+    user_id TEXT,
+    priority INTEGER NOT NULL,
+    status TEXT NOT NULL,
+    params TEXT NOT NULL,
+    callback_url TEXT,
+    created_at REAL NOT NULL,
+    started_at REAL,
+    finished_at REAL,
+    error TEXT,
+    result TEXT,
+    lease_owner TEXT,
+    lease_expires_at REAL
+);
+CREATE INDEX IF NOT EXISTS ix_jobs_status_created
+    ON jobs (status, created_at);
+"""
+
+def _add_job_lease_columns(conn):
+    # Jobs tables created before running jobs held a lease
+    columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+    with conn:
+        if "lease_owner" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN lease_owner TEXT")
+        if "lease_expires_at" not in columns:
+            conn.execute("ALTER TABLE jobs ADD COLUMN lease_expires_at REAL")
+
+async def create_tables(pool: SQLitePool):
+    await pool.executescript(SCHEMA)
+    await pool.run(_add_job_lease_columns)
+
+class PersonaResultRepository:
+    """Stores every survey result; reads return the newest one for a user"""
+    def __init__(self, db: SQLitePool = Depends(get_db)):
+        self.db = db
+
+    async def save(self, result: PersonaResult) -> int:
+        return await self.db.execute(
+            "INSERT INTO persona_results (user_id, primary_type, created_at, data) VALUES (?, ?, ?, ?)",
+            (result.user_id, result.primary_persona.type, time.time(), result.model_dump_json()),
+        )
+
+    async def save_many(self, results: List[PersonaResult]):
+        now = time.time()
+        rows = [
+            (result.user_id, result.primary_persona.type, now, result.model_dump_json())
+            for result in results
+        ]
+        def insert(conn):
+            with conn:
+                conn.executemany(
+                    "INSERT INTO persona_results (user_id, primary_type, created_at, data) VALUES (?, ?, ?, ?)",
+                    rows,
+                )
+        await self.db.run(insert)
+
+    async def latest(self, user_id: str) -> Optional[PersonaResult]:
+        row = await self.db.fetchone(
+            "SELECT data FROM persona_results WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT 1",
+            (user_id,),
+        )
+        return PersonaResult.model_validate_json(row[0]) if row else None
+
+class RoadmapRepository:
+    """Stores every generated roadmap; reads return the newest one for a user"""
+    def __init__(self, db: SQLitePool = Depends(get_db)):
+        self.db = db
+
+    @staticmethod
+    def format_of(roadmap: PersonalRoadmap) -> str:
+        return "weekly" if roadmap.daily_cards is None else "daily"
+
+    async def save(self, roadmap: PersonalRoadmap, data: Optional[str] = None) -> int:
+        """Store a roadmap; data is its JSON when the caller has already serialized it"""
+        return await self.db.execute(
+            """
+            INSERT INTO roadmaps (user_id, persona_type, format, duration_months, created_at, data)
+            VALUES (?, ?, ?, ?, ?, ?)
+            """,
+            (
+                roadmap.user_id, roadmap.persona_type, self.format_of(roadmap),
+                roadmap.duration_months, time.time(), data or roadmap.model_dump_json(),
+            ),
+        )
+
+    async def latest(self, user_id: str, format_type: Optional[str] = None) -> Optional[PersonalRoadmap]:
+        data = await self.latest_json(user_id, format_type)
+        return PersonalRoadmap.model_validate_json(data) if data else None
+
+    async def latest_json(self, user_id: str, format_type: Optional[str] = None) -> Optional[str]:
+        """The newest roadmap as stored, for serving without a validate/serialize round trip"""
+        if format_type is None:
+            row = await self.db.fetchone(
+                "SELECT data FROM roadmaps WHERE user_id = ? ORDER BY created_at DESC, id DESC LIMIT 1",
+                (user_id,),
+            )
+        else:
+            row = await self.db.fetchone(
+                """
+                SELECT data FROM roadmaps WHERE user_id = ? AND format = ?
+                ORDER BY created_at DESC, id DESC LIMIT 1
+                """,
+                (user_id, format_type),
+            )
+        return row[0] if row else None
+
+def _timestamp(value: Optional[float]) -> Optional[datetime]:
+    return datetime.fromtimestamp(value) if value is not None else None
+
+class JobRepository:
+    """Durable record of background roadmap jobs, so queued work survives a restart"""
+    def __init__(self, db: SQLitePool = Depends(get_db)):
+        self.db = db
+
+    async def create(self, job_id: str, user_id: Optional[str], priority: int, params: Dict[str, Any], callback_url: Optional[str]):
+        await self.db.execute(
+            """
+            INSERT INTO jobs (id, user_id, priority, status, params, callback_url, created_at)
+            VALUES (?, ?, ?, ?, ?, ?, ?)
+            """,
+            (job_id, user_id, priority, JobState.QUEUED.value, json.dumps(params), callback_url, time.time()),
+        )
+
+    async def load(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Parameters needed to run a job"""
+        row = await self.db.fetchone(
+            "SELECT params, callback_url, created_at FROM jobs WHERE id = ?", (job_id,)
+        )
+        if row is None:
+            return None
+        return {"params": json.loads(row[0]), "callback_url": row[1], "created_at": row[2]}
+
+    async def requeue_interrupted(self) -> int:
+        """Mark jobs left running by a stopped process as queued again"""
+        def requeue(conn) -> int:
+            with conn:
+                return conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, started_at = NULL, lease_owner = NULL, lease_expires_at = NULL
+                    WHERE status = ?
+                    """,
+                    (JobState.QUEUED.value, JobState.RUNNING.value),
+                ).rowcount
+        return await self.db.run(requeue)
+
+    async def queued(self) -> List[tuple]:
+        """(id, user_id, priority) of queued jobs, oldest first"""
+        return await self.db.fetchall(
+            "SELECT id, user_id, priority FROM jobs WHERE status = ? ORDER BY created_at",
+            (JobState.QUEUED.value,),
+        )
+
+    async def reclaimable(self, lease_seconds: float) -> List[tuple]:
+        """(id, user_id, priority) of jobs whose worker is presumed gone, oldest first.
+
+        These are running jobs whose lease has expired, and jobs still queued
+        after lease_seconds, which the process that queued them may never run.
+        """
+        now = time.time()
+        return await self.db.fetchall(
+            """
+            SELECT id, user_id, priority FROM jobs
+            WHERE (status = ? AND COALESCE(lease_expires_at, 0) < ?) OR (status = ? AND created_at < ?)
+            ORDER BY created_at
+            """,
+            (JobState.RUNNING.value, now, JobState.QUEUED.value, now - lease_seconds),
+        )
+
+    async def claim(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """Mark a job running under owner's lease; False when another worker holds it.
+
+        A queued job can be claimed, and so can a running one whose lease has
+        expired because its worker stopped renewing it.
+        """
+        def claim(conn) -> bool:
+            now = time.time()
+            with conn:
+                return conn.execute(
+                    """
+                    UPDATE jobs SET status = ?, started_at = ?, lease_owner = ?, lease_expires_at = ?
+                    WHERE id = ? AND (status = ? OR (status = ? AND COALESCE(lease_expires_at, 0) < ?))
+                    """,
+                    (
+                        JobState.RUNNING.value, now, owner, now + lease_seconds,
+                        job_id, JobState.QUEUED.value, JobState.RUNNING.value, now,
+                    ),
+                ).rowcount == 1
+        return await self.db.run(claim)
+
+    async def renew_lease(self, job_id: str, owner: str, lease_seconds: float) -> bool:
+        """Extend owner's lease on a running job; False when the job was reclaimed or has finished"""
+        def renew(conn) -> bool:
+            with conn:
+                return conn.execute(
+                    "UPDATE jobs SET lease_expires_at = ? WHERE id = ? AND status = ? AND lease_owner = ?",
+                    (time.time() + lease_seconds, job_id, JobState.RUNNING.value, owner),
+                ).rowcount == 1
+        return await self.db.run(renew)
+
+    async def mark_done(self, job_id: str, owner: str, roadmap: PersonalRoadmap) -> bool:
+        """Record a finished job; False when owner no longer holds it, because another worker reclaimed it"""
+        return await self._finish(job_id, owner, "result", JobState.DONE, roadmap.model_dump_json())
+
+    async def mark_failed(self, job_id: str, owner: str, error: str) -> bool:
+        """Record a failed job; False when owner no longer holds it"""
+        return await self._finish(job_id, owner, "error", JobState.FAILED, error)
+
+    async def _finish(self, job_id: str, owner: str, column: str, state: JobState, value: str) -> bool:
+        def finish(conn) -> bool:
+            with conn:
+                return conn.execute(
+                    f"UPDATE jobs SET status = ?, finished_at = ?, {column} = ? "
+                    "WHERE id = ? AND status = ? AND lease_owner = ?",
+                    (state.value, time.time(), value, job_id, JobState.RUNNING.value, owner),
+                ).rowcount == 1
+        return await self.db.run(finish)
+
+    async def get(self, job_id: str) -> Optional[JobStatus]:
+        row = await self.db.fetchone(
+            """
+            SELECT id, status, user_id, priority, created_at, started_at, finished_at, error, result
+            FROM jobs WHERE id = ?
+            """,
+            (job_id,),
+        )
+        if row is None:
+            return None
+        return JobStatus(
+            job_id=row[0],
+            status=row[1],
+            user_id=row[2],
+            priority=row[3],
+            created_at=_timestamp(row[4]),
+            started_at=_timestamp(row[5]),
+            finished_at=_timestamp(row[6]),
+            error=row[7],
+            result=PersonalRoadmap.model_validate_json(row[8]) if row[8] else None,
+        )
@@ -0,0 +1,28 @@
+from pydantic import BaseModel
+from typing import Optional
+from datetime import datetime
+from enum import Enum
+
+from app.models.roadmap import PersonalRoadmap
+
+class JobState(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+class JobAccepted(BaseModel):
+    job_id: str
+    status: JobState
+    status_url: str
+
+class JobStatus(BaseModel):
+    job_id: str
+    status: JobState
+    user_id: Optional[str] = None
+    priority: int = 0
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+    error: Optional[str] = None
+    result: Optional[PersonalRoadmap] = None
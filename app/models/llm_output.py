@@ -0,0 +1,52 @@
+from pydantic import BaseModel
+from typing import List, Optional
+
+from app.models.persona import CareerMatch, PersonaType
+from app.models.roadmap import Goal, Task, WeeklyTheme
+
+# Shapes of the JSON the model is asked for, built from the API models.
+# In structured-output mode they become the Gemini response schema.
+
+class PersonaOutput(BaseModel):
+    primary: PersonaType
+    secondary: Optional[PersonaType] = None
+    analysis: str
+
+class AnalysisOutput(BaseModel):
+    analysis: str
+
+class PackedPersonaOutput(PersonaOutput):
+    id: int
+
+class PackedAnalysisOutput(AnalysisOutput):
+    id: int
+
+class PackedCareersOutput(BaseModel):
+    id: int
+    careers: List[CareerMatch]
+
+class MonthFocus(BaseModel):
+    month: int
+    focus: str
+
+class RoadmapOutlineOutput(BaseModel):
+    overall_goals: Goal
+    months: List[MonthFocus]
+
+class WeeksOutput(BaseModel):
+    weeks: List[WeeklyTheme]
+
+class WeeklyRoadmapOutput(BaseModel):
+    # Goals first, so streamed output can show them before the weeks
+    overall_goals: Goal
+    weeks: List[WeeklyTheme]
+
+class DailyCardOutput(BaseModel):
+    # The model numbers days; the service assigns the calendar dates
+    day: int
+    focus_area: str
+    tasks: List[Task]
+    reflection_prompt: str
+
+class DailyCardsOutput(BaseModel):
+    daily_cards: List[DailyCardOutput]
@@ -1,7 +1,9 @@
-from pydantic import BaseModel, Field, HttpUrl
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, GetCoreSchemaHandler, HttpUrl, WithJsonSchema
+from pydantic_core import core_schema
+from typing import Annotated, Callable, List, Optional, Dict, Any
 from datetime import date, time
 from enum import Enum
+import math
 
 class TimeSlot(str, Enum):
     MORNING = "morning"
@@ -9,14 +11,86 @@ class TimeSlot(str, Enum):
     EVENING = "evening"
     NIGHT = "night"
 
+PRIORITY_WORDS = {"highest": 1, "high": 1, "medium": 3, "normal": 3, "low": 5, "lowest": 5}
+
+# Fallback parsers for model output that the standard formats reject
+def _parse_time(value: Any) -> time:
+    """Accept "9:00", "9:00 PM" and "21:00:00" """
+    text = str(value).strip().upper()
+    meridiem = text[-2:] if text.endswith(("AM", "PM")) else None
+    if meridiem:
+        text = text[:-2].strip()
+    parts = text.split(":")
+    if not 2 <= len(parts) <= 3 or not all(part.isdigit() for part in parts):
+        raise ValueError(f"Invalid time {value!r}")
+    hour, minute = int(parts[0]), int(parts[1])
+    if meridiem and hour > 12:
+        raise ValueError(f"Invalid time {value!r}")
+    if meridiem == "PM" and hour < 12:
+        hour += 12
+    elif meridiem == "AM" and hour == 12:
+        hour = 0
+    try:
+        # Out-of-range hours, minutes and seconds are errors rather than wrapped around
+        return time(hour, minute, int(parts[2]) if len(parts) == 3 else 0)
+    except ValueError:
+        raise ValueError(f"Invalid time {value!r}")
+
+def _parse_date(value: Any) -> date:
+    """Accept a datetime string, keeping its date"""
+    return date.fromisoformat(str(value).strip()[:10])
+
+def _parse_priority(value: Any) -> int:
+    """Accept words like "high" and out-of-range or fractional numbers, clamped to 1-5"""
+    if isinstance(value, str):
+        value = PRIORITY_WORDS.get(value.strip().lower(), value)
+    try:
+        number = float(value)
+    except (TypeError, ValueError):
+        raise ValueError(f"Invalid priority {value!r}")
+    if not math.isfinite(number):
+        raise ValueError(f"Invalid priority {value!r}")
+    return min(5, max(1, round(number)))
+
+def _parse_time_slot(value: Any) -> TimeSlot:
+    return TimeSlot(str(value).strip().lower())
+
+class Lenient:
+    """Annotation validating natively first and calling fallback only for values that fail.
+
+    The common case stays inside pydantic's compiled validator, and the field
+    serializes as its plain type rather than as a union.
+    """
+    def __init__(self, fallback: Callable[[Any], Any], serialization: str):
+        self.fallback = fallback
+        self.serialization = serialization
+
+    def __get_pydantic_core_schema__(self, source: Any, handler: GetCoreSchemaHandler) -> core_schema.CoreSchema:
+        return core_schema.union_schema(
+            [handler(source), core_schema.no_info_after_validator_function(self.fallback, core_schema.any_schema())],
+            mode="left_to_right",
+            serialization=core_schema.simple_ser_schema(self.serialization),
+        )
+
+LenientTime = Annotated[time, Lenient(_parse_time, "time"), WithJsonSchema({"type": "string", "format": "time"})]
+LenientDate = Annotated[date, Lenient(_parse_date, "date"), WithJsonSchema({"type": "string", "format": "date"})]
+Priority = Annotated[
+    int, Field(ge=1, le=5), Lenient(_parse_priority, "int"),
+    WithJsonSchema({"type": "integer", "minimum": 1, "maximum": 5})
+]
+LenientTimeSlot = Annotated[
+    TimeSlot, Lenient(_parse_time_slot, "str"),
+    WithJsonSchema({"type": "string", "enum": [slot.value for slot in TimeSlot]})
+]
+
 class Task(BaseModel):
     title: str
     description: str
-    start_time: time
-    end_time: time
-    time_slot: TimeSlot
+    start_time: LenientTime
+    end_time: LenientTime
+    time_slot: LenientTimeSlot
     estimated_time: str  # e.g., "30 minutes", "1 hour"
-    priority: int = Field(..., ge=1, le=5)  # Priority from 1-5
+    priority: Priority  # Priority from 1-5
     resources: Optional[List[str]] = None  # Optional resources links
 
 class Resource(BaseModel):
@@ -40,7 +114,7 @@ class Goal(BaseModel):
     long_term: List[str]
 
 class DailyCard(BaseModel):
-    date: date
+    date: LenientDate
     focus_area: str
     tasks: List[Task] = Field(..., min_items=1, max_items=5)
     reflection_prompt: str
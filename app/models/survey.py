@@ -19,4 +19,10 @@ class SurveyResponse(BaseModel):
 
 class SurveySubmission(BaseModel):
     user_id: Optional[str] = None
-    responses: List[SurveyResponse] = Field(..., min_items=5, max_items=10)
\ No newline at end of file
+    responses: List[SurveyResponse] = Field(..., min_items=5, max_items=10)
+
+class SurveyQuestions(BaseModel):
+    survey: str
+    version: str
+    locale: str
+    questions: List[SurveyQuestion]
@@ -0,0 +1,54 @@
+from app.prompts.registry import PromptTemplate, prompts
+
+CAREERS = prompts.register(PromptTemplate(
+    "careers",
+    version="1",
+    text="""
+        Based on the following personality profile, suggest the top 5 career matches:
+
+        Primary personality type: {primary_type}
+        Description: {primary_description}
+
+        Secondary personality type: {secondary_type}
+
+        Return a JSON array with one entry per career.
+        {output_format}
+        """,
+    example="""[
+        {
+            "career": "career name",
+            "confidence": 0.92,
+            "description": "Why this career is a good match for the personality"
+        },
+        ...
+    ]""",
+    output_base=400,
+))
+
+# One unit per profile
+PACKED_CAREERS = prompts.register(PromptTemplate(
+    "packed_careers",
+    version="1",
+    text="""
+        For each of the following personality profiles, suggest the top 5 career matches:
+
+        {profiles}
+
+        Return a JSON array with one entry per profile, using the profile number as id.
+        {output_format}
+        """,
+    example="""[
+        {
+            "id": 0,
+            "careers": [
+                {
+                    "career": "career name",
+                    "confidence": 0.92,
+                    "description": "Why this career is a good match for the personality"
+                }
+            ]
+        }
+    ]""",
+    output_base=20,
+    output_per_unit=400,
+))
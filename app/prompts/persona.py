@@ -0,0 +1,103 @@
+from app.prompts.registry import PromptTemplate, prompts
+
+# Output estimates are per response, or per respondent for packed prompts
+
+PERSONA = prompts.register(PromptTemplate(
+    "persona",
+    version="3",
+    text="""
+        Based on the following survey responses, identify the person's primary personality
+        archetype (analytical, empathetic, aggressive, philosophical, etc.) and provide an analysis.
+
+        Survey Responses:
+        {responses}
+
+        Please return your answer as JSON.
+        {output_format}
+        """,
+    example="""{
+        "primary": {
+            "type": "personality type name",
+            "confidence": 0.85,
+            "description": "Description of this personality type"
+        },
+        "secondary": {
+            "type": "secondary personality type",
+            "confidence": 0.65,
+            "description": "Description of this personality type"
+        },
+        "analysis": "Detailed analysis of the person's responses and personality"
+    }""",
+    output_base=400,
+))
+
+ANALYSIS = prompts.register(PromptTemplate(
+    "analysis",
+    version="3",
+    text="""
+        A person answered a personality survey. Their primary personality archetype is
+        {primary_type} and their secondary archetype is {secondary_type}.
+        Write a detailed analysis of their responses and personality.
+
+        Survey Responses:
+        {responses}
+
+        Please return your answer as JSON.
+        {output_format}
+        """,
+    example="""{
+        "analysis": "Detailed analysis of the person's responses and personality"
+    }""",
+    output_base=300,
+))
+
+PACKED_PERSONA = prompts.register(PromptTemplate(
+    "packed_persona",
+    version="3",
+    text="""
+        Based on the following survey responses, identify each person's primary personality
+        archetype (analytical, empathetic, aggressive, philosophical, etc.) and provide an analysis.
+
+        {respondents}
+
+        Return a JSON array with one entry per respondent, using the respondent number as id.
+        {output_format}
+        """,
+    example="""[
+        {
+            "id": 0,
+            "primary": {
+                "type": "personality type name",
+                "confidence": 0.85,
+                "description": "Description of this personality type"
+            },
+            "secondary": {
+                "type": "secondary personality type",
+                "confidence": 0.65,
+                "description": "Description of this personality type"
+            },
+            "analysis": "Detailed analysis of the person's responses and personality"
+        }
+    ]""",
+    output_base=20,
+    output_per_unit=400,
+))
+
+PACKED_ANALYSIS = prompts.register(PromptTemplate(
+    "packed_analysis",
+    version="3",
+    text="""
+        Several people answered a personality survey and their archetypes are already known.
+        Write a detailed analysis of each respondent's answers and personality.
+
+        {respondents}
+
+        Return a JSON array with one entry per respondent, using the respondent number as id.
+        {output_format}
+        """,
+    example="""[
+        {"id": 0, "analysis": "Detailed analysis of the person's responses and personality"}
+    ]""",
+    output_base=20,
+    output_per_unit=300,
+))
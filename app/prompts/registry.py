@@ -0,0 +1,112 @@
+import math
+import re
+import textwrap
+from typing import Dict, Iterable, List, Optional
+
+from app.core.config import settings
+from app.utils.cache import make_cache_key
+from app.utils.resilience import estimate_tokens
+
+def minimize(text: str) -> str:
+    """Drop indentation, trailing spaces and blank lines, which are billed as tokens but carry nothing"""
+    lines = (line.strip() for line in textwrap.dedent(text).splitlines())
+    return "\n".join(line for line in lines if line)
+
+def minimize_json_example(example: str) -> str:
+    """Join a pretty-printed JSON example onto one line"""
+    return re.sub(r"\s*\n\s*", "", example.strip())
+
+class PromptTemplate:
+    """A prompt compiled once at import, with token estimates for its output.
+
+    The text is whitespace-minimized and filled with str.format. The JSON
+    example is only included for schema-less calls; structured-output calls
+    carry the shape as a response schema instead. Output is estimated as
+    output_base + output_per_unit * units, where a unit is whatever the
+    prompt scales with: weeks, days, respondents.
+    """
+    def __init__(
+        self,
+        name: str,
+        version: str,
+        text: str,
+        example: Optional[str] = None,
+        output_base: int = 0,
+        output_per_unit: int = 0,
+    ):
+        self.name = name
+        self.version = version
+        self.source_tokens = estimate_tokens(text) + estimate_tokens(example)
+        self.text = minimize(text)
+        self.example = minimize_json_example(example) if example else ""
+        self.output_base = output_base
+        self.output_per_unit = output_per_unit
+        # Changes whenever the version or the compiled text does
+        self.fingerprint = make_cache_key(name, version, self.text, self.example)[:12]
+        # Input tokens of the fixed part; the filled-in values come on top
+        self.prompt_tokens = estimate_tokens(self.text)
+        self.example_tokens = estimate_tokens(self.example)
+
+    def render(self, structured: bool = False, **values) -> str:
+        """Fill in the values; the JSON example is left out when a response schema enforces the shape"""
+        output_format = "" if structured or not self.example else "Use the following JSON structure:\n" + self.example
+        text = self.text.format(output_format=output_format, **values)
+        # Optional sections left empty would otherwise leave blank lines
+        return "\n".join(line for line in text.splitlines() if line.strip())
+
+    def output_tokens(self, units: int = 1) -> int:
+        """Estimated output tokens for a request of this many units"""
+        return self.output_base + self.output_per_unit * units
+
+    def max_output_tokens(self, units: int = 1) -> int:
+        """Output cap for a request: the estimate with headroom, within the model limit"""
+        return min(
+            settings.GEMINI_MAX_OUTPUT_TOKENS,
+            math.ceil(self.output_tokens(units) * settings.PROMPT_OUTPUT_HEADROOM),
+        )
+
+    def fits_single_call(self, units: int) -> bool:
+        """Whether a request is small enough to generate in one call rather than in chunks"""
+        return self.output_tokens(units) <= settings.PROMPT_SINGLE_CALL_MAX_TOKENS
+
+    def max_units(self) -> int:
+        """Most units whose output still fits under the model's output limit"""
+        if not self.output_per_unit:
+            return 1
+        budget = settings.GEMINI_MAX_OUTPUT_TOKENS / settings.PROMPT_OUTPUT_HEADROOM - self.output_base
+        return max(1, int(budget // self.output_per_unit))
+
+class PromptRegistry:
+    """Every prompt template by name"""
+    def __init__(self):
+        self._templates: Dict[str, PromptTemplate] = {}
+
+    def register(self, template: PromptTemplate) -> PromptTemplate:
+        if template.name in self._templates:
+            raise ValueError(f"Prompt {template.name!r} is already registered")
+        self._templates[template.name] = template
+        return template
+
+    def get(self, name: str) -> PromptTemplate:
+        return self._templates[name]
+
+    def version(self, templates: Iterable[PromptTemplate]) -> str:
+        """Combined fingerprint of some templates, for cache keys of what they generate"""
+        return make_cache_key(*(template.fingerprint for template in templates))[:12]
+
+    def catalog(self) -> List[Dict[str, object]]:
+        return [
+            {
+                "name": template.name,
+                "version": template.version,
+                "fingerprint": template.fingerprint,
+                "source_tokens": template.source_tokens,
+                "prompt_tokens": template.prompt_tokens,
+                "example_tokens": template.example_tokens,
+                "output_base": template.output_base,
+                "output_per_unit": template.output_per_unit,
+            }
+            for template in self._templates.values()
+        ]
+
+prompts = PromptRegistry()
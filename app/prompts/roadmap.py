@@ -0,0 +1,203 @@
+from app.prompts.registry import PromptTemplate, prompts
+
+# Units: weeks for WEEKLY and MONTH_WEEKS, months for OUTLINE, days for DAILY_CARDS
+
+_WEEK_EXAMPLE = """{
+    "week_number": 1,
+    "theme": "Theme for the week",
+    "quests": [
+        {
+            "task_type": "Learn/Build/Reflect/Collaborate/etc.",
+            "task_name": "Specific task name",
+            "resources": [
+                {
+                    "title": "Resource title",
+                    "link": "https://resource.link"
+                }
+            ],
+            "time_commitment": "Time needed (e.g., '1 hour/day (evening)')",
+            "activity": "Detailed description of what to do"
+        }
+    ]
+}"""
+
+_GOALS_EXAMPLE = """{
+    "short_term": ["Short term goal 1", "Short term goal 2", "Short term goal 3"],
+    "long_term": ["Long term goal 1", "Long term goal 2", "Long term goal 3"]
+}"""
+
+WEEKLY = prompts.register(PromptTemplate(
+    "roadmap_weekly",
+    version="2",
+    text="""
+        Create a personalized roadmap for someone with a {persona_type} personality type.
+        The roadmap should cover {duration_months} month(s).
+
+        Please structure the roadmap with:
+        1. Overall goals (short-term and long-term)
+        2. Weekly themes, where each week has a different focus
+        3. For each week, create 2-3 "quests" - specific learning tasks or activities
+        4. Each quest should have: task type, name, time commitment, detailed activity description, and learning resources
+
+        Return your response as JSON.
+        {output_format}
+
+        Tailor the content specifically to the {persona_type} personality type.
+        For the resources, include actual relevant websites, courses, or tutorials that exist.
+        Make the activities specific, challenging but achievable, and appropriate for the persona type.
+        For a {duration_months} month roadmap, create {weeks} weeks of content.
+        """,
+    example=f'{{"overall_goals": {_GOALS_EXAMPLE}, "weeks": [{_WEEK_EXAMPLE}]}}',
+    output_base=150,
+    output_per_unit=350,
+))
+
+OUTLINE = prompts.register(PromptTemplate(
+    "roadmap_outline",
+    version="2",
+    text="""
+        Create the outline of a personalized {duration_months} month roadmap for someone with a
+        {persona_type} personality type.
+
+        Return your response as JSON.
+        {output_format}
+
+        Create exactly {duration_months} months, tailored to the {persona_type} personality type.
+        """,
+    example=f'{{"overall_goals": {_GOALS_EXAMPLE}, "months": [{{"month": 1, "focus": "Focus of the month and how it builds on the previous one"}}]}}',
+    output_base=150,
+    output_per_unit=40,
+))
+
+MONTH_WEEKS = prompts.register(PromptTemplate(
+    "roadmap_month_weeks",
+    version="2",
+    text="""
+        You are writing month {month} of a personalized roadmap for someone with a {persona_type}
+        personality type.
+
+        Month focus: {focus}
+        Short-term goals: {short_term}
+        Long-term goals: {long_term}
+
+        Create weeks {first_week} to {last_week}. Each week has a different theme and 2-3 "quests" -
+        specific learning tasks or activities with task type, name, time commitment, detailed
+        activity description, and learning resources.
+
+        Return your response as JSON.
+        {output_format}
+
+        For the resources, include actual relevant websites, courses, or tutorials that exist.
+        Make the activities specific, challenging but achievable, and appropriate for the persona type.
+        """,
+    example=f'{{"weeks": [{_WEEK_EXAMPLE}]}}',
+    output_base=10,
+    output_per_unit=350,
+))
+
+DAILY_CARDS = prompts.register(PromptTemplate(
+    "roadmap_daily_cards",
+    version="2",
+    text="""
+        Create daily cards for part of a personalized daily roadmap for a person with the
+        personality type: {persona_type}.
+
+        Days: {first_day} to {last_day} of the roadmap
+        Focus for this period: {focus}
+        Short-term goals: {short_term}
+        Long-term goals: {long_term}
+
+        For each day, create a card with 4-5 specific activities or tasks focused on skills, growth, and learning.
+        Each task should have a specific time scheduled from morning to night, with start_time and end_time.
+
+        Return your response as JSON.
+        {output_format}
+
+        Create exactly one card per day listed above, in order.
+        Make each task specific, actionable, and tailored to the {persona_type} personality type.
+        Time slots should be one of: "morning", "afternoon", "evening", or "night".
+        """,
+    example="""{
+        "daily_cards": [
+            {
+                "day": 1,
+                "focus_area": "Focus area for the day",
+                "tasks": [
+                    {
+                        "title": "Task title",
+                        "description": "Detailed task description",
+                        "start_time": "08:00",
+                        "end_time": "09:30",
+                        "time_slot": "morning",
+                        "estimated_time": "90 minutes",
+                        "priority": 1,
+                        "resources": ["https://resource1.com", "https://resource2.com"]
+                    },
+                    ...
+                ],
+                "reflection_prompt": "A question for reflection at the end of the day"
+            },
+            ...
+        ]
+    }""",
+    output_base=10,
+    output_per_unit=450,
+))
+
+# Extension and regeneration see a short summary of the rest of the roadmap, not the roadmap itself
+
+CONTINUE_WEEKS = prompts.register(PromptTemplate(
+    "roadmap_continue_weeks",
+    version="1",
+    text="""
+        You are updating a personalized roadmap for someone with a {persona_type} personality type.
+
+        Short-term goals: {short_term}
+        Long-term goals: {long_term}
+        Rest of the roadmap (week: theme):
+        {summary}
+        {replacing}
+
+        Create weeks {first_week} to {last_week}. Each week has a different theme and 2-3 "quests" -
+        specific learning tasks or activities with task type, name, time commitment, detailed
+        activity description, and learning resources. Build on the surrounding weeks without repeating their themes.
+
+        Return your response as JSON.
+        {output_format}
+
+        For the resources, include actual relevant websites, courses, or tutorials that exist.
+        Make the activities specific, challenging but achievable, and appropriate for the persona type.
+        """,
+    example=f'{{"weeks": [{_WEEK_EXAMPLE}]}}',
+    output_base=10,
+    output_per_unit=350,
+))
+
+CONTINUE_DAYS = prompts.register(PromptTemplate(
+    "roadmap_continue_days",
+    version="1",
+    text="""
+        You are updating a personalized daily roadmap for a person with the personality type: {persona_type}.
+
+        Short-term goals: {short_term}
+        Long-term goals: {long_term}
+        Rest of the roadmap (days: focus area):
+        {summary}
+        {replacing}
+
+        Days: {first_day} to {last_day} of the roadmap
+        For each day, create a card with 4-5 specific activities or tasks focused on skills, growth, and learning.
+        Each task should have a specific time scheduled from morning to night, with start_time and end_time.
+        Build on the surrounding days without repeating their focus areas.
+
+        Return your response as JSON.
+        {output_format}
+
+        Create exactly one card per day listed above, in order.
+        Make each task specific, actionable, and tailored to the {persona_type} personality type.
+        Time slots should be one of: "morning", "afternoon", "evening", or "night".
+        """,
+    example=DAILY_CARDS.example,
+    output_base=10,
+    output_per_unit=450,
+))
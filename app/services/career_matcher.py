@@ -1,35 +1,149 @@
-from fastapi import Depends
-from typing import Dict, List, Any
+import asyncio
+import logging
+from fastapi import Depends, Request
+from pydantic import TypeAdapter
+from typing import Dict, List, Any, Optional
 
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.llm_output import PackedCareersOutput
 from app.models.persona import CareerMatch
-from app.utils.gemini_client import GeminiClient
+from app.prompts.careers import CAREERS, PACKED_CAREERS
+from app.prompts.registry import prompts
+from app.services.persona_scorer import ARCHETYPES, ARCHETYPE_DESCRIPTIONS
+from app.utils.cache import TieredCache, make_cache_key
+from app.utils.gemini_client import GeminiClient, get_gemini_client
+from app.utils.micro_batcher import MicroBatcher, index_packed_items
+
+logger = logging.getLogger(__name__)
+
+# Derived from the prompt templates, so editing a prompt invalidates memoized careers
+PROMPT_VERSION = prompts.version([CAREERS, PACKED_CAREERS])
+
+_careers_adapter = TypeAdapter(List[CareerMatch])
+
+def validate_careers(data: Any) -> List[Dict[str, Any]]:
+    """Check model output against List[CareerMatch]; raises ValueError for anything else"""
+    return [career.model_dump() for career in _careers_adapter.validate_python(data)]
+
+def get_career_cache(request: Request) -> TieredCache:
+    """Dependency returning the process-wide persona -> careers memo table"""
+    return request.app.state.career_cache
+
+def get_career_batcher(request: Request) -> Optional[MicroBatcher]:
+    """Dependency returning the career micro-batcher, or None when batching is disabled"""
+    return request.app.state.career_batcher
 
 class CareerMatcherService:
-    def __init__(self, gemini_client: GeminiClient = Depends()):
+    def __init__(
+        self,
+        gemini_client: GeminiClient = Depends(get_gemini_client),
+        cache: TieredCache = Depends(get_career_cache),
+        batcher: Optional[MicroBatcher] = Depends(get_career_batcher)
+    ):
         self.gemini_client = gemini_client
+        self.cache = cache
+        self.batcher = batcher
         
-    async def match_careers(self, persona: Dict[str, Any]) -> List[CareerMatch]:
-        """Match careers to a detected persona"""
+    async def match_careers(self, persona: Dict[str, Any]) -> List[Dict[str, Any]]:
+        """Match careers to a detected persona, as CareerMatch dicts the caller may modify"""
+        cache_key = self.cache_key(persona)
+        cached = await self.cache.get(cache_key)
+        metrics.record_cache("career", cached is not None)
+        if cached is not None:
+            return [dict(career) for career in cached]
+
+        if self.batcher is not None:
+            response = await self.batcher.submit(persona)
+        else:
+            response = await self._match_one(persona)
+        # Only well-formed lists are memoized; a bad response fails this call alone
+        careers = validate_careers(response)
+        await self.cache.set(cache_key, careers)
+        return [dict(career) for career in careers]
+
+    async def _match_one(self, persona: Dict[str, Any]) -> List[Dict[str, Any]]:
         # Create a prompt for Gemini
-        prompt = f"""
-        Based on the following personality profile, suggest the top 5 career matches:
-        
-        Primary personality type: {persona["primary"]["type"]}
-        Description: {persona["primary"]["description"]}
-        
-        Secondary personality type: {persona.get("secondary", {}).get("type", "None")}
-        
-        Return a JSON array with the following structure for each career:
-        [
-            {{
-                "career": "career name",
-                "confidence": 0.92,
-                "description": "Why this career is a good match for the personality"
-            }},
-            ...
-        ]
-        """
+        with metrics.stage("prompt_build"):
+            prompt = CAREERS.render(
+                self.gemini_client.structured_output,
+                primary_type=persona["primary"]["type"],
+                primary_description=persona["primary"]["description"],
+                secondary_type=(persona.get("secondary") or {}).get("type", "None"),
+            )
         
         # Call Gemini API and parse response
-        response = await self.gemini_client.generate_content(prompt)
-        return response
\ No newline at end of file
+        return validate_careers(
+            await self.gemini_client.generate_content(prompt, List[CareerMatch], CAREERS.max_output_tokens())
+        )
+
+    async def match_careers_many(self, personas: List[Dict[str, Any]]) -> List[Any]:
+        """Match careers for several personas with one prompt.
+
+        Personas sharing an archetype pair are asked about once. Returns a
+        career list or exception per persona; entries missing from the packed
+        output or failing validation are retried with their own call.
+        """
+        unique: Dict[str, int] = {}
+        for persona in personas:
+            unique.setdefault(self.cache_key(persona), len(unique))
+
+        items = {}
+        if len(unique) > 1:
+            profiles = {}
+            for persona in personas:
+                number = unique[self.cache_key(persona)]
+                profiles[number] = (
+                    f"Profile {number}: primary personality type {persona['primary']['type']} "
+                    f"({persona['primary']['description']}), secondary personality type "
+                    f"{(persona.get('secondary') or {}).get('type', 'None')}"
+                )
+            
+            with metrics.stage("prompt_build"):
+                prompt = PACKED_CAREERS.render(
+                    self.gemini_client.structured_output, profiles="\n".join(profiles.values())
+                )
+            try:
+                items = index_packed_items(await self.gemini_client.generate_content(
+                    prompt, List[PackedCareersOutput], PACKED_CAREERS.max_output_tokens(len(profiles))
+                ))
+            except Exception as e:
+                logger.warning("Packed career prompt failed", extra={"error": str(e)})
+
+        async def resolve(persona: Dict[str, Any]) -> List[Dict[str, Any]]:
+            careers = items.get(unique[self.cache_key(persona)], {}).get("careers")
+            try:
+                return validate_careers(careers)
+            except ValueError:
+                return await self._match_one(persona)
+
+        return await asyncio.gather(*(resolve(persona) for persona in personas), return_exceptions=True)
+
+    @staticmethod
+    def cache_key(persona: Dict[str, Any]) -> str:
+        """Memo key on the normalized (primary type, secondary type) pair"""
+        primary = persona["primary"]["type"].strip().lower()
+        secondary = str((persona.get("secondary") or {}).get("type", "none")).strip().lower()
+        return make_cache_key(primary, secondary, settings.GEMINI_MODEL, PROMPT_VERSION)
+
+    async def invalidate(self):
+        """Drop every memoized career list, e.g. after changing the prompt at runtime"""
+        await self.cache.clear()
+
+    async def prewarm(self):
+        """Fill the memo table for every known archetype pair"""
+        personas = []
+        for primary in ARCHETYPES:
+            for secondary in (None,) + ARCHETYPES:
+                if secondary == primary:
+                    continue
+                persona = {"primary": {"type": primary, "description": ARCHETYPE_DESCRIPTIONS[primary]}}
+                if secondary is not None:
+                    persona["secondary"] = {"type": secondary}
+                personas.append(persona)
+
+        results = await asyncio.gather(
+            *(self.match_careers(persona) for persona in personas),
+            return_exceptions=True
+        )
+        return sum(1 for result in results if not isinstance(result, Exception))
@@ -1,46 +1,237 @@
-from fastapi import Depends
-from typing import List, Dict, Any
+import asyncio
+import logging
+from fastapi import Depends, Request
+from typing import List, Dict, Any, Optional, Tuple
 
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.llm_output import AnalysisOutput, PackedAnalysisOutput, PackedPersonaOutput, PersonaOutput
 from app.models.survey import SurveyResponse
-from app.utils.gemini_client import GeminiClient
+from app.prompts.persona import ANALYSIS, PACKED_ANALYSIS, PACKED_PERSONA, PERSONA
+from app.prompts.registry import PromptTemplate, prompts
+from app.services.persona_scorer import persona_scorer
+from app.utils.cache import TieredCache, make_cache_key
+from app.utils.gemini_client import GeminiClient, get_gemini_client
+from app.utils.micro_batcher import MicroBatcher, index_packed_items
+
+logger = logging.getLogger(__name__)
+
+# Cached personas are reused only while every prompt that can produce them is unchanged
+PROMPT_VERSION = prompts.version([PERSONA, ANALYSIS, PACKED_PERSONA, PACKED_ANALYSIS])
+
+def validate_persona(data: Any) -> Dict[str, Any]:
+    """Check a persona against PersonaOutput; raises ValueError when a field is missing or malformed"""
+    return PersonaOutput.model_validate(data).model_dump(exclude_none=True)
+
+def get_persona_cache(request: Request) -> TieredCache:
+    """Dependency returning the process-wide persona cache created in the app lifespan"""
+    return request.app.state.persona_cache
+
+class PersonaBatchers:
+    """Process-wide micro-batchers that pack concurrent persona requests into shared prompts"""
+    def __init__(self, detector: "PersonaDetectorService", window: float, max_batch: int):
+        # Never pack more respondents than one response can hold
+        self.analysis = MicroBatcher(detector.analyse_many, window, min(max_batch, PACKED_ANALYSIS.max_units()))
+        self.detection = MicroBatcher(detector.detect_many, window, min(max_batch, PACKED_PERSONA.max_units()))
+
+    def stats(self) -> Dict[str, Any]:
+        return {"analysis": self.analysis.stats(), "detection": self.detection.stats()}
+
+def get_persona_batchers(request: Request) -> Optional[PersonaBatchers]:
+    """Dependency returning the persona micro-batchers, or None when batching is disabled"""
+    return request.app.state.persona_batchers
 
 class PersonaDetectorService:
-    def __init__(self, gemini_client: GeminiClient = Depends()):
+    def __init__(
+        self,
+        gemini_client: GeminiClient = Depends(get_gemini_client),
+        cache: TieredCache = Depends(get_persona_cache),
+        batchers: Optional[PersonaBatchers] = Depends(get_persona_batchers)
+    ):
         self.gemini_client = gemini_client
+        self.cache = cache
+        self.batchers = batchers
         
     async def detect_persona(self, responses: List[SurveyResponse]) -> Dict[str, Any]:
         """Detects personality type/archetype based on survey responses"""
-        # Convert responses to a format suitable for Gemini
-        responses_text = self._format_responses(responses)
-        
-        # Create a prompt for Gemini
-        prompt = f"""
-        Based on the following survey responses, identify the person's primary personality 
-        archetype (analytical, empathetic, aggressive, philosophical, etc.) and provide an analysis.
-        
-        Survey Responses:
-        {responses_text}
-        
-        Please return a JSON with the following structure:
-        {{
-            "primary": {{
-                "type": "personality type name",
-                "confidence": 0.85,
-                "description": "Description of this personality type"
-            }},
-            "secondary": {{
-                "type": "secondary personality type",
-                "confidence": 0.65,
-                "description": "Description of this personality type"
-            }},
-            "analysis": "Detailed analysis of the person's responses and personality"
-        }}
+        cache_key = self.cache_key(responses)
+        cached = await self.cache.get(cache_key)
+        metrics.record_cache("persona", cached is not None)
+        if cached is not None:
+            return cached
+
+        # Score locally and only ask Gemini for the written analysis;
+        # fall back to full Gemini detection when the scores are ambiguous.
+        # With batchers, concurrent requests share packed prompts.
+        persona = persona_scorer.predict(responses)
+        if persona is None:
+            if self.batchers is not None:
+                persona = await self.batchers.detection.submit(responses)
+            else:
+                persona = await self._detect_persona_with_gemini(responses)
+        else:
+            if self.batchers is not None:
+                persona["analysis"] = await self.batchers.analysis.submit((responses, persona))
+            else:
+                persona["analysis"] = await self._generate_analysis(responses, persona)
+
+        # Only well-formed personas are cached; a bad response fails this call alone
+        persona = validate_persona(persona)
+        await self.cache.set(cache_key, persona)
+        return persona
+
+    async def detect_personas(self, answer_sets: List[List[SurveyResponse]]) -> List[Any]:
+        """Detect personas for many answer sets, packing several respondents into each Gemini call.
+
+        Returns one persona per answer set, or the exception that answer set failed with.
+        """
+        keys = [self.cache_key(responses) for responses in answer_sets]
+        results: List[Any] = [await self.cache.get(key) for key in keys]
+        for result in results:
+            metrics.record_cache("persona", result is not None)
+
+        scored, ambiguous = [], []
+        for index, responses in enumerate(answer_sets):
+            if results[index] is not None:
+                continue
+            persona = persona_scorer.predict(responses)
+            if persona is None:
+                ambiguous.append(index)
+            else:
+                results[index] = persona
+                scored.append(index)
+
+        async def analyse(indices: List[int]):
+            analyses = await self.analyse_many([(answer_sets[index], results[index]) for index in indices])
+            for index, analysis in zip(indices, analyses):
+                if isinstance(analysis, Exception):
+                    results[index] = analysis
+                else:
+                    results[index]["analysis"] = analysis
+
+        async def detect(indices: List[int]):
+            personas = await self.detect_many([answer_sets[index] for index in indices])
+            for index, persona in zip(indices, personas):
+                results[index] = persona
+
+        analyse_size = max(1, min(settings.PERSONA_PACK_SIZE, PACKED_ANALYSIS.max_units()))
+        detect_size = max(1, min(settings.PERSONA_PACK_SIZE, PACKED_PERSONA.max_units()))
+        await asyncio.gather(
+            *(analyse(scored[start:start + analyse_size]) for start in range(0, len(scored), analyse_size)),
+            *(detect(ambiguous[start:start + detect_size]) for start in range(0, len(ambiguous), detect_size))
+        )
+
+        for index in scored + ambiguous:
+            if isinstance(results[index], Exception):
+                continue
+            try:
+                results[index] = validate_persona(results[index])
+            except ValueError as e:
+                results[index] = e
+                continue
+            await self.cache.set(keys[index], results[index])
+        return results
+
+    async def analyse_many(self, entries: List[Tuple[List[SurveyResponse], Dict[str, Any]]]) -> List[Any]:
+        """Write the analyses of several (responses, scored persona) entries with one prompt.
+
+        Returns an analysis or exception per entry; entries missing from the
+        packed output are retried with their own call.
+        """
+        items = {}
+        if len(entries) > 1:
+            respondents = []
+            for number, (responses, persona) in enumerate(entries):
+                secondary = persona.get("secondary", {}).get("type", "None")
+                respondents.append(
+                    f"Respondent {number} (primary archetype: {persona['primary']['type']}, "
+                    f"secondary archetype: {secondary}):\n{self._format_responses(responses)}"
+                )
+            
+            prompt = self._render(PACKED_ANALYSIS, respondents="\n".join(respondents))
+            items = await self._packed_items(prompt, List[PackedAnalysisOutput], PACKED_ANALYSIS.max_output_tokens(len(entries)))
+
+        async def resolve(number: int) -> str:
+            analysis = items.get(number, {}).get("analysis")
+            if isinstance(analysis, str) and analysis.strip():
+                return analysis
+            return await self._generate_analysis(*entries[number])
+
+        return await asyncio.gather(*(resolve(number) for number in range(len(entries))), return_exceptions=True)
+
+    async def detect_many(self, answer_sets: List[List[SurveyResponse]]) -> List[Any]:
+        """Detect the personas of several answer sets with one prompt.
+
+        Returns a persona or exception per answer set; entries missing from the
+        packed output or failing validation are retried with their own call.
         """
+        items = {}
+        if len(answer_sets) > 1:
+            respondents = [
+                f"Respondent {number}:\n{self._format_responses(responses)}"
+                for number, responses in enumerate(answer_sets)
+            ]
+            
+            prompt = self._render(PACKED_PERSONA, respondents="\n".join(respondents))
+            items = await self._packed_items(prompt, List[PackedPersonaOutput], PACKED_PERSONA.max_output_tokens(len(answer_sets)))
+
+        async def resolve(number: int) -> Dict[str, Any]:
+            try:
+                return validate_persona(items.get(number))
+            except ValueError:
+                return await self._detect_persona_with_gemini(answer_sets[number])
+
+        return await asyncio.gather(*(resolve(number) for number in range(len(answer_sets))), return_exceptions=True)
+
+    async def _packed_items(self, prompt: str, output_type: Any, max_output_tokens: int) -> Dict[int, Dict[str, Any]]:
+        """Run a multi-respondent prompt; a failed call yields no entries so each falls back"""
+        try:
+            return index_packed_items(
+                await self.gemini_client.generate_content(prompt, output_type, max_output_tokens)
+            )
+        except Exception as e:
+            logger.warning("Packed persona prompt failed", extra={"error": str(e)})
+            return {}
+
+    def predict_persona(self, responses: List[SurveyResponse]) -> Optional[Dict[str, Any]]:
+        """Cheap local prediction of the persona, without analysis; None when ambiguous"""
+        return persona_scorer.predict(responses)
+
+    @staticmethod
+    def cache_key(responses: List[SurveyResponse]) -> str:
+        """Canonical key for an answer set, independent of response order and whitespace"""
+        answers = sorted(
+            (resp.question_id.strip(), " ".join(resp.answer.split()))
+            for resp in responses
+        )
+        return make_cache_key(answers, settings.GEMINI_MODEL, PROMPT_VERSION)
+
+    async def _detect_persona_with_gemini(self, responses: List[SurveyResponse]) -> Dict[str, Any]:
+        """Ask Gemini for the persona of an answer set"""
+        prompt = self._render(PERSONA, responses=self._format_responses(responses))
         
         # Call Gemini API and parse response
-        response = await self.gemini_client.generate_content(prompt)
-        return response
+        response = await self.gemini_client.generate_content(prompt, PersonaOutput, PERSONA.max_output_tokens())
+        return validate_persona(response)
+    
+    async def _generate_analysis(self, responses: List[SurveyResponse], persona: Dict[str, Any]) -> str:
+        """Ask Gemini for the free-text analysis of an already scored persona"""
+        prompt = self._render(
+            ANALYSIS,
+            primary_type=persona["primary"]["type"],
+            secondary_type=persona.get("secondary", {}).get("type", "None"),
+            responses=self._format_responses(responses),
+        )
+        
+        response = await self.gemini_client.generate_content(prompt, AnalysisOutput, ANALYSIS.max_output_tokens())
+        return AnalysisOutput.model_validate(response).analysis
+    
+    @metrics.timed("prompt_build")
+    def _render(self, template: PromptTemplate, **values: Any) -> str:
+        """Fill in a prompt template for the client's output mode"""
+        return template.render(self.gemini_client.structured_output, **values)
     
+    @metrics.timed("prompt_build")
     def _format_responses(self, responses: List[SurveyResponse]) -> str:
         """Format survey responses as text for Gemini"""
         formatted = []
@@ -0,0 +1,78 @@
+from typing import List, Dict, Any, Optional, Tuple
+
+from app.core.config import settings
+from app.data.question_bank import question_bank
+from app.models.survey import SurveyResponse
+
+ARCHETYPES = ("analytical", "empathetic", "aggressive", "philosophical")
+
+ARCHETYPE_DESCRIPTIONS = {
+    "analytical": "Logical and structured thinker who breaks problems down, values expertise and decides from evidence.",
+    "empathetic": "People-focused and supportive, guided by values and how decisions affect others.",
+    "aggressive": "Driven and decisive, energized by challenges, leadership and measurable results.",
+    "philosophical": "Creative and curious explorer of ideas, drawn to innovation, alternatives and intuition.",
+}
+
+def _normalize_answer(answer: str) -> str:
+    return " ".join(answer.split()).casefold()
+
+class PersonaScorer:
+    """Deterministic archetype scoring from the tagged survey question banks"""
+    def __init__(self, questions: List[Dict[str, Any]] = None, ambiguity_margin: float = None):
+        self.ambiguity_margin = (
+            settings.PERSONA_AMBIGUITY_MARGIN if ambiguity_margin is None else ambiguity_margin
+        )
+
+        if questions is None:
+            questions = question_bank.all_questions()
+
+        # Precompute the (question_id, answer) -> archetype weight vector matrix
+        self._weights: Dict[Tuple[str, str], Tuple[float, ...]] = {}
+        for question in questions:
+            for option in question.get("options") or []:
+                vector = tuple(1.0 if name == option["archetype"] else 0.0 for name in ARCHETYPES)
+                self._weights[(question["id"], _normalize_answer(option["text"]))] = vector
+
+    def score(self, responses: List[SurveyResponse]) -> Tuple[Tuple[float, ...], int]:
+        """Sum the archetype vectors of the answers; also return how many were recognized"""
+        vectors = [
+            self._weights.get((resp.question_id.strip(), _normalize_answer(resp.answer)))
+            for resp in responses
+        ]
+        vectors = [vector for vector in vectors if vector is not None]
+        if not vectors:
+            return tuple(0.0 for _ in ARCHETYPES), 0
+        return tuple(map(sum, zip(*vectors))), len(vectors)
+
+    def score_many(self, submissions: List[List[SurveyResponse]]) -> List[Tuple[Tuple[float, ...], int]]:
+        """Score many answer sets in one call"""
+        return [self.score(responses) for responses in submissions]
+
+    def predict(self, responses: List[SurveyResponse]) -> Optional[Dict[str, Any]]:
+        """Primary/secondary persona in the detect_persona shape, or None when ambiguous"""
+        scores, recognized = self.score(responses)
+        # Free-text or unknown answers can't be scored locally
+        if recognized * 2 <= len(responses):
+            return None
+
+        total = sum(scores)
+        ranked = sorted(zip(scores, ARCHETYPES), reverse=True)
+        (top_score, primary), (second_score, secondary) = ranked[0], ranked[1]
+        if (top_score - second_score) / total < self.ambiguity_margin:
+            return None
+
+        persona = {"primary": self._persona_type(primary, top_score / total)}
+        if second_score > 0:
+            persona["secondary"] = self._persona_type(secondary, second_score / total)
+        return persona
+
+    @staticmethod
+    def _persona_type(archetype: str, confidence: float) -> Dict[str, Any]:
+        return {
+            "type": archetype,
+            "confidence": round(confidence, 2),
+            "description": ARCHETYPE_DESCRIPTIONS[archetype],
+        }
+
+# The weight matrix is immutable, so one scorer serves the whole process
+persona_scorer = PersonaScorer()
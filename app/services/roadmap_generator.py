@@ -1,119 +1,61 @@
-from fastapi import Depends
-from datetime import date, time, timedelta, datetime
-import json
+import asyncio
+import logging
+from fastapi import Depends, Request
+from datetime import date, timedelta
+from pydantic import TypeAdapter
+from typing import List, Dict, Any, AsyncIterator, Optional, Tuple
 
-from app.models.roadmap import (
-    PersonalRoadmap, DailyCard, Task, TimeSlot, 
-    WeeklyTheme, Quest, Resource, Goal
-)
-from app.utils.gemini_client import GeminiClient
+from app.models.llm_output import DailyCardsOutput, RoadmapOutlineOutput, WeeklyRoadmapOutput, WeeksOutput
+from app.models.roadmap import PersonalRoadmap, DailyCard, WeeklyTheme, Goal
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.prompts.registry import PromptTemplate, prompts
+from app.prompts.roadmap import CONTINUE_DAYS, CONTINUE_WEEKS, DAILY_CARDS, MONTH_WEEKS, OUTLINE, WEEKLY
+from app.utils.cache import TieredCache, make_cache_key
+from app.utils.gemini_client import GeminiClient, get_gemini_client
+from app.utils.json_stream import JsonStreamScanner
+
+logger = logging.getLogger(__name__)
+
+WEEKS_PER_MONTH = 4
+# A week of daily cards per call, unless that would not fit in one response
+DAYS_PER_BATCH = min(7, DAILY_CARDS.max_units())
+
+# Stored templates are reused only while the roadmap prompts are unchanged
+PROMPT_VERSION = prompts.version([WEEKLY, OUTLINE, MONTH_WEEKS, DAILY_CARDS])
+DAYS_PER_MONTH = 30
+
+# Compiled once: parsed model output becomes models in one validation pass
+_weeks_adapter = TypeAdapter(List[WeeklyTheme])
+_daily_cards_adapter = TypeAdapter(List[DailyCard])
+
+def get_roadmap_template_cache(request: Request) -> TieredCache:
+    """Dependency returning the process-wide roadmap template store created in the app lifespan"""
+    return request.app.state.roadmap_template_cache
 
 class RoadmapGeneratorService:
-    def __init__(self, gemini_client: GeminiClient = Depends()):
+    def __init__(
+        self,
+        gemini_client: GeminiClient = Depends(get_gemini_client),
+        template_cache: TieredCache = Depends(get_roadmap_template_cache)
+    ):
         self.gemini_client = gemini_client
+        self.template_cache = template_cache
     
-    async def generate_weekly_roadmap(self, persona_type: str, duration_months: int, user_id: str = None) -> PersonalRoadmap:
+    async def generate_weekly_roadmap(self, persona_type: str, duration_months: int, user_id: str = None, chunked: Optional[bool] = None, start_date: Optional[date] = None) -> PersonalRoadmap:
         """Generate a personalized roadmap with weekly themes and quests"""
         # Calculate date range
-        start_date = date.today()
+        start_date = start_date or date.today()
         end_date = start_date + timedelta(days=30*duration_months)
         
-        # Create a prompt for Gemini
-        prompt = f"""
-        Create a personalized roadmap for someone with a {persona_type} personality type.
-        The roadmap should cover {duration_months} month(s) starting from {start_date}.
-        
-        Please structure the roadmap with:
-        1. Overall goals (short-term and long-term)
-        2. Weekly themes, where each week has a different focus
-        3. For each week, create 2-3 "quests" - specific learning tasks or activities
-        4. Each quest should have: task type, name, time commitment, detailed activity description, and learning resources
-        
-        Return your response as a JSON with the following structure:
-        {{
-          "user_id": "{user_id if user_id else 'user123'}",
-          "persona_type": "{persona_type}",
-          "start_date": "{start_date.isoformat()}",
-          "end_date": "{end_date.isoformat()}",
-          "duration_months": {duration_months},
-          "overall_goals": {{
-            "short_term": [
-              "Short term goal 1",
-              "Short term goal 2",
-              "Short term goal 3"
-            ],
-            "long_term": [
-              "Long term goal 1",
-              "Long term goal 2",
-              "Long term goal 3"
-            ]
-          }},
-          "weeks": [
-            {{
-              "week_number": 1,
-              "theme": "Theme for Week 1",
-              "quests": [
-                {{
-                  "task_type": "Learn/Build/Reflect/Collaborate/etc.",
-                  "task_name": "Specific task name",
-                  "resources": [
-                    {{
-                      "title": "Resource title",
-                      "link": "https://resource.link"
-                    }}
-                  ],
-                  "time_commitment": "Time needed (e.g., '1 hour/day (evening)')",
-                  "activity": "Detailed description of what to do"
-                }}
-              ]
-            }}
-          ]
-        }}
-        
-        Tailor the content specifically to the {persona_type} personality type.
-        For the resources, include actual relevant websites, courses, or tutorials that exist.
-        Make the activities specific, challenging but achievable, and appropriate for the persona type.
-        For a {duration_months} month roadmap, create {duration_months * 4} weeks of content.
-        """
-        
-        # Call Gemini API and parse response
-        response_data = await self.gemini_client.generate_content(prompt)
-        
-        # Process the response to create the roadmap
-        weeks = []
-        for week_data in response_data.get("weeks", []):
-            quests = []
-            for quest_data in week_data.get("quests", []):
-                resources = []
-                for resource_data in quest_data.get("resources", []):
-                    resource = Resource(
-                        title=resource_data["title"],
-                        link=resource_data["link"]
-                    )
-                    resources.append(resource)
-                
-                quest = Quest(
-                    task_type=quest_data["task_type"],
-                    task_name=quest_data["task_name"],
-                    resources=resources,
-                    time_commitment=quest_data["time_commitment"],
-                    activity=quest_data["activity"]
-                )
-                quests.append(quest)
-            
-            week = WeeklyTheme(
-                week_number=week_data["week_number"],
-                theme=week_data["theme"],
-                quests=quests
-            )
-            weeks.append(week)
+        # Long roadmaps overflow a single response, so generate them month by month
+        if chunked is None:
+            chunked = self.use_chunks(duration_months)
         
-        # Create overall goals
-        goals_data = response_data.get("overall_goals", {})
-        goals = Goal(
-            short_term=goals_data.get("short_term", []),
-            long_term=goals_data.get("long_term", [])
-        )
+        if chunked:
+            goals, weeks = await self._generate_weeks_chunked(persona_type, duration_months)
+        else:
+            goals, weeks = await self._generate_weeks_monolithic(persona_type, duration_months)
         
         # Convert response to PersonalRoadmap
         roadmap = PersonalRoadmap(
@@ -128,102 +70,168 @@ class RoadmapGeneratorService:
         
         return roadmap
     
-    async def generate_daily_roadmap(self, persona_type: str, duration_months: int, user_id: str = None) -> PersonalRoadmap:
-        """Generate a personalized roadmap based on persona type with daily tasks"""
-        # Calculate date range
-        start_date = date.today()
-        end_date = start_date + timedelta(days=30*duration_months)
+    async def _generate_weeks_monolithic(self, persona_type: str, duration_months: int) -> Tuple[Goal, List[WeeklyTheme]]:
+        """Generate goals and every week in a single prompt"""
+        prompt = self._weekly_prompt(persona_type, duration_months)
         
-        # Create a prompt for Gemini
-        prompt = f"""
-        Create a personalized daily roadmap for a person with the personality type: {persona_type}.
-        The roadmap should cover {duration_months} months starting from {start_date}.
-        
-        For each day, create a card with 4-5 specific activities or tasks focused on skills, growth, and learning.
-        Each task should have a specific time scheduled from morning to night, with start_time and end_time.
-        
-        Return your response as a JSON with the following structure:
-        {{
-            "overall_goals": {{
-                "short_term": ["Short term goal 1", "Short term goal 2", "Short term goal 3"],
-                "long_term": ["Long term goal 1", "Long term goal 2", "Long term goal 3"]
-            }},
-            "daily_cards": [
-                {{
-                    "date": "YYYY-MM-DD",
-                    "focus_area": "Focus area for the day",
-                    "tasks": [
-                        {{
-                            "title": "Task title",
-                            "description": "Detailed task description",
-                            "start_time": "08:00",
-                            "end_time": "09:30",
-                            "time_slot": "morning", 
-                            "estimated_time": "90 minutes",
-                            "priority": 1,
-                            "resources": ["https://resource1.com", "https://resource2.com"]
-                        }},
-                        ...
-                    ],
-                    "reflection_prompt": "A question for reflection at the end of the day"
-                }},
-                ...
-            ]
-        }}
+        # Call Gemini API and parse response
+        response_data = await self.gemini_client.generate_content(
+            prompt, WeeklyRoadmapOutput, WEEKLY.max_output_tokens(duration_months * WEEKS_PER_MONTH)
+        )
         
-        Note: For demonstration purposes, please generate cards for 3 days. In production, we would generate cards for each day in the {duration_months}-month period.
-        Make each task specific, actionable, and tailored to the {persona_type} personality type.
-        Time slots should be one of: "morning", "afternoon", "evening", or "night".
-        """
+        # Renumber as the chunked path does, so week N is the Nth week whatever the model numbered it
+        weeks = self._build_weeks(response_data.get("weeks", []))[:duration_months * WEEKS_PER_MONTH]
+        for week_number, week in enumerate(weeks, 1):
+            week.week_number = week_number
+        return self._build_goals(response_data.get("overall_goals", {})), weeks
+    
+    async def _generate_weeks_chunked(self, persona_type: str, duration_months: int) -> Tuple[Goal, List[WeeklyTheme]]:
+        """Generate an outline first, then each month's weeks concurrently"""
+        goals, weeks = None, []
+        async for kind, value in self._iter_weeks_chunked(persona_type, duration_months):
+            if kind == "overall_goals":
+                goals = value
+            else:
+                weeks.append(value)
+        return goals, weeks
+    
+    async def _iter_weeks_chunked(self, persona_type: str, duration_months: int) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield the overall goals, then every week in order as its month completes"""
+        goals, focuses = await self._generate_outline(persona_type, duration_months)
+        yield "overall_goals", goals
         
-        # Call Gemini API and parse response
-        response_data = await self.gemini_client.generate_content(prompt)
-        
-        # Process the response to convert string dates and times to proper objects
-        processed_cards = []
-        for card in response_data.get("daily_cards", []):
-            processed_tasks = []
-            for task in card["tasks"]:
-                # Convert time strings to time objects
-                start_time_parts = task["start_time"].split(":")
-                end_time_parts = task["end_time"].split(":")
-                
-                processed_task = Task(
-                    title=task["title"],
-                    description=task["description"],
-                    start_time=time(int(start_time_parts[0]), int(start_time_parts[1])),
-                    end_time=time(int(end_time_parts[0]), int(end_time_parts[1])),
-                    time_slot=task["time_slot"],
-                    estimated_time=task["estimated_time"],
-                    priority=task["priority"],
-                    resources=task.get("resources", [])
+        semaphore = asyncio.Semaphore(settings.ROADMAP_CHUNK_CONCURRENCY)
+        
+        async def generate_month(month: int) -> List[WeeklyTheme]:
+            async with semaphore:
+                return await self._generate_month_weeks(
+                    persona_type, month, focuses.get(month, ""), goals
                 )
-                processed_tasks.append(processed_task)
-            
-            # Convert date string to date object
-            card_date = datetime.strptime(card["date"], "%Y-%m-%d").date()
-            
-            processed_card = DailyCard(
-                date=card_date,
-                focus_area=card["focus_area"],
-                tasks=processed_tasks,
-                reflection_prompt=card["reflection_prompt"]
-            )
-            processed_cards.append(processed_card)
         
-        # Create overall goals
-        goals_data = response_data.get("overall_goals", {})
+        tasks = [
+            asyncio.create_task(generate_month(month))
+            for month in range(1, duration_months + 1)
+        ]
+        try:
+            # Merge in month order and renumber so weeks are consecutive
+            week_number = 0
+            for task in tasks:
+                for week in (await task)[:WEEKS_PER_MONTH]:
+                    week_number += 1
+                    week.week_number = week_number
+                    yield "week", week
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _generate_outline(self, persona_type: str, duration_months: int) -> Tuple[Goal, Dict[int, str]]:
+        """Generate the overall goals and the focus of each month"""
+        outline_prompt = self._outline_prompt(persona_type, duration_months)
+        outline = await self.gemini_client.generate_content(
+            outline_prompt, RoadmapOutlineOutput, OUTLINE.max_output_tokens(duration_months)
+        )
+        goals = self._build_goals(outline.get("overall_goals", {}))
+        focuses = {
+            month_data.get("month"): month_data.get("focus", "")
+            for month_data in outline.get("months", [])
+        }
+        return goals, focuses
+    
+    async def _generate_month_weeks(self, persona_type: str, month: int, focus: str, goals: Goal) -> List[WeeklyTheme]:
+        """Generate the weekly themes and quests for one month of a chunked roadmap"""
+        prompt = self._month_prompt(persona_type, month, focus, goals)
+        
+        response_data = await self.gemini_client.generate_content(
+            prompt, WeeksOutput, MONTH_WEEKS.max_output_tokens(WEEKS_PER_MONTH)
+        )
+        return self._build_weeks(response_data.get("weeks", []))
+    
+    @staticmethod
+    def use_chunks(duration_months: int) -> bool:
+        """Whether a weekly roadmap is too large for one response and is generated month by month"""
+        return not WEEKLY.fits_single_call(duration_months * WEEKS_PER_MONTH)
+    
+    @metrics.timed("prompt_build")
+    def _weekly_prompt(self, persona_type: str, duration_months: int) -> str:
+        """Prompt for a whole weekly roadmap in one response"""
+        return WEEKLY.render(
+            self.gemini_client.structured_output,
+            persona_type=persona_type,
+            duration_months=duration_months,
+            weeks=duration_months * WEEKS_PER_MONTH,
+        )
+    
+    @metrics.timed("prompt_build")
+    def _outline_prompt(self, persona_type: str, duration_months: int) -> str:
+        """Prompt for the goals and month focuses of a chunked roadmap"""
+        return OUTLINE.render(
+            self.gemini_client.structured_output, persona_type=persona_type, duration_months=duration_months
+        )
+    
+    @metrics.timed("prompt_build")
+    def _month_prompt(self, persona_type: str, month: int, focus: str, goals: Goal) -> str:
+        """Prompt for one month of weeks in a chunked roadmap"""
+        first_week = (month - 1) * WEEKS_PER_MONTH + 1
+        return MONTH_WEEKS.render(
+            self.gemini_client.structured_output,
+            persona_type=persona_type,
+            month=month,
+            focus=focus,
+            short_term="; ".join(goals.short_term),
+            long_term="; ".join(goals.long_term),
+            first_week=first_week,
+            last_week=first_week + WEEKS_PER_MONTH - 1,
+        )
+    
+    @metrics.timed("prompt_build")
+    def _daily_batch_prompt(self, persona_type: str, first_day: int, last_day: int, focus: str, goals: Goal) -> str:
+        """Prompt for the daily cards of one batch of consecutive days"""
+        return DAILY_CARDS.render(
+            self.gemini_client.structured_output,
+            persona_type=persona_type,
+            first_day=first_day,
+            last_day=last_day,
+            focus=focus,
+            short_term="; ".join(goals.short_term),
+            long_term="; ".join(goals.long_term),
+        )
+    
+    @metrics.timed("model_build")
+    def _build_weeks(self, weeks_data: List[Dict[str, Any]]) -> List[WeeklyTheme]:
+        """Convert parsed week dicts into WeeklyTheme models"""
+        return _weeks_adapter.validate_python(weeks_data)
+    
+    @metrics.timed("model_build")
+    def _build_daily_cards(self, cards_data: List[Dict[str, Any]]) -> List[DailyCard]:
+        """Convert parsed daily card dicts, with string dates and times, into DailyCard models"""
+        return _daily_cards_adapter.validate_python(cards_data)
+    
+    @metrics.timed("model_build")
+    def _build_goals(self, goals_data: Any) -> Goal:
+        """Convert parsed overall goals into a Goal model"""
         if isinstance(goals_data, list):
             # Handle legacy format
-            goals = Goal(
+            return Goal(
                 short_term=goals_data[:3] if len(goals_data) >= 3 else goals_data,
                 long_term=goals_data[3:] if len(goals_data) > 3 else []
             )
-        else:
-            goals = Goal(
-                short_term=goals_data.get("short_term", []),
-                long_term=goals_data.get("long_term", [])
-            )
+        return Goal(
+            short_term=goals_data.get("short_term", []),
+            long_term=goals_data.get("long_term", [])
+        )
+    
+    async def generate_daily_roadmap(self, persona_type: str, duration_months: int, user_id: str = None, start_date: Optional[date] = None) -> PersonalRoadmap:
+        """Generate a personalized roadmap based on persona type with daily tasks"""
+        # Calculate date range
+        start_date = start_date or date.today()
+        end_date = start_date + timedelta(days=30*duration_months)
+        
+        goals, processed_cards = None, []
+        async for kind, value in self._iter_daily_cards(persona_type, duration_months, start_date):
+            if kind == "overall_goals":
+                goals = value
+            else:
+                processed_cards.append(value)
         
         # Convert response to PersonalRoadmap
         roadmap = PersonalRoadmap(
@@ -237,10 +245,344 @@ class RoadmapGeneratorService:
         )
         
         return roadmap
+    
+    async def _iter_daily_cards(self, persona_type: str, duration_months: int, start_date: date) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield the overall goals, then a card for every day in date order.
+
+        Days are generated in week-sized batches issued concurrently.
+        """
+        days = [start_date + timedelta(days=offset) for offset in range(30 * duration_months)]
+        batches = [days[start:start + DAYS_PER_BATCH] for start in range(0, len(days), DAYS_PER_BATCH)]
+        
+        goals, focuses = await self._generate_outline(persona_type, duration_months)
+        yield "overall_goals", goals
         
-    async def generate_roadmap(self, persona_type: str, duration_months: int, user_id: str = None, format_type: str = "weekly") -> PersonalRoadmap:
-        """Generate a personalized roadmap based on persona type and format preference"""
-        if format_type == "weekly":
-            return await self.generate_weekly_roadmap(persona_type, duration_months, user_id)
+        semaphore = asyncio.Semaphore(settings.ROADMAP_DAILY_CONCURRENCY)
+        
+        async def generate_batch(dates: List[date]) -> List[DailyCard]:
+            first_day = (dates[0] - start_date).days + 1
+            month = (first_day - 1) // 30 + 1
+            async with semaphore:
+                prompt = self._daily_batch_prompt(
+                    persona_type, first_day, first_day + len(dates) - 1, focuses.get(month, ""), goals
+                )
+                cards_data = await self._generate_cards(prompt, DAILY_CARDS, len(dates))
+            # Trust our calendar over the model's dates
+            for card_data, day in zip(cards_data, dates):
+                card_data["date"] = day.isoformat()
+            return self._build_daily_cards(cards_data)
+        
+        tasks = [asyncio.create_task(generate_batch(dates)) for dates in batches]
+        try:
+            for task in tasks:
+                for card in await task:
+                    yield "daily_card", card
+        finally:
+            for task in tasks:
+                task.cancel()
+    
+    async def _generate_cards(self, prompt: str, template: PromptTemplate, count: int) -> List[Dict[str, Any]]:
+        """Parsed card dicts for a batch of count days, asking again once if the model leaves days out"""
+        for _ in range(2):
+            response_data = await self.gemini_client.generate_content(
+                prompt, DailyCardsOutput, template.max_output_tokens(count)
+            )
+            cards_data = response_data.get("daily_cards", [])
+            if len(cards_data) >= count:
+                return cards_data[:count]
+        raise ValueError(f"Model returned {len(cards_data)} of {count} daily cards")
+    
+    async def stream_roadmap(self, persona_type: str, duration_months: int, user_id: str = None, format_type: str = "weekly", chunked: Optional[bool] = None) -> AsyncIterator[Dict[str, Any]]:
+        """Yield a roadmap piece by piece: header, overall goals, then each week or daily card"""
+        start_date = date.today()
+        end_date = start_date + timedelta(days=30*duration_months)
+        
+        yield {
+            "type": "roadmap",
+            "data": {
+                "user_id": user_id,
+                "persona_type": persona_type,
+                "start_date": start_date.isoformat(),
+                "end_date": end_date.isoformat(),
+                "duration_months": duration_months,
+                "format": format_type,
+            },
+        }
+        
+        key = self.template_key(persona_type, duration_months, format_type)
+        template = await self.template_cache.get(key)
+        metrics.record_cache("roadmap_template", template is not None)
+        if template is not None:
+            roadmap = self._rebase(template, persona_type, start_date, user_id)
+            yield {"type": "overall_goals", "data": roadmap.overall_goals.model_dump(mode="json")}
+            for week in roadmap.weeks:
+                yield {"type": "week", "data": week.model_dump(mode="json")}
+            for card in roadmap.daily_cards or []:
+                yield {"type": "daily_card", "data": card.model_dump(mode="json")}
+            return
+        
+        goals, weeks, cards = None, [], []
+        async for kind, value in self._iter_pieces(persona_type, duration_months, format_type, chunked, start_date):
+            if kind == "overall_goals":
+                goals = value
+            elif kind == "week":
+                weeks.append(value)
+            else:
+                cards.append(value)
+            yield {"type": kind, "data": value.model_dump(mode="json")}
+        
+        # Keep the finished roadmap as a template for later requests
+        roadmap = PersonalRoadmap(
+            persona_type=persona_type,
+            duration_months=duration_months,
+            start_date=start_date,
+            end_date=end_date,
+            weeks=weeks,
+            daily_cards=cards if format_type != "weekly" else None,
+            overall_goals=goals
+        )
+        await self._store_template(key, roadmap)
+    
+    async def _iter_pieces(self, persona_type: str, duration_months: int, format_type: str, chunked: Optional[bool], start_date: date) -> AsyncIterator[Tuple[str, Any]]:
+        """Yield ("overall_goals", Goal) and then ("week", WeeklyTheme) or ("daily_card", DailyCard) pieces"""
+        if chunked is None:
+            chunked = self.use_chunks(duration_months)
+        
+        if format_type != "weekly":
+            async for piece in self._iter_daily_cards(persona_type, duration_months, start_date):
+                yield piece
+            return
+        if chunked:
+            async for piece in self._iter_weeks_chunked(persona_type, duration_months):
+                yield piece
+            return
+        
+        prompt = self._weekly_prompt(persona_type, duration_months)
+        scanner = JsonStreamScanner(stream_arrays=["weeks"])
+        
+        # Parse members out of the streamed text as soon as each one is complete
+        week_number = 0
+        max_output_tokens = WEEKLY.max_output_tokens(duration_months * WEEKS_PER_MONTH)
+        async for text in self.gemini_client.stream_text(prompt, WeeklyRoadmapOutput, max_output_tokens):
+            for key, value in scanner.feed(text):
+                if key == "overall_goals":
+                    yield "overall_goals", self._build_goals(value)
+                elif key == "weeks":
+                    week = self._build_weeks([value])[0]
+                    week_number += 1
+                    week.week_number = week_number
+                    yield "week", week
+        scanner.close()
+    
+    async def generate_roadmap(self, persona_type: str, duration_months: int, user_id: str = None, format_type: str = "weekly", chunked: Optional[bool] = None, start_date: Optional[date] = None) -> PersonalRoadmap:
+        """Generate a personalized roadmap based on persona type and format preference.
+
+        The content only depends on persona type, duration and format, so it is
+        cached as a template and rebased onto the caller's start date and user id.
+        """
+        start_date = start_date or date.today()
+        key = self.template_key(persona_type, duration_months, format_type)
+        template = await self.template_cache.get(key)
+        metrics.record_cache("roadmap_template", template is not None)
+        if template is None:
+            if format_type == "weekly":
+                roadmap = await self.generate_weekly_roadmap(persona_type, duration_months, None, chunked, start_date)
+            else:
+                roadmap = await self.generate_daily_roadmap(persona_type, duration_months, None, start_date)
+            await self._store_template(key, roadmap)
+            # Already built for this start date; only the owner differs from the template
+            roadmap.user_id = user_id
+            return roadmap
+        
+        return self._rebase(template, persona_type, start_date, user_id)
+    
+    async def _store_template(self, key: str, roadmap: PersonalRoadmap):
+        """Keep a generated roadmap as the template for its key, unless weeks or days are missing"""
+        if not self.is_complete(roadmap):
+            logger.warning(
+                "Not caching incomplete roadmap template",
+                extra={"persona_type": roadmap.persona_type, "duration_months": roadmap.duration_months},
+            )
+            return
+        await self.template_cache.set(key, roadmap.model_dump(mode="json"))
+    
+    @classmethod
+    def is_complete(cls, roadmap: PersonalRoadmap) -> bool:
+        """Whether a weekly roadmap has every week, or a daily one a card for every date"""
+        if roadmap.daily_cards is None:
+            return len(roadmap.weeks) == cls.range_size(roadmap)
+        expected = [roadmap.start_date + timedelta(days=offset) for offset in range(cls.range_size(roadmap))]
+        return [card.date for card in roadmap.daily_cards] == expected
+    
+    @staticmethod
+    def range_size(roadmap: PersonalRoadmap) -> int:
+        """Number of weeks a weekly roadmap covers, or of days a daily one does"""
+        if roadmap.daily_cards is None:
+            return roadmap.duration_months * WEEKS_PER_MONTH
+        return roadmap.duration_months * DAYS_PER_MONTH
+    
+    async def extend_roadmap(self, roadmap: PersonalRoadmap, additional_months: int) -> PersonalRoadmap:
+        """Append additional_months of weeks or daily cards to an existing roadmap.
+
+        Only the new weeks or days are generated; each call sees the goals and a
+        compact summary of the existing content, so cost scales with the extension.
+        """
+        first = self.range_size(roadmap) + 1
+        extended = roadmap.model_copy(update={
+            "duration_months": roadmap.duration_months + additional_months,
+            "end_date": roadmap.start_date + timedelta(days=DAYS_PER_MONTH * (roadmap.duration_months + additional_months)),
+        })
+        last = self.range_size(extended)
+        if roadmap.daily_cards is None:
+            weeks = await self._generate_week_range(roadmap, first, last)
+            extended.weeks = list(roadmap.weeks) + weeks
         else:
-            return await self.generate_daily_roadmap(persona_type, duration_months, user_id)
\ No newline at end of file
+            cards = await self._generate_day_range(roadmap, first, last)
+            extended.daily_cards = list(roadmap.daily_cards) + cards
+        return extended
+    
+    async def regenerate_range(self, roadmap: PersonalRoadmap, first: int, last: int) -> PersonalRoadmap:
+        """Regenerate weeks first to last of a weekly roadmap, or days first to last of a daily one.
+
+        Everything outside the range is kept as is; the new content is
+        conditioned on a summary of it and on what is being replaced.
+        """
+        if roadmap.daily_cards is None:
+            weeks = await self._generate_week_range(roadmap, first, last)
+            kept = [week for week in roadmap.weeks if not first <= week.week_number <= last]
+            return roadmap.model_copy(update={"weeks": sorted(kept + weeks, key=lambda week: week.week_number)})
+        
+        cards = await self._generate_day_range(roadmap, first, last)
+        kept = [card for card in roadmap.daily_cards if not first <= self._day_number(roadmap, card) <= last]
+        return roadmap.model_copy(update={"daily_cards": sorted(kept + cards, key=lambda card: card.date)})
+    
+    async def _generate_week_range(self, roadmap: PersonalRoadmap, first: int, last: int) -> List[WeeklyTheme]:
+        """Generate weeks first to last, in one call when they fit and a month per call otherwise"""
+        summary, replacing = self._weeks_summary(roadmap.weeks, first, last)
+        count = last - first + 1
+        size = count if CONTINUE_WEEKS.fits_single_call(count) else WEEKS_PER_MONTH
+        semaphore = asyncio.Semaphore(settings.ROADMAP_CHUNK_CONCURRENCY)
+        
+        async def generate(start: int) -> List[WeeklyTheme]:
+            end = min(last, start + size - 1)
+            prompt = self._continue_weeks_prompt(roadmap, start, end, summary, replacing)
+            async with semaphore:
+                response_data = await self.gemini_client.generate_content(
+                    prompt, WeeksOutput, CONTINUE_WEEKS.max_output_tokens(end - start + 1)
+                )
+            weeks = self._build_weeks(response_data.get("weeks", [])[:end - start + 1])
+            for week_number, week in enumerate(weeks, start):
+                week.week_number = week_number
+            return weeks
+        
+        chunks = await asyncio.gather(*(generate(start) for start in range(first, last + 1, size)))
+        return [week for chunk in chunks for week in chunk]
+    
+    async def _generate_day_range(self, roadmap: PersonalRoadmap, first: int, last: int) -> List[DailyCard]:
+        """Generate the cards of days first to last, a batch of days per call"""
+        summary, replacing = self._cards_summary(roadmap, first, last)
+        semaphore = asyncio.Semaphore(settings.ROADMAP_DAILY_CONCURRENCY)
+        
+        async def generate(start: int) -> List[DailyCard]:
+            end = min(last, start + DAYS_PER_BATCH - 1)
+            prompt = self._continue_days_prompt(roadmap, start, end, summary, replacing)
+            async with semaphore:
+                cards_data = await self._generate_cards(prompt, CONTINUE_DAYS, end - start + 1)
+            for day_number, card_data in enumerate(cards_data, start):
+                card_data["date"] = (roadmap.start_date + timedelta(days=day_number - 1)).isoformat()
+            return self._build_daily_cards(cards_data)
+        
+        batches = await asyncio.gather(*(generate(start) for start in range(first, last + 1, DAYS_PER_BATCH)))
+        return [card for batch in batches for card in batch]
+    
+    @staticmethod
+    def _day_number(roadmap: PersonalRoadmap, card: DailyCard) -> int:
+        return (card.date - roadmap.start_date).days + 1
+    
+    @staticmethod
+    def _summary(items: List[Tuple[int, int, str]], first: int, last: int) -> Tuple[str, str]:
+        """Lines for the (first, last, text) items nearest the range, and for those inside it"""
+        def distance(item: Tuple[int, int, str]) -> int:
+            return max(first - item[1], item[0] - last, 0)
+        
+        def line(item: Tuple[int, int, str]) -> str:
+            span = str(item[0]) if item[0] == item[1] else f"{item[0]}-{item[1]}"
+            return f"{span}: {item[2]}"
+        
+        outside = [item for item in items if distance(item) > 0]
+        inside = [item for item in items if distance(item) == 0]
+        nearest = sorted(sorted(outside, key=distance)[:settings.ROADMAP_SUMMARY_MAX_ITEMS])
+        summary = "\n".join(line(item) for item in nearest) or "Nothing yet"
+        replacing = ""
+        if inside:
+            replacing = "Being replaced, so write something different from: " + "; ".join(line(item) for item in inside)
+        return summary, replacing
+    
+    def _weeks_summary(self, weeks: List[WeeklyTheme], first: int, last: int) -> Tuple[str, str]:
+        return self._summary([(week.week_number, week.week_number, week.theme) for week in weeks], first, last)
+    
+    def _cards_summary(self, roadmap: PersonalRoadmap, first: int, last: int) -> Tuple[str, str]:
+        # Consecutive days sharing a focus area are one line
+        runs: List[List[Any]] = []
+        for card in sorted(roadmap.daily_cards or [], key=lambda card: card.date):
+            day = self._day_number(roadmap, card)
+            inside = first <= day <= last
+            if runs and runs[-1][2] == card.focus_area and runs[-1][1] == day - 1 and runs[-1][3] == inside:
+                runs[-1][1] = day
+            else:
+                runs.append([day, day, card.focus_area, inside])
+        return self._summary([(start, end, focus) for start, end, focus, _ in runs], first, last)
+    
+    @metrics.timed("prompt_build")
+    def _continue_weeks_prompt(self, roadmap: PersonalRoadmap, first_week: int, last_week: int, summary: str, replacing: str) -> str:
+        """Prompt for a range of weeks of an existing roadmap"""
+        return CONTINUE_WEEKS.render(
+            self.gemini_client.structured_output,
+            persona_type=roadmap.persona_type,
+            short_term="; ".join(roadmap.overall_goals.short_term),
+            long_term="; ".join(roadmap.overall_goals.long_term),
+            summary=summary,
+            replacing=replacing,
+            first_week=first_week,
+            last_week=last_week,
+        )
+    
+    @metrics.timed("prompt_build")
+    def _continue_days_prompt(self, roadmap: PersonalRoadmap, first_day: int, last_day: int, summary: str, replacing: str) -> str:
+        """Prompt for a range of days of an existing daily roadmap"""
+        return CONTINUE_DAYS.render(
+            self.gemini_client.structured_output,
+            persona_type=roadmap.persona_type,
+            short_term="; ".join(roadmap.overall_goals.short_term),
+            long_term="; ".join(roadmap.overall_goals.long_term),
+            summary=summary,
+            replacing=replacing,
+            first_day=first_day,
+            last_day=last_day,
+        )
+    
+    @staticmethod
+    def template_key(persona_type: str, duration_months: int, format_type: str) -> str:
+        format_name = getattr(format_type, "value", format_type)
+        return make_cache_key(
+            persona_type.strip().lower(), duration_months, format_name,
+            settings.GEMINI_MODEL, PROMPT_VERSION
+        )
+    
+    def _rebase(self, template: Dict[str, Any], persona_type: str, start_date: date, user_id: Optional[str]) -> PersonalRoadmap:
+        """Move a stored roadmap template onto a new start date and user"""
+        shift = start_date - date.fromisoformat(template["start_date"])
+        data = dict(template)
+        data.update(
+            user_id=user_id,
+            persona_type=persona_type,
+            start_date=start_date,
+            end_date=date.fromisoformat(template["end_date"]) + shift,
+        )
+        if template.get("daily_cards"):
+            data["daily_cards"] = [
+                dict(card, date=date.fromisoformat(card["date"]) + shift)
+                for card in template["daily_cards"]
+            ]
+        with metrics.stage("model_build"):
+            return PersonalRoadmap.model_validate(data)
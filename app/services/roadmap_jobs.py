@@ -0,0 +1,288 @@
+import asyncio
+import ipaddress
+import logging
+import os
+import socket
+import time
+import urllib.parse
+import urllib.request
+import uuid
+from collections import OrderedDict, deque
+from fastapi import Request
+from typing import Any, Deque, Dict, List, Optional, Set
+
+from app.core.config import settings
+from app.db.repositories import JobRepository, RoadmapRepository
+from app.services.roadmap_generator import RoadmapGeneratorService
+
+logger = logging.getLogger(__name__)
+
+class _NoRedirects(urllib.request.HTTPRedirectHandler):
+    """Fail on redirects, which could send a callback on to a host that was never checked"""
+    def redirect_request(self, req, fp, code, msg, headers, newurl):
+        return None
+
+_callback_opener = urllib.request.build_opener(_NoRedirects)
+
+async def check_callback_url(url: str):
+    """Raise ValueError unless url is an http(s) URL job results may be POSTed to.
+
+    With ROADMAP_JOB_CALLBACK_HOSTS set, only those hosts are allowed. Otherwise
+    every address the host resolves to must be public: no loopback, private,
+    link-local or reserved ranges.
+    """
+    parts = urllib.parse.urlsplit(url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise ValueError("callback_url must be an http(s) URL")
+    host = parts.hostname.lower()
+    allowed = {name.strip().lower() for name in settings.ROADMAP_JOB_CALLBACK_HOSTS.split(",") if name.strip()}
+    if allowed:
+        if host not in allowed:
+            raise ValueError(f"callback_url host {host!r} is not allowed")
+        return
+
+    port = parts.port or (443 if parts.scheme == "https" else 80)
+    try:
+        addresses = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+    except socket.gaierror:
+        raise ValueError(f"callback_url host {host!r} does not resolve")
+    for _, _, _, _, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if address.version == 6 and address.ipv4_mapped is not None:
+            address = address.ipv4_mapped
+        if not address.is_global:
+            raise ValueError("callback_url must not point at a private or local address")
+
+class FairQueue:
+    """Priority queue that round-robins between users within a priority level.
+
+    Higher priorities are always served first. Inside a level each user gets
+    one job in turn, so a user with many queued jobs cannot starve the others.
+    """
+    def __init__(self):
+        self._levels: Dict[int, "OrderedDict[str, Deque[str]]"] = {}
+        self._ready = asyncio.Semaphore(0)
+        self._size = 0
+
+    def put(self, job_id: str, user_id: Optional[str], priority: int):
+        users = self._levels.setdefault(priority, OrderedDict())
+        users.setdefault(user_id or "", deque()).append(job_id)
+        self._size += 1
+        self._ready.release()
+
+    async def get(self) -> str:
+        await self._ready.acquire()
+        priority = max(self._levels)
+        users = self._levels[priority]
+        user, jobs = next(iter(users.items()))
+        job_id = jobs.popleft()
+
+        # The user goes to the back of the line for this level
+        del users[user]
+        if jobs:
+            users[user] = jobs
+        if not users:
+            del self._levels[priority]
+        self._size -= 1
+        return job_id
+
+    def __len__(self) -> int:
+        return self._size
+
+class RoadmapJobQueue:
+    """Runs roadmap generation jobs on a fixed number of background workers.
+
+    Jobs are recorded in the jobs table before they are queued, so work that
+    was queued or running when the process stopped is picked up again on start.
+    Worker processes sharing the database all queue the recovered jobs; each
+    job is claimed, and run, by only one of them.
+
+    A running job holds a lease that its worker renews while it runs. Every
+    lease period each process looks for jobs whose lease lapsed, or that sat
+    queued in another process for that long, and queues them too, so the
+    jobs of a crashed or recycled worker process are taken over.
+    """
+    def __init__(
+        self, jobs: JobRepository, roadmaps: RoadmapRepository, generator: RoadmapGeneratorService,
+        workers: int = 2, lease_seconds: float = 60.0
+    ):
+        self.jobs = jobs
+        self.roadmaps = roadmaps
+        self.generator = generator
+        self.worker_count = max(1, workers)
+        self.lease_seconds = lease_seconds
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._queue = FairQueue()
+        # Ids in _queue, so a job found again by the reclaim scan is not queued twice
+        self._queued_ids: Set[str] = set()
+        self._workers: List[asyncio.Task] = []
+        self.running = 0
+        self.submitted = 0
+        self.started = 0
+        self.completed = 0
+        self.failed = 0
+        self.requeued = 0
+        self.reclaimed = 0
+        self.lost_leases = 0
+        self.callback_failures = 0
+        self.total_queue_seconds = 0.0
+        self.max_queue_seconds = 0.0
+        self.total_run_seconds = 0.0
+        self._started_at = time.monotonic()
+
+    async def start(self):
+        if settings.ROADMAP_JOB_RECOVERY:
+            await self.jobs.requeue_interrupted()
+        for job_id, user_id, priority in await self.jobs.queued():
+            self._put(job_id, user_id, priority)
+            self.requeued += 1
+        self._workers = [asyncio.create_task(self._work()) for _ in range(self.worker_count)]
+        self._workers.append(asyncio.create_task(self._reclaim()))
+
+    async def close(self):
+        # Interrupted jobs stay "running" in the store until the next start, or until
+        # their lease lapses and a worker process that is still up reclaims them
+        for worker in self._workers:
+            worker.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+
+    async def submit(self, params: Dict[str, Any], priority: int = 0, callback_url: Optional[str] = None) -> str:
+        """Record a job and queue it; params are generate_roadmap keyword arguments.
+
+        priority is clamped to 0..ROADMAP_JOB_MAX_PRIORITY, and callback_url
+        should have passed check_callback_url.
+        """
+        priority = min(max(priority, 0), settings.ROADMAP_JOB_MAX_PRIORITY)
+        job_id = uuid.uuid4().hex
+        user_id = params.get("user_id")
+        await self.jobs.create(job_id, user_id, priority, params, callback_url)
+        self._put(job_id, user_id, priority)
+        self.submitted += 1
+        return job_id
+
+    def _put(self, job_id: str, user_id: Optional[str], priority: int):
+        if job_id not in self._queued_ids:
+            self._queued_ids.add(job_id)
+            self._queue.put(job_id, user_id, priority)
+
+    async def _reclaim(self):
+        """Queue the jobs of worker processes that stopped, every lease period"""
+        while True:
+            await asyncio.sleep(self.lease_seconds)
+            try:
+                for job_id, user_id, priority in await self.jobs.reclaimable(self.lease_seconds):
+                    if job_id not in self._queued_ids:
+                        self._put(job_id, user_id, priority)
+                        self.reclaimed += 1
+            except Exception as e:
+                logger.warning("Roadmap job reclaim scan failed", extra={"error": str(e)})
+
+    async def _keep_lease(self, job_id: str):
+        """Renew the lease on a running job until it is lost to another worker"""
+        while True:
+            await asyncio.sleep(self.lease_seconds / 3)
+            try:
+                renewed = await self.jobs.renew_lease(job_id, self.owner, self.lease_seconds)
+            except Exception as e:
+                # A busy database is retried at the next renewal, before the lease runs out
+                logger.warning("Roadmap job lease renewal failed", extra={"job_id": job_id, "error": str(e)})
+                continue
+            if not renewed:
+                self._lost_lease(job_id)
+                return
+
+    async def _work(self):
+        while True:
+            job_id = await self._queue.get()
+            self._queued_ids.discard(job_id)
+            job = await self.jobs.load(job_id)
+            if job is None or not await self.jobs.claim(job_id, self.owner, self.lease_seconds):
+                continue
+
+            wait = max(0.0, time.time() - job["created_at"])
+            self.total_queue_seconds += wait
+            self.max_queue_seconds = max(self.max_queue_seconds, wait)
+            self.started += 1
+            self.running += 1
+            started = time.monotonic()
+            run = asyncio.ensure_future(self._run(job_id, job))
+            lease = asyncio.ensure_future(self._keep_lease(job_id))
+            try:
+                await asyncio.wait({run, lease}, return_when=asyncio.FIRST_COMPLETED)
+            finally:
+                # The run stops early when its lease was lost, or the queue is closing
+                lease.cancel()
+                run.cancel()
+                await asyncio.gather(run, lease, return_exceptions=True)
+                self.running -= 1
+                self.total_run_seconds += time.monotonic() - started
+
+    async def _run(self, job_id: str, job: Dict[str, Any]):
+        try:
+            roadmap = await self.generator.generate_roadmap(**job["params"])
+            # Only the lease holder stores the roadmap; a reclaimed job is finished by its new owner
+            if not await self.jobs.renew_lease(job_id, self.owner, self.lease_seconds):
+                self._lost_lease(job_id)
+                return
+            if roadmap.user_id:
+                await self.roadmaps.save(roadmap)
+            if not await self.jobs.mark_done(job_id, self.owner, roadmap):
+                self._lost_lease(job_id)
+                return
+            self.completed += 1
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error("Roadmap job failed", extra={"job_id": job_id, "error": str(e)})
+            if not await self.jobs.mark_failed(job_id, self.owner, str(e)):
+                self._lost_lease(job_id)
+                return
+            self.failed += 1
+
+        if job["callback_url"]:
+            await self._notify(job_id, job["callback_url"])
+
+    def _lost_lease(self, job_id: str):
+        logger.warning("Roadmap job lease lost to another worker", extra={"job_id": job_id})
+        self.lost_leases += 1
+
+    async def _notify(self, job_id: str, callback_url: str):
+        """POST the final job status to the client's callback URL, without following redirects"""
+        status = await self.jobs.get(job_id)
+        body = status.model_dump_json(exclude={"result"}).encode("utf-8")
+        request = urllib.request.Request(
+            callback_url, data=body, headers={"Content-Type": "application/json"}, method="POST"
+        )
+        try:
+            # Checked again, as the host may resolve differently than when the job was submitted
+            await check_callback_url(callback_url)
+            await asyncio.to_thread(
+                _callback_opener.open, request, timeout=settings.ROADMAP_JOB_CALLBACK_TIMEOUT
+            )
+        except Exception as e:
+            logger.warning("Roadmap job callback failed", extra={"job_id": job_id, "error": str(e)})
+            self.callback_failures += 1
+
+    def stats(self) -> Dict[str, Any]:
+        finished = self.completed + self.failed
+        elapsed_minutes = (time.monotonic() - self._started_at) / 60
+        return {
+            "workers": self.worker_count,
+            "queued": len(self._queue),
+            "running": self.running,
+            "submitted": self.submitted,
+            "completed": self.completed,
+            "failed": self.failed,
+            "requeued": self.requeued,
+            "reclaimed": self.reclaimed,
+            "lost_leases": self.lost_leases,
+            "callback_failures": self.callback_failures,
+            "avg_queue_seconds": round(self.total_queue_seconds / self.started, 3) if self.started else 0.0,
+            "max_queue_seconds": round(self.max_queue_seconds, 3),
+            "avg_run_seconds": round(self.total_run_seconds / finished, 3) if finished else 0.0,
+            "jobs_per_minute": round(finished / elapsed_minutes, 2) if elapsed_minutes else 0.0,
+        }
+
+def get_roadmap_jobs(request: Request) -> RoadmapJobQueue:
+    """Dependency returning the process-wide job queue started in the app lifespan"""
+    return request.app.state.roadmap_jobs
@@ -0,0 +1,122 @@
+import asyncio
+from fastapi import Depends
+from typing import Any, AsyncIterator, Dict, List, Union
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.persona import PersonaResult
+from app.models.survey import SurveySubmission
+from app.services.career_matcher import CareerMatcherService
+from app.services.persona_detector import PersonaDetectorService
+
+class SurveyBatchService:
+    """Scores a whole cohort of survey submissions at once.
+
+    Identical answer sets are scored once, unique ones go to the detector in
+    chunks that pack several respondents per prompt, and results are yielded
+    in input order as soon as every earlier item is resolved.
+    """
+    def __init__(
+        self,
+        persona_detector: PersonaDetectorService = Depends(),
+        career_matcher: CareerMatcherService = Depends()
+    ):
+        self.persona_detector = persona_detector
+        self.career_matcher = career_matcher
+
+    async def stream(self, items: List[Union[SurveySubmission, Exception]]) -> AsyncIterator[Dict[str, Any]]:
+        """Yield result/error events in input order, a progress event per chunk, then a summary.
+
+        Items that are exceptions (e.g. failed validation) are reported as errors at their index.
+        """
+        total = len(items)
+        outcomes: List[Any] = [None] * total
+        groups: Dict[str, List[int]] = {}
+        for index, item in enumerate(items):
+            if isinstance(item, Exception):
+                outcomes[index] = item
+            else:
+                groups.setdefault(self.persona_detector.cache_key(item.responses), []).append(index)
+
+        keys = list(groups)
+        size = max(1, settings.SURVEY_BATCH_CHUNK_SIZE)
+        semaphore = asyncio.Semaphore(settings.SURVEY_BATCH_CONCURRENCY)
+
+        async def score_chunk(chunk: List[str]):
+            try:
+                async with semaphore:
+                    personas = await self.persona_detector.detect_personas(
+                        [items[groups[key][0]].responses for key in chunk]
+                    )
+                    careers = await asyncio.gather(
+                        *(self._match(persona) for persona in personas), return_exceptions=True
+                    )
+                chunk_outcomes = [
+                    persona if isinstance(persona, Exception)
+                    else matches if isinstance(matches, Exception)
+                    else (persona, matches)
+                    for persona, matches in zip(personas, careers)
+                ]
+            except Exception as e:
+                chunk_outcomes = [e] * len(chunk)
+
+            for key, outcome in zip(chunk, chunk_outcomes):
+                for index in groups[key]:
+                    outcomes[index] = outcome
+
+        tasks = [
+            asyncio.create_task(score_chunk(keys[start:start + size]))
+            for start in range(0, len(keys), size)
+        ]
+        succeeded = failed = emitted = 0
+        try:
+            pending = iter(asyncio.as_completed(tasks))
+            while True:
+                # Flush everything resolved in order, then wait for the next chunk
+                while emitted < total and outcomes[emitted] is not None:
+                    outcome = outcomes[emitted]
+                    if not isinstance(outcome, Exception):
+                        try:
+                            outcome = self._result(items[emitted], *outcome)
+                        except (KeyError, ValueError) as e:
+                            outcome = e
+                    if isinstance(outcome, Exception):
+                        failed += 1
+                        yield {"type": "error", "index": emitted, "detail": str(outcome)}
+                    else:
+                        succeeded += 1
+                        yield {"type": "result", "index": emitted, "data": outcome}
+                    emitted += 1
+                yield {"type": "progress", "completed": emitted, "total": total}
+
+                try:
+                    await next(pending)
+                except StopIteration:
+                    break
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        yield {
+            "type": "summary",
+            "total": total,
+            "unique": len(keys),
+            "succeeded": succeeded,
+            "failed": failed,
+        }
+
+    async def _match(self, persona: Any) -> Any:
+        if isinstance(persona, Exception):
+            return persona
+        return await self.career_matcher.match_careers(persona)
+
+    @staticmethod
+    def _result(submission: SurveySubmission, persona: Dict[str, Any], careers: List[Any]) -> PersonaResult:
+        with metrics.stage("model_build"):
+            return PersonaResult(
+                user_id=submission.user_id,
+                primary_persona=persona["primary"],
+                secondary_persona=persona.get("secondary"),
+                career_matches=careers,
+                analysis=persona["analysis"]
+            )
@@ -0,0 +1,75 @@
+import asyncio
+from fastapi import Depends
+from typing import List, Dict, Any, Tuple
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.persona import PersonaResult
+from app.models.survey import SurveySubmission, SurveyResponse
+from app.services.career_matcher import CareerMatcherService
+from app.services.persona_detector import PersonaDetectorService
+
+def _archetypes(persona: Dict[str, Any]) -> Tuple[str, str]:
+    secondary = persona.get("secondary") or {}
+    return (
+        persona["primary"]["type"].strip().lower(),
+        str(secondary.get("type", "")).strip().lower(),
+    )
+
+class SurveyPipelineService:
+    def __init__(
+        self,
+        persona_detector: PersonaDetectorService = Depends(),
+        career_matcher: CareerMatcherService = Depends()
+    ):
+        self.persona_detector = persona_detector
+        self.career_matcher = career_matcher
+
+    async def submit(self, submission: SurveySubmission, mode: str = None) -> PersonaResult:
+        """Detect the persona and match careers for a survey submission"""
+        mode = mode or settings.SURVEY_PIPELINE_MODE
+        if mode == "sequential":
+            persona, careers = await self._run_sequential(submission.responses)
+        else:
+            persona, careers = await self._run_pipelined(submission.responses)
+
+        with metrics.stage("model_build"):
+            return PersonaResult(
+                user_id=submission.user_id,
+                primary_persona=persona["primary"],
+                secondary_persona=persona.get("secondary"),
+                career_matches=careers,
+                analysis=persona["analysis"]
+            )
+
+    async def _run_sequential(self, responses: List[SurveyResponse]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        persona = await self.persona_detector.detect_persona(responses)
+        careers = await self.career_matcher.match_careers(persona)
+        return persona, careers
+
+    async def _run_pipelined(self, responses: List[SurveyResponse]) -> Tuple[Dict[str, Any], List[Dict[str, Any]]]:
+        """Start career matching for the locally predicted persona while detection runs"""
+        predicted = self.persona_detector.predict_persona(responses)
+        if predicted is None:
+            return await self._run_sequential(responses)
+
+        speculative = asyncio.create_task(self.career_matcher.match_careers(predicted))
+        try:
+            persona = await self.persona_detector.detect_persona(responses)
+        except BaseException:
+            await self._discard(speculative)
+            raise
+
+        # Keep the speculative careers only if the prediction held
+        if _archetypes(predicted) == _archetypes(persona):
+            return persona, await speculative
+
+        await self._discard(speculative)
+        careers = await self.career_matcher.match_careers(persona)
+        return persona, careers
+
+    @staticmethod
+    async def _discard(speculative: asyncio.Task):
+        """Cancel a speculative match and wait for it, so it can't outlive the request or leave an unretrieved error"""
+        speculative.cancel()
+        await asyncio.gather(speculative, return_exceptions=True)
@@ -0,0 +1,235 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+from app.core.config import settings
+
+def make_cache_key(*parts: Any) -> str:
+    """Stable sha256 over a canonical JSON encoding of the given parts"""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+def sqlite_path_from_url(url: str) -> Optional[str]:
+    """Extract the file path from a sqlite:/// URL, or None for other databases"""
+    prefix = "sqlite:///"
+    if not url.startswith(prefix):
+        return None
+    return url[len(prefix):] or None
+
+class LRUCache:
+    """In-memory LRU cache with an optional per-entry TTL"""
+    def __init__(self, max_size: int = 1024, ttl: Optional[float] = None):
+        self.max_size = max(1, max_size)
+        self.ttl = ttl
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        entry = self._entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= time.monotonic():
+            del self._entries[key]
+            self.expirations += 1
+            self.misses += 1
+            return None
+
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        self._entries[key] = (value, expires_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_size:
+            self._entries.popitem(last=False)
+            self.evictions += 1
+
+    def delete(self, key: str):
+        self._entries.pop(key, None)
+
+    def clear(self):
+        self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+            "expirations": self.expirations,
+        }
+
+class SQLiteCache:
+    """Persistent JSON cache stored in a SQLite table, partitioned by namespace.
+
+    With max_entries set, the least recently used entries of the namespace
+    are evicted once it grows past that size.
+    """
+    def __init__(self, path: str, namespace: str, ttl: Optional[float] = None, max_entries: Optional[int] = None):
+        self.namespace = namespace
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS cache_entries (
+                namespace TEXT NOT NULL,
+                key TEXT NOT NULL,
+                value TEXT NOT NULL,
+                expires_at REAL,
+                accessed_at REAL,
+                PRIMARY KEY (namespace, key)
+            )
+            """
+        )
+        columns = {row[1] for row in self._conn.execute("PRAGMA table_info(cache_entries)")}
+        if "accessed_at" not in columns:
+            # Tables created before size-bounded eviction existed
+            self._conn.execute("ALTER TABLE cache_entries ADD COLUMN accessed_at REAL")
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS ix_cache_entries_accessed ON cache_entries (namespace, accessed_at)"
+        )
+        self._conn.commit()
+        self.hits = 0
+        self.misses = 0
+        self.expirations = 0
+        self.evictions = 0
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, expires_at FROM cache_entries WHERE namespace = ? AND key = ?",
+                (self.namespace, key),
+            ).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+
+            value, expires_at = row
+            if expires_at is not None and expires_at <= time.time():
+                self._conn.execute(
+                    "DELETE FROM cache_entries WHERE namespace = ? AND key = ?",
+                    (self.namespace, key),
+                )
+                self._conn.commit()
+                self.expirations += 1
+                self.misses += 1
+                return None
+
+            if self.max_entries:
+                self._conn.execute(
+                    "UPDATE cache_entries SET accessed_at = ? WHERE namespace = ? AND key = ?",
+                    (time.time(), self.namespace, key),
+                )
+                self._conn.commit()
+
+        self.hits += 1
+        return json.loads(value)
+
+    def _set(self, key: str, value: Any):
+        now = time.time()
+        expires_at = now + self.ttl if self.ttl else None
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache_entries (namespace, key, value, expires_at, accessed_at) VALUES (?, ?, ?, ?, ?)",
+                (self.namespace, key, json.dumps(value), expires_at, now),
+            )
+            if self.max_entries:
+                cursor = self._conn.execute(
+                    """
+                    DELETE FROM cache_entries WHERE namespace = ? AND key NOT IN (
+                        SELECT key FROM cache_entries WHERE namespace = ?
+                        ORDER BY accessed_at DESC LIMIT ?
+                    )
+                    """,
+                    (self.namespace, self.namespace, self.max_entries),
+                )
+                self.evictions += cursor.rowcount
+            self._conn.commit()
+
+    def _clear(self):
+        with self._lock:
+            self._conn.execute("DELETE FROM cache_entries WHERE namespace = ?", (self.namespace,))
+            self._conn.commit()
+
+    async def get(self, key: str) -> Optional[Any]:
+        return await asyncio.to_thread(self._get, key)
+
+    async def set(self, key: str, value: Any):
+        await asyncio.to_thread(self._set, key, value)
+
+    async def clear(self):
+        await asyncio.to_thread(self._clear)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "expirations": self.expirations,
+            "evictions": self.evictions,
+        }
+
+class TieredCache:
+    """Memory LRU in front of an optional persistent SQLite tier"""
+    def __init__(self, memory: LRUCache, persistent: Optional[SQLiteCache] = None):
+        self.memory = memory
+        self.persistent = persistent
+
+    async def get(self, key: str) -> Optional[Any]:
+        value = self.memory.get(key)
+        if value is not None or self.persistent is None:
+            return value
+
+        value = await self.persistent.get(key)
+        if value is not None:
+            # Promote so the next lookup is served from memory
+            self.memory.set(key, value)
+        return value
+
+    async def set(self, key: str, value: Any):
+        self.memory.set(key, value)
+        if self.persistent is not None:
+            await self.persistent.set(key, value)
+
+    async def clear(self):
+        self.memory.clear()
+        if self.persistent is not None:
+            await self.persistent.clear()
+
+    def close(self):
+        if self.persistent is not None:
+            self.persistent.close()
+
+    def stats(self) -> Dict[str, Any]:
+        stats = {"memory": self.memory.stats()}
+        if self.persistent is not None:
+            stats["persistent"] = self.persistent.stats()
+        return stats
+
+def build_tiered_cache(namespace: str, max_size: int, ttl: Optional[float] = None, persistent: bool = False, max_entries: Optional[int] = None) -> TieredCache:
+    """Create a tiered cache, adding the SQLite tier when DATABASE_URL points at SQLite"""
+    persistent_tier = None
+    if persistent:
+        path = sqlite_path_from_url(settings.DATABASE_URL)
+        if path:
+            persistent_tier = SQLiteCache(path, namespace, ttl, max_entries)
+    return TieredCache(LRUCache(max_size, ttl), persistent_tier)
@@ -1,21 +1,131 @@
+import asyncio
 import json
-import re
-import google.generativeai as genai
-from typing import Dict, Any
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from fastapi import Request
+from typing import Dict, Any, AsyncIterator, Callable, Iterable, Optional
 
 from app.core.config import settings
+from app.core.metrics import metrics
+from app.utils.cache import make_cache_key
+from app.utils.json_parser import IncompleteJSONError, parse_model_json
+from app.utils.model_backends import create_model_backend
+from app.utils.response_schema import response_schema
+from app.utils.resilience import (
+    CircuitBreaker, RateLimiter, RateLimitedError, RetryPolicy, UpstreamError,
+    estimate_tokens, is_retryable, is_throttle
+)
+from app.utils.shared_state import SharedRateLimiter, create_shared_single_flight, open_shared_store
+from app.utils.single_flight import SingleFlight
+
+logger = logging.getLogger(__name__)
+
+def _usage_tokens(response: Any, prompt: str, text: str) -> tuple:
+    """(prompt, output) token counts, from the response usage metadata when the SDK provides it"""
+    usage = getattr(response, "usage_metadata", None)
+    prompt_tokens = getattr(usage, "prompt_token_count", None)
+    output_tokens = getattr(usage, "candidates_token_count", None)
+    return (
+        prompt_tokens if prompt_tokens is not None else estimate_tokens(prompt),
+        output_tokens if output_tokens is not None else estimate_tokens(text),
+    )
+
+def _hit_token_limit(response: Any) -> bool:
+    """Whether the model stopped because it reached max_output_tokens"""
+    candidates = getattr(response, "candidates", None) or []
+    reason = getattr(candidates[0], "finish_reason", None) if candidates else None
+    # The SDK reports an enum; older versions a bare int (2 is MAX_TOKENS)
+    return getattr(reason, "name", reason) in ("MAX_TOKENS", 2)
+
+class GenerationPool:
+    """Bounded thread pool that runs blocking model calls off the event loop"""
+    def __init__(self, max_concurrency: int):
+        self.max_concurrency = max(1, max_concurrency)
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix="gemini"
+        )
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        self._in_flight = 0
+        self._queued = 0
+
+    async def run(self, func: Callable, *args) -> Any:
+        """Run func(*args) in the pool once a concurrency slot is free"""
+        self._queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+
+        self._in_flight += 1
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(self._executor, func, *args)
+        finally:
+            self._in_flight -= 1
+            self._semaphore.release()
+
+    async def stream(self, func: Callable[..., Iterable], *args) -> AsyncIterator[Any]:
+        """Iterate a blocking iterable produced by func(*args) in the pool"""
+        self._queued += 1
+        try:
+            await self._semaphore.acquire()
+        finally:
+            self._queued -= 1
+
+        self._in_flight += 1
+        loop = asyncio.get_running_loop()
+        queue: asyncio.Queue = asyncio.Queue()
+        stopped = threading.Event()
+        end = object()
+
+        def produce():
+            try:
+                for item in func(*args):
+                    if stopped.is_set():
+                        break
+                    loop.call_soon_threadsafe(queue.put_nowait, (item, None))
+                loop.call_soon_threadsafe(queue.put_nowait, (end, None))
+            except BaseException as e:
+                loop.call_soon_threadsafe(queue.put_nowait, (end, e))
+
+        def release(_):
+            self._in_flight -= 1
+            self._semaphore.release()
+
+        # The slot is held until the worker thread exits, even if the consumer stops early
+        future = loop.run_in_executor(self._executor, produce)
+        future.add_done_callback(release)
+        try:
+            while True:
+                item, error = await queue.get()
+                if item is end:
+                    if error is not None:
+                        raise error
+                    return
+                yield item
+        finally:
+            stopped.set()
+
+    def stats(self) -> Dict[str, int]:
+        """Current number of running and waiting calls"""
+        return {
+            "in_flight": self._in_flight,
+            "queued": self._queued,
+            "max_concurrency": self.max_concurrency,
+        }
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
 
 class GeminiClient:
     def __init__(self):
-        # Configure the Gemini client
-        genai.configure(api_key=settings.GEMINI_API_KEY)
-        
         # Configure the model with structured output
         generation_config = {
             "temperature": 0.2,
             "top_p": 0.95,
             "top_k": 40,
-            "max_output_tokens": 8192,
+            "max_output_tokens": settings.GEMINI_MAX_OUTPUT_TOKENS,
         }
         
         safety_settings = [
@@ -37,54 +147,211 @@ class GeminiClient:
             },
         ]
         
-        self.model = genai.GenerativeModel(
-            model_name=settings.GEMINI_MODEL,
-            generation_config=generation_config,
-            safety_settings=safety_settings,
+        self.generation_config = generation_config
+        self.structured_output = settings.GEMINI_STRUCTURED_OUTPUT
+        # The real Gemini model, or an offline fake selected by GEMINI_BACKEND
+        self.model = create_model_backend(generation_config, safety_settings)
+
+        # One pool per client; the app creates a single client per process
+        self.pool = GenerationPool(settings.GEMINI_MAX_CONCURRENCY)
+        
+        # Quota awareness and failure handling around every upstream call; with
+        # SHARED_STATE_PATH the quota is shared by all worker processes
+        self.shared_store = open_shared_store()
+        if self.shared_store is None:
+            self.limiter = RateLimiter(settings.GEMINI_REQUESTS_PER_MINUTE, settings.GEMINI_TOKENS_PER_MINUTE)
+        else:
+            self.limiter = SharedRateLimiter(
+                self.shared_store, settings.GEMINI_REQUESTS_PER_MINUTE, settings.GEMINI_TOKENS_PER_MINUTE
+            )
+        self.retry_policy = RetryPolicy(
+            settings.GEMINI_MAX_RETRIES, settings.GEMINI_RETRY_BASE_DELAY, settings.GEMINI_RETRY_MAX_DELAY
+        )
+        self.breaker = CircuitBreaker(
+            settings.GEMINI_BREAKER_FAILURE_THRESHOLD, settings.GEMINI_BREAKER_RESET_SECONDS
         )
         
-    async def generate_content(self, prompt: str) -> Dict[str, Any]:
-        """Generate content using Gemini AI"""
+        # Identical prompts in flight at the same time share one upstream call,
+        # across processes too in shared mode; finished calls are not cached
+        if self.shared_store is None:
+            self.single_flight = SingleFlight()
+        else:
+            self.single_flight = create_shared_single_flight(self.shared_store)
+
+    def close(self):
+        """Release the worker threads backing this client"""
+        self.pool.shutdown()
+        if self.shared_store is not None:
+            self.shared_store.close()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "pool": self.pool.stats(),
+            "limiter": self.limiter.stats(),
+            "retry": self.retry_policy.stats(),
+            "breaker": self.breaker.stats(),
+            "single_flight": self.single_flight.stats(),
+        }
+
+    def _call_config(self, output_type: Any, max_output_tokens: Optional[int] = None) -> Optional[Dict[str, Any]]:
+        """Per-call generation config: the output cap, and the response schema for output_type in structured mode"""
+        config: Dict[str, Any] = {}
+        if max_output_tokens:
+            config["max_output_tokens"] = max_output_tokens
+        if self.structured_output and output_type is not None:
+            config.update(response_mime_type="application/json", response_schema=response_schema(output_type))
+        return config or None
+
+    def _record_error(self, error: Exception):
+        """Feed an upstream error to the breaker and limiter"""
+        if is_throttle(error):
+            # Quota errors slow the limiter down; they don't mean the upstream is down
+            self.limiter.on_throttled()
+            self.breaker.release()
+        elif is_retryable(error):
+            self.breaker.record_failure()
+        else:
+            # The upstream answered, it just rejected this request
+            self.breaker.record_success()
+
+    async def _call_model(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> Any:
+        """Call the model under the rate limiter, retrying retryable errors with backoff"""
+        attempt = 0
+        while True:
+            self.breaker.before_call()
+            try:
+                await self.limiter.acquire(estimate_tokens(prompt))
+                with metrics.stage("llm_call"):
+                    response = await self.pool.run(self.model.generate_content, prompt, False, generation_config)
+            except asyncio.CancelledError:
+                self.breaker.release()
+                raise
+            except Exception as e:
+                self._record_error(e)
+                metrics.record_llm_call("error")
+                if not is_retryable(e):
+                    raise
+                if attempt >= self.retry_policy.max_retries:
+                    self.retry_policy.exhausted += 1
+                    if is_throttle(e):
+                        raise RateLimitedError(f"Gemini quota exhausted: {str(e)}")
+                    raise
+                delay = self.retry_policy.delay(attempt)
+                logger.warning(
+                    "Retrying Gemini call", extra={"attempt": attempt + 1, "delay": round(delay, 3), "error": str(e)}
+                )
+                attempt += 1
+                self.retry_policy.retries += 1
+                await asyncio.sleep(delay)
+                continue
+
+            self.breaker.record_success()
+            self.limiter.on_success()
+            metrics.record_llm_call("ok")
+            return response
+        
+    async def stream_text(self, prompt: str, output_type: Any = None, max_output_tokens: Optional[int] = None) -> AsyncIterator[str]:
+        """Stream the raw response text of a prompt chunk by chunk"""
+        generation_config = self._call_config(output_type, max_output_tokens)
+
+        def generate():
+            for chunk in self.model.generate_content(prompt, stream=True, generation_config=generation_config):
+                yield chunk.text
+
+        self.breaker.before_call()
+        output_tokens = 0
         try:
-            response = self.model.generate_content(prompt)
-            
-            # Parse the response as JSON
-            response_text = response.text
-            
-            # Handle potential formatting issues
-            if "```json" in response_text:
-                json_start = response_text.find("```json") + 7
-                json_end = response_text.rfind("```")
-                if json_end > json_start:
-                    response_text = response_text[json_start:json_end].strip()
-            
-            # Sometimes the model includes plain ```
-            elif "```" in response_text:
-                json_start = response_text.find("```") + 3
-                json_end = response_text.rfind("```")
-                if json_end > json_start:
-                    response_text = response_text[json_start:json_end].strip()
-            
-            # Clean the JSON string, removing common issues
-            # Fix trailing commas in arrays and objects
-            clean_text = re.sub(r',\s*}', '}', response_text)
-            clean_text = re.sub(r',\s*\]', ']', clean_text)
-            
-            # Fix missing commas
-            clean_text = re.sub(r'"\s*"', '", "', clean_text)
-            clean_text = re.sub(r'}\s*{', '}, {', clean_text)
-            clean_text = re.sub(r']\s*{', '], {', clean_text)
-            clean_text = re.sub(r'}\s*\[', '}, [', clean_text)
-            
-            # Try to parse the JSON
-            json_data = json.loads(clean_text)
-            return json_data
+            await self.limiter.acquire(estimate_tokens(prompt))
+            async for text in self.pool.stream(generate):
+                tokens = estimate_tokens(text)
+                output_tokens += tokens
+                self.limiter.record_tokens(tokens)
+                yield text
+        except (asyncio.CancelledError, GeneratorExit):
+            self.breaker.release()
+            raise
+        except Exception as e:
+            self._record_error(e)
+            metrics.record_llm_call("error")
+            logger.error("Error streaming content", extra={"error": str(e)})
+            raise Exception(f"Failed to stream content: {str(e)}")
+        else:
+            self.breaker.record_success()
+            self.limiter.on_success()
+            metrics.record_llm_call("ok")
+            metrics.record_tokens(estimate_tokens(prompt), output_tokens)
+
+    async def generate_content(self, prompt: str, output_type: Any = None, max_output_tokens: Optional[int] = None) -> Dict[str, Any]:
+        """Generate content using Gemini AI.
+
+        output_type is the pydantic model or type the JSON should match; in
+        structured-output mode it is sent as the response schema.
+        max_output_tokens caps this call's output below the model-wide limit.
+        """
+        generation_config = self._call_config(output_type, max_output_tokens)
+        key = make_cache_key(prompt, settings.GEMINI_MODEL, self.generation_config, generation_config)
+        return await self.single_flight.do(key, lambda: self._generate_content(prompt, generation_config))
+
+    async def _generate_content(self, prompt: str, generation_config: Optional[Dict[str, Any]] = None) -> Dict[str, Any]:
+        """Call Gemini and parse the JSON response.
+
+        Output cut off by a per-call cap is requested again with double the cap,
+        up to GEMINI_MAX_OUTPUT_TOKENS, rather than returned partially.
+        """
+        response_text = ""
+        try:
+            while True:
+                # The SDK call is blocking, so it runs in the bounded pool
+                response = await self._call_model(prompt, generation_config)
+                
+                # Parse the response as JSON, repairing common model mistakes
+                response_text = response.text
+                prompt_tokens, output_tokens = _usage_tokens(response, prompt, response_text)
+                self.limiter.record_tokens(output_tokens)
+                metrics.record_tokens(prompt_tokens, output_tokens)
+                cap = (generation_config or {}).get("max_output_tokens")
+                can_grow = cap is not None and cap < settings.GEMINI_MAX_OUTPUT_TOKENS
+                try:
+                    if can_grow and _hit_token_limit(response):
+                        raise IncompleteJSONError("Output reached max_output_tokens")
+                    with metrics.stage("json_parse"):
+                        return self._parse(response_text)
+                except IncompleteJSONError:
+                    if not can_grow:
+                        raise
+                metrics.record_parse("truncated")
+                generation_config = dict(generation_config, max_output_tokens=min(settings.GEMINI_MAX_OUTPUT_TOKENS, cap * 2))
+                logger.warning(
+                    "Retrying truncated Gemini response",
+                    extra={"max_output_tokens": cap, "retry_max_output_tokens": generation_config["max_output_tokens"]},
+                )
             
-        except json.JSONDecodeError as e:
-            print(f"JSON parsing error: {str(e)}")
-            print(f"Raw response text: {response_text}")
+        except UpstreamError:
+            raise
+        except ValueError as e:
+            metrics.record_parse("failed")
+            logger.error("JSON parsing error", extra={"error": str(e), "response_text": response_text})
             raise Exception(f"Failed to parse JSON response: {str(e)}")
         except Exception as e:
             # Log the error and return a simplified error response
-            print(f"Error generating content: {str(e)}")
-            raise Exception(f"Failed to generate content: {str(e)}")
\ No newline at end of file
+            logger.error("Error generating content", extra={"error": str(e)})
+            raise Exception(f"Failed to generate content: {str(e)}")
+
+    @staticmethod
+    def _parse(text: str) -> Any:
+        """Plain json.loads for well-formed output, such as schema-constrained responses; repair otherwise.
+
+        Truncated output raises IncompleteJSONError rather than returning a partial value.
+        """
+        try:
+            value = json.loads(text)
+        except json.JSONDecodeError:
+            value = parse_model_json(text, allow_truncated=False)
+            metrics.record_parse("repaired")
+            return value
+        metrics.record_parse("clean")
+        return value
+
+def get_gemini_client(request: Request) -> GeminiClient:
+    """Dependency returning the process-wide client created in the app lifespan"""
+    return request.app.state.gemini_client
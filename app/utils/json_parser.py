@@ -0,0 +1,215 @@
+import json
+import re
+from json.decoder import scanstring
+from typing import Any, Tuple
+
+_decoder = json.JSONDecoder()
+_WHITESPACE = " \t\r\n"
+_NUMBER = re.compile(r"-?(?:0|[1-9]\d*)(?:\.\d+)?(?:[eE][-+]?\d+)?")
+_IDENTIFIER = re.compile(r"[A-Za-z_][A-Za-z0-9_\-]*")
+# What a number cut off by the end of the text can end with, besides digits
+_NUMBER_PREFIX = re.compile(r"-|\.|[eE][-+]?")
+_LITERALS = {
+    "true": True, "false": False, "null": None,
+    "True": True, "False": False, "None": None,
+}
+
+class IncompleteJSONError(ValueError):
+    """The text ended before the JSON value was complete"""
+
+class _Truncated(Exception):
+    def __init__(self, value: Any):
+        self.value = value
+
+class _LenientParser:
+    """Recursive descent JSON parser that tolerates common model output mistakes.
+
+    Accepts trailing, missing or doubled commas, unescaped control characters
+    and single quotes in strings, unquoted keys and Python literals. Containers
+    that are already valid JSON are handed to the C decoder, so well-formed
+    regions cost no more than json.loads.
+    """
+    def __init__(self, text: str, final: bool, allow_truncated: bool):
+        self.text = text
+        self.end = len(text)
+        self.final = final
+        self.allow_truncated = allow_truncated
+
+    def _eof(self, partial: Any = None):
+        if self.final and self.allow_truncated:
+            raise _Truncated(partial)
+        raise IncompleteJSONError("JSON value is incomplete")
+
+    def _skip(self, pos: int, chars: str = _WHITESPACE) -> int:
+        text, end = self.text, self.end
+        while pos < end and text[pos] in chars:
+            pos += 1
+        return pos
+
+    def value(self, pos: int) -> Tuple[Any, int]:
+        pos = self._skip(pos)
+        if pos >= self.end:
+            self._eof()
+
+        char = self.text[pos]
+        if char in "{[":
+            # Fast path: the whole container is already valid JSON
+            try:
+                return _decoder.raw_decode(self.text, pos)
+            except json.JSONDecodeError:
+                pass
+            return self.object(pos) if char == "{" else self.array(pos)
+        if char == '"':
+            return self.string(pos)
+        if char == "'":
+            return self.single_quoted_string(pos)
+
+        match = _NUMBER.match(self.text, pos)
+        if match:
+            # A number touching the end of a partial buffer may still grow
+            if match.end() == self.end and not self.final:
+                self._eof()
+            if _NUMBER_PREFIX.fullmatch(self.text, match.end()):
+                self._eof()
+            number = match.group()
+            return (float(number) if any(c in number for c in ".eE") else int(number)), match.end()
+
+        if _NUMBER_PREFIX.fullmatch(self.text, pos):
+            self._eof()
+
+        match = _IDENTIFIER.match(self.text, pos)
+        if match and match.group() in _LITERALS:
+            return _LITERALS[match.group()], match.end()
+        if match and match.end() == self.end:
+            self._eof()
+
+        raise ValueError(f"Unexpected character {char!r} at position {pos}")
+
+    def object(self, pos: int) -> Tuple[dict, int]:
+        result = {}
+        pos += 1
+        while True:
+            # Commas are optional separators, which also absorbs trailing ones
+            pos = self._skip(pos, _WHITESPACE + ",")
+            if pos >= self.end:
+                self._eof(result)
+            if self.text[pos] == "}":
+                return result, pos + 1
+
+            key = None
+            try:
+                key, pos = self.key(pos)
+                pos = self._skip(pos)
+                if pos >= self.end:
+                    self._eof()
+                if self.text[pos] == ":":
+                    pos += 1
+                result[key], pos = self.value(pos)
+            except _Truncated as truncated:
+                # Keep partially received containers, drop cut-off scalars
+                if key is not None and isinstance(truncated.value, (dict, list)):
+                    result[key] = truncated.value
+                raise _Truncated(result)
+
+    def array(self, pos: int) -> Tuple[list, int]:
+        result = []
+        pos += 1
+        while True:
+            pos = self._skip(pos, _WHITESPACE + ",")
+            if pos >= self.end:
+                self._eof(result)
+            if self.text[pos] == "]":
+                return result, pos + 1
+
+            try:
+                item, pos = self.value(pos)
+            except _Truncated:
+                # A cut-off element is dropped; the completed ones are kept
+                raise _Truncated(result)
+            result.append(item)
+
+    def key(self, pos: int) -> Tuple[str, int]:
+        char = self.text[pos]
+        if char == '"':
+            return self.string(pos)
+        if char == "'":
+            return self.single_quoted_string(pos)
+        match = _IDENTIFIER.match(self.text, pos)
+        if not match:
+            raise ValueError(f"Expected an object key at position {pos}")
+        if match.end() == self.end:
+            self._eof()
+        return match.group(), match.end()
+
+    def string(self, pos: int) -> Tuple[str, int]:
+        try:
+            # strict=False lets raw newlines and tabs through unchanged
+            return scanstring(self.text, pos + 1, False)
+        except json.JSONDecodeError as e:
+            # An escape cut off by the end of the text; a surrogate pair takes 12 characters
+            if e.msg.startswith("Unterminated string") or (
+                e.msg.startswith("Invalid \\uXXXX escape") and e.pos + 12 >= self.end
+            ):
+                self._eof()
+            raise
+
+    def single_quoted_string(self, pos: int) -> Tuple[str, int]:
+        chars = []
+        pos += 1
+        while pos < self.end:
+            char = self.text[pos]
+            if char == "\\" and pos + 1 < self.end:
+                chars.append(self.text[pos:pos + 2])
+                pos += 2
+                continue
+            if char == "'":
+                # Reuse the JSON unescaping rules for the collected body
+                body = "".join(chars).replace('"', '\\"').replace("\\'", "'")
+                return scanstring(body + '"', 0, False)[0], pos + 1
+            chars.append(char)
+            pos += 1
+        self._eof()
+
+def extract_json_text(text: str) -> str:
+    """Strip markdown code fences and any prose around the JSON payload"""
+    fence = text.find("```")
+    if fence >= 0:
+        body_start = text.find("\n", fence)
+        body_end = text.rfind("```")
+        if body_start >= 0 and body_end > body_start:
+            text = text[body_start + 1:body_end]
+
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if not starts:
+        return text.strip()
+    return text[min(starts):].strip()
+
+def decode_value(text: str, pos: int = 0, final: bool = True, allow_truncated: bool = False) -> Tuple[Any, int]:
+    """Leniently decode one JSON value starting at pos and return it with its end index.
+
+    With final=False a value running into the end of text raises
+    IncompleteJSONError, so callers can wait for more streamed input.
+    """
+    parser = _LenientParser(text, final, allow_truncated)
+    try:
+        return parser.value(pos)
+    except _Truncated as truncated:
+        return truncated.value, len(text)
+
+def parse_model_json(text: str, allow_truncated: bool = False) -> Any:
+    """Parse fenced or unfenced model output, repairing common JSON mistakes in one pass.
+
+    Valid JSON goes straight through json.loads. Output cut off by the token
+    limit raises IncompleteJSONError, unless allow_truncated opts into keeping
+    every element that was fully written.
+    """
+    json_text = extract_json_text(text)
+    if not json_text:
+        raise ValueError("Model output contains no JSON")
+    try:
+        return json.loads(json_text)
+    except json.JSONDecodeError:
+        pass
+
+    value, _ = decode_value(json_text, allow_truncated=allow_truncated)
+    return value
@@ -0,0 +1,124 @@
+from typing import Any, Iterable, List, Tuple
+
+from app.utils.json_parser import IncompleteJSONError, decode_value
+
+_WHITESPACE = " \t\r\n"
+
+class JsonStreamScanner:
+    """Incrementally scan a streamed JSON object and emit its members as they complete.
+
+    Top-level members are emitted as (key, value). Members whose key is in
+    stream_arrays are emitted element by element as (key, element) instead, so
+    callers can act on each item of a long array before the response finishes.
+    A top-level array is streamed element by element with a key of None.
+    Values are decoded with the lenient parser, so model mistakes such as
+    missing or trailing commas do not stall the stream. Consumed text is
+    dropped, so only the value currently being read is buffered.
+    """
+    def __init__(self, stream_arrays: Iterable[str] = ()):
+        self.stream_arrays = set(stream_arrays)
+        self.finished = False
+        self._buffer = ""
+        self._pos = 0
+        self._phase = "start"
+        self._key = None
+
+    def feed(self, text: str) -> List[Tuple[str, Any]]:
+        """Add a chunk of model output and return the members completed by it"""
+        if self.finished:
+            return []
+        self._buffer += text
+        events = []
+        while self._step(events):
+            pass
+
+        # Drop the consumed prefix so memory stays bounded by one value
+        self._buffer = self._buffer[self._pos:]
+        self._pos = 0
+        return events
+
+    def close(self):
+        """Signal the end of the stream; raises if the object was never completed"""
+        if not self.finished:
+            raise ValueError("Model output ended before the JSON object was complete")
+
+    def _skip(self, chars: str) -> bool:
+        """Advance past the given characters; False if the buffer ran out"""
+        while self._pos < len(self._buffer) and self._buffer[self._pos] in chars:
+            self._pos += 1
+        return self._pos < len(self._buffer)
+
+    def _decode(self) -> Tuple[bool, Any]:
+        """Decode one value at the current position if it is complete"""
+        try:
+            value, end = decode_value(self._buffer, self._pos, final=False)
+        except IncompleteJSONError:
+            return False, None
+
+        self._pos = end
+        return True, value
+
+    def _step(self, events: List[Tuple[str, Any]]) -> bool:
+        if self._phase == "start":
+            starts = [
+                index for index in (self._buffer.find("{", self._pos), self._buffer.find("[", self._pos))
+                if index >= 0
+            ]
+            if not starts:
+                self._pos = len(self._buffer)
+                return False
+            self._pos = min(starts)
+            self._phase = "key" if self._buffer[self._pos] == "{" else "array"
+            self._pos += 1
+            return True
+
+        if self._phase == "key":
+            if not self._skip(_WHITESPACE + ","):
+                return False
+            if self._buffer[self._pos] == "}":
+                self._pos += 1
+                self.finished = True
+                return False
+            complete, key = self._decode()
+            if not complete:
+                return False
+            self._key = key
+            self._phase = "colon"
+            return True
+
+        if self._phase == "colon":
+            if not self._skip(_WHITESPACE + ":"):
+                return False
+            if self._key in self.stream_arrays and self._buffer[self._pos] == "[":
+                self._pos += 1
+                self._phase = "array"
+            else:
+                self._phase = "value"
+            return True
+
+        if self._phase == "value":
+            complete, value = self._decode()
+            if not complete:
+                return False
+            events.append((self._key, value))
+            self._phase = "key"
+            return True
+
+        if self._phase == "array":
+            if not self._skip(_WHITESPACE + ","):
+                return False
+            if self._buffer[self._pos] == "]":
+                self._pos += 1
+                if self._key is None:
+                    # End of a top-level array
+                    self.finished = True
+                    return False
+                self._phase = "key"
+                return True
+            complete, element = self._decode()
+            if not complete:
+                return False
+            events.append((self._key, element))
+            return True
+
+        return False
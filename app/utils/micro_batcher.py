@@ -0,0 +1,79 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+class MicroBatcher:
+    """Collect items submitted within a short window and process them with one batch call.
+
+    The handler receives the items in arrival order and returns one result
+    per item; a result that is an exception is raised to that item's caller
+    only. A batch is sent when the window closes or max_batch items are waiting.
+    """
+    def __init__(self, handler: Callable[[List[Any]], Awaitable[List[Any]]], window: float, max_batch: int):
+        self.handler = handler
+        self.window = window
+        self.max_batch = max(1, max_batch)
+        self._pending: List[Tuple[Any, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._tasks = set()
+        self.batches = 0
+        self.items = 0
+
+    async def submit(self, item: Any) -> Any:
+        future = asyncio.get_running_loop().create_future()
+        self._pending.append((item, future))
+        if len(self._pending) >= self.max_batch:
+            self._flush()
+        elif self._timer is None:
+            self._timer = asyncio.get_running_loop().call_later(self.window, self._flush)
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        # Callers that gave up while waiting are left out of the batch
+        batch = [(item, future) for item, future in self._pending if not future.done()]
+        self._pending = []
+        if not batch:
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        task = asyncio.ensure_future(self._run(batch))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _run(self, batch: List[Tuple[Any, asyncio.Future]]):
+        try:
+            results = await self.handler([item for item, _ in batch])
+        except Exception as e:
+            results = [e] * len(batch)
+
+        for (_, future), result in zip(batch, results):
+            if future.done():
+                continue
+            if isinstance(result, Exception):
+                future.set_exception(result)
+            else:
+                future.set_result(result)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "waiting": len(self._pending),
+        }
+
+def index_packed_items(response: Any) -> Dict[int, Dict[str, Any]]:
+    """Index the entries of an id-tagged JSON array output by their integer id.
+
+    Also accepts the array wrapped in an object; entries without a usable id are dropped.
+    """
+    if isinstance(response, dict):
+        response = next((value for value in response.values() if isinstance(value, list)), [])
+    items = {}
+    for item in response if isinstance(response, list) else []:
+        if isinstance(item, dict) and str(item.get("id", "")).strip().isdigit():
+            items[int(str(item["id"]).strip())] = item
+    return items
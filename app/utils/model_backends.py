@@ -0,0 +1,327 @@
+import copy
+import hashlib
+import json
+import random
+import re
+import threading
+import time
+from typing import Any, Dict, Iterator, List, Optional
+
+import google.generativeai as genai
+from google.api_core import exceptions as google_exceptions
+
+from app.core.config import settings
+
+ARCHETYPES = ("analytical", "empathetic", "aggressive", "philosophical")
+TIME_SLOTS = (("08:00", "09:30", "morning"), ("12:00", "13:00", "afternoon"), ("18:00", "19:00", "evening"), ("21:00", "21:30", "night"))
+
+def prompt_hash(prompt: str) -> str:
+    return hashlib.sha256(prompt.encode("utf-8")).hexdigest()
+
+# Formatting mistakes models make when only a prompt example constrains the output
+MISTAKES = (
+    lambda text: "```json\n" + text + "\n```",
+    lambda text: "Here is the requested JSON:\n" + text,
+    lambda text: text.replace("}]", "},]").replace('"]', '",]'),
+    lambda text: text[:int(len(text) * 0.9)],
+    lambda text: "I'm sorry, I can't produce that right now.",
+)
+
+def conform(value: Any, schema: Dict[str, Any]) -> Any:
+    """Project value onto a Gemini response schema, raising ValueError where it can't match"""
+    if value is None:
+        if schema.get("nullable"):
+            return None
+        raise ValueError("null where the schema requires a value")
+
+    kind = schema.get("type")
+    if kind == "object":
+        if not isinstance(value, dict):
+            raise ValueError(f"expected an object, got {type(value).__name__}")
+        properties = schema.get("properties", {})
+        missing = [name for name in schema.get("required", []) if name not in value]
+        if missing:
+            raise ValueError(f"missing required properties {missing}")
+        return {name: conform(value[name], child) for name, child in properties.items() if name in value}
+    if kind == "array":
+        if not isinstance(value, list):
+            raise ValueError(f"expected an array, got {type(value).__name__}")
+        return [conform(item, schema.get("items", {})) for item in value]
+    if kind == "string":
+        if not isinstance(value, str) or ("enum" in schema and value not in schema["enum"]):
+            raise ValueError(f"{value!r} does not match {schema}")
+        return value
+    if kind == "integer" and isinstance(value, int) and not isinstance(value, bool):
+        return value
+    if kind == "number" and isinstance(value, (int, float)) and not isinstance(value, bool):
+        return value
+    if kind == "boolean" and isinstance(value, bool):
+        return value
+    raise ValueError(f"{value!r} does not match {schema}")
+
+class FakeCandidate:
+    def __init__(self, finish_reason: str):
+        self.finish_reason = finish_reason
+
+class FakeResponse:
+    """Quacks like a google.generativeai response: .text, a finish reason and no usage metadata"""
+    def __init__(self, text: str, finish_reason: str = "STOP"):
+        self.text = text
+        self.candidates = [FakeCandidate(finish_reason)]
+        self.usage_metadata = None
+
+class GeminiBackend:
+    """The real model; generate_content(prompt, stream=False, generation_config=None) is the backend interface"""
+    def __init__(self, generation_config: Dict[str, Any], safety_settings: List[Dict[str, str]]):
+        genai.configure(api_key=settings.GEMINI_API_KEY)
+        self.model = genai.GenerativeModel(
+            model_name=settings.GEMINI_MODEL,
+            generation_config=generation_config,
+            safety_settings=safety_settings,
+        )
+
+    def generate_content(self, prompt: str, stream: bool = False, generation_config: Optional[Dict[str, Any]] = None) -> Any:
+        # Per-call settings are merged over the model's; the SDK may rewrite the schema in place
+        return self.model.generate_content(prompt, stream=stream, generation_config=copy.deepcopy(generation_config))
+
+class RecordingBackend:
+    """Wraps a backend and appends every prompt/response pair to a JSONL file for later replay"""
+    def __init__(self, inner: Any, path: str):
+        self.inner = inner
+        self.path = path
+        self._lock = threading.Lock()
+
+    def generate_content(self, prompt: str, stream: bool = False, generation_config: Optional[Dict[str, Any]] = None) -> Any:
+        response = self.inner.generate_content(prompt, stream=stream, generation_config=generation_config)
+        if stream:
+            return response
+        with self._lock, open(self.path, "a", encoding="utf-8") as file:
+            file.write(json.dumps({"prompt_hash": prompt_hash(prompt), "response": response.text}) + "\n")
+        return response
+
+class FakeBackend:
+    """Offline stand-in for Gemini with configurable latency, jitter, error and throttle rates and output size.
+
+    Prompts found in the recordings file (JSONL of prompt_hash/response, as
+    written by RecordingBackend) are replayed; anything else gets a response
+    synthesized from the prompt's shape. Output only depends on the prompt
+    and seed, so runs are repeatable.
+
+    With a response_schema in the generation config the output is made to
+    conform to it, as constrained decoding would; without one, malformed_rate
+    of the responses get the formatting mistakes real models make. Output
+    longer than the config's max_output_tokens is truncated. error_rate of the
+    calls fail with ServiceUnavailable and throttle_rate with ResourceExhausted,
+    the quota error Gemini answers 429 with.
+    """
+    def __init__(
+        self,
+        latency: float = 0.8,
+        jitter: float = 0.2,
+        error_rate: float = 0.0,
+        throttle_rate: float = 0.0,
+        malformed_rate: float = 0.0,
+        output_scale: int = 1,
+        seed: int = 0,
+        recordings_path: Optional[str] = None,
+    ):
+        self.latency = latency
+        self.jitter = jitter
+        self.error_rate = error_rate
+        self.throttle_rate = throttle_rate
+        self.malformed_rate = malformed_rate
+        self.output_scale = max(1, output_scale)
+        self.seed = seed
+        self.recordings = self._load_recordings(recordings_path) if recordings_path else {}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self.calls = 0
+
+    @staticmethod
+    def _load_recordings(path: str) -> Dict[str, str]:
+        recordings = {}
+        with open(path, encoding="utf-8") as file:
+            for line in file:
+                if line.strip():
+                    entry = json.loads(line)
+                    recordings[entry["prompt_hash"]] = entry["response"]
+        return recordings
+
+    def generate_content(self, prompt: str, stream: bool = False, generation_config: Optional[Dict[str, Any]] = None) -> Any:
+        # Runs in a worker thread, so blocking sleeps model upstream latency faithfully
+        with self._lock:
+            self.calls += 1
+            delay = max(0.0, self.latency + self._random.uniform(-self.jitter, self.jitter))
+            failed = self._random.random() < self.error_rate
+            # Only drawn when enabled, so seeded runs without throttling are unchanged
+            throttled = self.throttle_rate > 0 and self._random.random() < self.throttle_rate
+            mistake = self._random.randrange(len(MISTAKES)) if self._random.random() < self.malformed_rate else None
+        if failed:
+            time.sleep(delay / 2)
+            raise google_exceptions.ServiceUnavailable("Fake backend injected failure")
+        if throttled:
+            time.sleep(delay / 2)
+            raise google_exceptions.ResourceExhausted("Fake backend injected quota exhaustion")
+
+        schema = (generation_config or {}).get("response_schema")
+        text = self.recordings.get(prompt_hash(prompt))
+        if schema is not None:
+            value = json.loads(text) if text is not None else self.synthesize(prompt, schema)
+            text = json.dumps(conform(value, schema))
+        else:
+            if text is None:
+                text = json.dumps(self.synthesize(prompt))
+            if mistake is not None:
+                text = MISTAKES[mistake](text)
+        max_output_tokens = (generation_config or {}).get("max_output_tokens")
+        finish_reason = "STOP"
+        if max_output_tokens and len(text) > max_output_tokens * 4:
+            # Output past the cap is cut off mid-document, as the model would stop at it
+            text = text[:max_output_tokens * 4]
+            finish_reason = "MAX_TOKENS"
+        if not stream:
+            time.sleep(delay)
+            return FakeResponse(text, finish_reason)
+        return self._stream(text, delay, finish_reason)
+
+    def _stream(self, text: str, delay: float, finish_reason: str, chunk_size: int = 64) -> Iterator[FakeResponse]:
+        chunks = [text[start:start + chunk_size] for start in range(0, len(text), chunk_size)] or [""]
+        for number, chunk in enumerate(chunks, 1):
+            time.sleep(delay / len(chunks))
+            yield FakeResponse(chunk, finish_reason if number == len(chunks) else "")
+
+    def synthesize(self, prompt: str, schema: Optional[Dict[str, Any]] = None) -> Any:
+        """Build a well-formed response for the kind of prompt, recognised by its wording and schema"""
+        rng = random.Random(f"{self.seed}:{prompt_hash(prompt)}")
+        if schema is not None:
+            # The schema stands in for the JSON example a schema-less prompt carries
+            prompt = prompt + "\n" + json.dumps(schema)
+
+        profiles = [int(number) for number in re.findall(r"Profile (\d+):", prompt)]
+        if profiles:
+            return [{"id": number, "careers": self._careers(rng)} for number in profiles]
+
+        respondents = [int(number) for number in re.findall(r"Respondent (\d+)", prompt)]
+        if respondents and "already known" in prompt:
+            return [{"id": number, "analysis": self._sentence(rng, 6)} for number in respondents]
+        if respondents:
+            return [dict(self._persona(rng), id=number) for number in respondents]
+
+        if "career matches" in prompt:
+            return self._careers(rng)
+
+        match = re.search(r"Create exactly (\d+) months", prompt)
+        if match:
+            return {
+                "overall_goals": self._goals(rng),
+                "months": [
+                    {"month": month, "focus": self._sentence(rng, 1)}
+                    for month in range(1, int(match.group(1)) + 1)
+                ],
+            }
+
+        match = re.search(r"Create weeks (\d+) to (\d+)", prompt)
+        if match:
+            return {"weeks": [self._week(rng, week) for week in range(int(match.group(1)), int(match.group(2)) + 1)]}
+
+        match = re.search(r"Days: (\d+) to (\d+)", prompt)
+        if match:
+            return {"daily_cards": [self._card(rng, day) for day in range(int(match.group(1)), int(match.group(2)) + 1)]}
+
+        match = re.search(r"create (\d+) weeks of content", prompt)
+        if match:
+            return {
+                "overall_goals": self._goals(rng),
+                "weeks": [self._week(rng, week) for week in range(1, int(match.group(1)) + 1)],
+            }
+
+        if '"primary"' in prompt:
+            return self._persona(rng)
+        if '"analysis"' in prompt:
+            return {"analysis": self._sentence(rng, 6)}
+        return {}
+
+    def _sentence(self, rng: random.Random, sentences: int) -> str:
+        words = ("focus", "growth", "practice", "curiosity", "structure", "people", "ideas", "goals", "habits", "skills")
+        return " ".join(
+            " ".join(rng.choice(words) for _ in range(12)).capitalize() + "."
+            for _ in range(sentences * self.output_scale)
+        )
+
+    def _persona(self, rng: random.Random) -> Dict[str, Any]:
+        primary, secondary = rng.sample(ARCHETYPES, 2)
+        return {
+            "primary": {"type": primary, "confidence": round(rng.uniform(0.6, 0.95), 2), "description": self._sentence(rng, 1)},
+            "secondary": {"type": secondary, "confidence": round(rng.uniform(0.3, 0.6), 2), "description": self._sentence(rng, 1)},
+            "analysis": self._sentence(rng, 6),
+        }
+
+    def _careers(self, rng: random.Random) -> List[Dict[str, Any]]:
+        careers = ("Engineer", "Teacher", "Doctor", "Designer", "Researcher", "Manager", "Writer", "Counselor")
+        return [
+            {"career": career, "confidence": round(rng.uniform(0.5, 0.95), 2), "description": self._sentence(rng, 1)}
+            for career in rng.sample(careers, 5)
+        ]
+
+    def _goals(self, rng: random.Random) -> Dict[str, List[str]]:
+        return {
+            "short_term": [self._sentence(rng, 1) for _ in range(3)],
+            "long_term": [self._sentence(rng, 1) for _ in range(3)],
+        }
+
+    def _week(self, rng: random.Random, week: int) -> Dict[str, Any]:
+        return {
+            "week_number": week,
+            "theme": self._sentence(rng, 1),
+            "quests": [
+                {
+                    "task_type": rng.choice(("Learn", "Build", "Reflect", "Collaborate")),
+                    "task_name": self._sentence(rng, 1),
+                    "resources": [{"title": "Resource", "link": f"https://example.com/{week}/{quest}"}],
+                    "time_commitment": "1 hour/day (evening)",
+                    "activity": self._sentence(rng, 2),
+                }
+                for quest in range(2 + self.output_scale)
+            ],
+        }
+
+    def _card(self, rng: random.Random, day: int) -> Dict[str, Any]:
+        return {
+            "day": day,
+            "focus_area": self._sentence(rng, 1),
+            "tasks": [
+                {
+                    "title": self._sentence(rng, 1),
+                    "description": self._sentence(rng, 2),
+                    "start_time": start,
+                    "end_time": end,
+                    "time_slot": slot,
+                    "estimated_time": "60 minutes",
+                    "priority": priority,
+                    "resources": ["https://example.com"],
+                }
+                for priority, (start, end, slot) in enumerate(TIME_SLOTS, start=1)
+            ],
+            "reflection_prompt": self._sentence(rng, 1),
+        }
+
+def create_model_backend(generation_config: Dict[str, Any], safety_settings: List[Dict[str, str]]) -> Any:
+    """Build the backend selected by GEMINI_BACKEND ("gemini" or "fake")"""
+    if settings.GEMINI_BACKEND == "fake":
+        return FakeBackend(
+            latency=settings.FAKE_GEMINI_LATENCY_MS / 1000,
+            jitter=settings.FAKE_GEMINI_JITTER_MS / 1000,
+            error_rate=settings.FAKE_GEMINI_ERROR_RATE,
+            throttle_rate=settings.FAKE_GEMINI_THROTTLE_RATE,
+            malformed_rate=settings.FAKE_GEMINI_MALFORMED_RATE,
+            output_scale=settings.FAKE_GEMINI_OUTPUT_SCALE,
+            seed=settings.FAKE_GEMINI_SEED,
+            recordings_path=settings.FAKE_GEMINI_RECORDINGS or None,
+        )
+    if settings.GEMINI_BACKEND != "gemini":
+        raise ValueError(f"Unknown GEMINI_BACKEND {settings.GEMINI_BACKEND!r}")
+
+    backend = GeminiBackend(generation_config, safety_settings)
+    if settings.GEMINI_RECORD_PATH:
+        backend = RecordingBackend(backend, settings.GEMINI_RECORD_PATH)
+    return backend
@@ -0,0 +1,190 @@
+import asyncio
+import random
+import time
+from typing import Any, Dict, Optional
+
+from google.api_core import exceptions as google_exceptions
+
+# Upstream errors worth retrying: quota, overload and transient server failures
+RETRYABLE_ERRORS = (
+    google_exceptions.TooManyRequests,
+    google_exceptions.ResourceExhausted,
+    google_exceptions.ServiceUnavailable,
+    google_exceptions.InternalServerError,
+    google_exceptions.DeadlineExceeded,
+    ConnectionError,
+    TimeoutError,
+)
+
+THROTTLE_ERRORS = (google_exceptions.TooManyRequests, google_exceptions.ResourceExhausted)
+
+class UpstreamError(Exception):
+    """Gemini cannot take the call right now; clients should retry after retry_after seconds"""
+    def __init__(self, message: str, retry_after: float = 1.0):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+class CircuitOpenError(UpstreamError):
+    pass
+
+class RateLimitedError(UpstreamError):
+    pass
+
+def is_retryable(error: BaseException) -> bool:
+    return isinstance(error, RETRYABLE_ERRORS)
+
+def is_throttle(error: BaseException) -> bool:
+    return isinstance(error, THROTTLE_ERRORS)
+
+class TokenBucket:
+    """Token bucket refilled continuously at per_minute / 60 tokens a second.
+
+    The balance may go negative when a call turns out more expensive than
+    reserved, which delays the following calls until the debt is repaid.
+    """
+    def __init__(self, per_minute: float):
+        self.capacity = float(per_minute)
+        self.rate = per_minute / 60.0
+        self.tokens = self.capacity
+        self._updated = time.monotonic()
+
+    def _refill(self, rate_factor: float):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self._updated) * self.rate * rate_factor)
+        self._updated = now
+
+    def wait_time(self, amount: float, rate_factor: float = 1.0) -> float:
+        self._refill(rate_factor)
+        amount = min(amount, self.capacity)
+        if self.tokens >= amount:
+            return 0.0
+        return (amount - self.tokens) / (self.rate * rate_factor)
+
+    def consume(self, amount: float):
+        self.tokens -= amount
+
+class RateLimiter:
+    """Client-side request and token budget with additive-increase/multiplicative-decrease
+    backoff when the upstream reports throttling"""
+    def __init__(self, requests_per_minute: int, tokens_per_minute: int):
+        self._requests = TokenBucket(requests_per_minute) if requests_per_minute > 0 else None
+        self._tokens = TokenBucket(tokens_per_minute) if tokens_per_minute > 0 else None
+        self._lock = asyncio.Lock()
+        self.rate_factor = 1.0
+        self.waits = 0
+        self.total_wait_seconds = 0.0
+
+    async def acquire(self, tokens: int = 0):
+        """Wait until one request and the given number of tokens fit in the budget"""
+        # The lock keeps callers first come, first served
+        async with self._lock:
+            while True:
+                wait = 0.0
+                if self._requests is not None:
+                    wait = max(wait, self._requests.wait_time(1, self.rate_factor))
+                if self._tokens is not None:
+                    wait = max(wait, self._tokens.wait_time(tokens, self.rate_factor))
+                if wait <= 0:
+                    break
+                self.waits += 1
+                self.total_wait_seconds += wait
+                await asyncio.sleep(wait)
+
+            if self._requests is not None:
+                self._requests.consume(1)
+            if self._tokens is not None:
+                self._tokens.consume(tokens)
+
+    def record_tokens(self, tokens: int):
+        """Charge tokens only known after the call, such as the output"""
+        if self._tokens is not None:
+            self._tokens.consume(tokens)
+
+    def on_throttled(self):
+        self.rate_factor = max(0.1, self.rate_factor / 2)
+
+    def on_success(self):
+        self.rate_factor = min(1.0, self.rate_factor + 0.05)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "rate_factor": round(self.rate_factor, 3),
+            "waits": self.waits,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+        }
+
+class RetryPolicy:
+    """Exponential backoff with full jitter"""
+    def __init__(self, max_retries: int, base_delay: float, max_delay: float):
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.retries = 0
+        self.exhausted = 0
+
+    def delay(self, attempt: int) -> float:
+        return random.uniform(0, min(self.max_delay, self.base_delay * (2 ** attempt)))
+
+    def stats(self) -> Dict[str, int]:
+        return {"retries": self.retries, "exhausted": self.exhausted}
+
+class CircuitBreaker:
+    """Fails fast after repeated upstream failures, then lets one probe call through"""
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(self, failure_threshold: int, reset_timeout: float):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = self.CLOSED
+        self.failures = 0
+        self.opened_count = 0
+        self.rejected = 0
+        self._opened_at = 0.0
+        self._probe_in_flight = False
+
+    def before_call(self):
+        """Raise CircuitOpenError unless a call may go upstream now"""
+        if self.state == self.CLOSED:
+            return
+
+        remaining = self._opened_at + self.reset_timeout - time.monotonic()
+        if self.state == self.OPEN and remaining <= 0:
+            self.state = self.HALF_OPEN
+        if self.state == self.HALF_OPEN and not self._probe_in_flight:
+            self._probe_in_flight = True
+            return
+
+        self.rejected += 1
+        raise CircuitOpenError("Gemini is unavailable, failing fast", retry_after=max(remaining, 1.0))
+
+    def record_success(self):
+        self.state = self.CLOSED
+        self.failures = 0
+        self._probe_in_flight = False
+
+    def release(self):
+        """Free the probe slot of a call that ended without an upstream verdict"""
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == self.HALF_OPEN or self.failures >= self.failure_threshold:
+            if self.state != self.OPEN:
+                self.opened_count += 1
+            self.state = self.OPEN
+            self._opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "opened": self.opened_count,
+            "rejected": self.rejected,
+        }
+
+def estimate_tokens(text: Optional[str]) -> int:
+    """Rough token count for budgeting: about four characters per token"""
+    return len(text) // 4 + 1 if text else 0
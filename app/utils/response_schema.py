@@ -0,0 +1,54 @@
+from functools import lru_cache
+from typing import Any, Dict
+
+from pydantic import TypeAdapter
+
+# Hints for string formats the Gemini schema subset can't express
+_FORMAT_HINTS = {"time": "24-hour time, HH:MM", "date": "ISO date, YYYY-MM-DD"}
+
+@lru_cache(maxsize=None)
+def response_schema(output_type: Any) -> Dict[str, Any]:
+    """Gemini response schema for a pydantic model or type.
+
+    Gemini accepts an OpenAPI subset: no $ref, anyOf, titles, defaults or
+    bounds. References are inlined, optional fields become nullable and
+    everything else unsupported is dropped.
+    """
+    schema = TypeAdapter(output_type).json_schema()
+    return _convert(schema, schema.get("$defs", {}))
+
+def _resolve(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    if "$ref" in node:
+        return dict(defs[node["$ref"].rsplit("/", 1)[-1]], **{k: v for k, v in node.items() if k != "$ref"})
+    if len(node.get("allOf", [])) == 1:
+        return dict(_resolve(node["allOf"][0], defs), **{k: v for k, v in node.items() if k != "allOf"})
+    return node
+
+def _convert(node: Dict[str, Any], defs: Dict[str, Any]) -> Dict[str, Any]:
+    node = _resolve(node, defs)
+    nullable = False
+    if "anyOf" in node:
+        options = [option for option in node["anyOf"] if option.get("type") != "null"]
+        nullable = len(options) < len(node["anyOf"])
+        # Gemini has no unions; the first non-null option is the documented one
+        node = dict(_resolve(options[0], defs), **{k: v for k, v in node.items() if k != "anyOf"})
+
+    kind = node.get("type", "string")
+    result: Dict[str, Any] = {"type": kind}
+    description = node.get("description") or _FORMAT_HINTS.get(node.get("format"))
+    if description:
+        result["description"] = description
+    if nullable:
+        result["nullable"] = True
+    if "enum" in node:
+        result["type"] = "string"
+        result["enum"] = [str(value) for value in node["enum"]]
+    elif kind == "object":
+        result["properties"] = {
+            name: _convert(child, defs) for name, child in node.get("properties", {}).items()
+        }
+        if node.get("required"):
+            result["required"] = list(node["required"])
+    elif kind == "array":
+        result["items"] = _convert(node.get("items", {}), defs)
+    return result
@@ -0,0 +1,302 @@
+import asyncio
+import json
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+from app.core.config import settings
+from app.utils.single_flight import SingleFlight
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS shared_leases (
+    key TEXT PRIMARY KEY,
+    owner TEXT NOT NULL,
+    expires_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shared_buckets (
+    name TEXT PRIMARY KEY,
+    tokens REAL NOT NULL,
+    updated_at REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shared_values (
+    name TEXT PRIMARY KEY,
+    value REAL NOT NULL
+);
+CREATE TABLE IF NOT EXISTS shared_results (
+    key TEXT NOT NULL,
+    flight TEXT NOT NULL,
+    value TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    PRIMARY KEY (key, flight)
+);
+"""
+
+class SharedStore:
+    """SQLite file shared by the worker processes of one deployment.
+
+    Holds single-flight leases and results, rate-limit token buckets and the
+    throttle rate factor. Every write is one short transaction; BEGIN IMMEDIATE
+    takes the write lock up front so read-modify-write steps are atomic
+    across processes. Reads are single statements and take no lock. Blocking
+    work runs in asyncio.to_thread.
+    """
+    def __init__(self, path: str, busy_timeout: float = 5.0):
+        self.path = path
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, timeout=busy_timeout, isolation_level=None, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.executescript(SCHEMA)
+
+    def _transaction(self, func: Callable[[sqlite3.Connection], Any]) -> Any:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                result = func(self._conn)
+            except BaseException:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return result
+
+    def try_lease(self, key: str, owner: str, seconds: float) -> bool:
+        """Take the lease on key unless another owner holds an unexpired one"""
+        def take(conn: sqlite3.Connection) -> bool:
+            now = time.time()
+            row = conn.execute("SELECT owner, expires_at FROM shared_leases WHERE key = ?", (key,)).fetchone()
+            if row is not None and row[0] != owner and row[1] > now:
+                return False
+            conn.execute(
+                "INSERT OR REPLACE INTO shared_leases (key, owner, expires_at) VALUES (?, ?, ?)",
+                (key, owner, now + seconds),
+            )
+            return True
+        return self._transaction(take)
+
+    def release_lease(self, key: str, owner: str):
+        self._transaction(
+            lambda conn: conn.execute("DELETE FROM shared_leases WHERE key = ? AND owner = ?", (key, owner))
+        )
+
+    def poll_flight(self, key: str, flight: Optional[str]) -> Tuple[Optional[str], Optional[str]]:
+        """(unexpired lease holder of key, result published by flight), read in one snapshot without writing"""
+        with self._lock:
+            return self._conn.execute(
+                "SELECT (SELECT owner FROM shared_leases WHERE key = ? AND expires_at > ?),"
+                " (SELECT value FROM shared_results WHERE key = ? AND flight = ?)",
+                (key, time.time(), key, flight),
+            ).fetchone()
+
+    def publish_result(self, key: str, flight: str, value: str, seconds: float):
+        """Hand a flight's result to the processes waiting on it and release its lease"""
+        def publish(conn: sqlite3.Connection):
+            now = time.time()
+            conn.execute("DELETE FROM shared_results WHERE expires_at <= ?", (now,))
+            conn.execute(
+                "INSERT OR REPLACE INTO shared_results (key, flight, value, expires_at) VALUES (?, ?, ?, ?)",
+                (key, flight, value, now + seconds),
+            )
+            conn.execute("DELETE FROM shared_leases WHERE key = ? AND owner = ?", (key, flight))
+        self._transaction(publish)
+
+    def count_handoff(self):
+        """Count a result received from another process's flight, for deployment-wide stats"""
+        self._transaction(lambda conn: conn.execute(
+            "INSERT INTO shared_values (name, value) VALUES ('handoffs', 1)"
+            " ON CONFLICT (name) DO UPDATE SET value = value + 1"
+        ))
+
+    def clear_leases(self):
+        """Drop every lease and unclaimed result, e.g. when a deployment starts and no worker can hold one"""
+        def clear(conn: sqlite3.Connection):
+            conn.execute("DELETE FROM shared_leases")
+            conn.execute("DELETE FROM shared_results")
+        self._transaction(clear)
+
+    def take(self, amounts: Dict[str, Tuple[float, float]]) -> Tuple[float, float]:
+        """Consume from the named buckets, given as name -> (amount, per_minute), all or nothing.
+
+        Returns (wait, rate factor): wait is 0 when consumed, or the seconds
+        until enough has refilled. Buckets refill at per_minute scaled by the
+        shared rate factor.
+        """
+        def take(conn: sqlite3.Connection) -> Tuple[float, float]:
+            now = time.time()
+            factor = self._rate_factor(conn)
+            balances = {}
+            wait = 0.0
+            for name, (amount, per_minute) in amounts.items():
+                rate = per_minute / 60.0 * factor
+                row = conn.execute("SELECT tokens, updated_at FROM shared_buckets WHERE name = ?", (name,)).fetchone()
+                tokens = per_minute if row is None else min(per_minute, row[0] + max(0.0, now - row[1]) * rate)
+                needed = min(amount, per_minute)
+                if tokens < needed:
+                    wait = max(wait, (needed - tokens) / rate)
+                balances[name] = tokens
+            for name, (amount, _) in amounts.items():
+                tokens = balances[name] - (amount if wait == 0 else 0)
+                conn.execute(
+                    "INSERT OR REPLACE INTO shared_buckets (name, tokens, updated_at) VALUES (?, ?, ?)",
+                    (name, tokens, now),
+                )
+            return wait, factor
+        return self._transaction(take)
+
+    def charge(self, name: str, amount: float):
+        """Take amount from a bucket even if that leaves it negative"""
+        self._transaction(lambda conn: conn.execute(
+            "UPDATE shared_buckets SET tokens = tokens - ? WHERE name = ?", (amount, name)
+        ))
+
+    @staticmethod
+    def _rate_factor(conn: sqlite3.Connection) -> float:
+        row = conn.execute("SELECT value FROM shared_values WHERE name = 'rate_factor'").fetchone()
+        return row[0] if row else 1.0
+
+    def update_rate_factor(self, update: Callable[[float], float]) -> float:
+        def apply(conn: sqlite3.Connection) -> float:
+            factor = update(self._rate_factor(conn))
+            conn.execute("INSERT OR REPLACE INTO shared_values (name, value) VALUES ('rate_factor', ?)", (factor,))
+            return factor
+        return self._transaction(apply)
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+def _halve(factor: float) -> float:
+    return max(0.1, factor / 2)
+
+def _recover(factor: float) -> float:
+    return min(1.0, factor + 0.05)
+
+class SharedRateLimiter:
+    """RateLimiter whose buckets and throttle backoff are shared by every worker process.
+
+    Callers in one process are still served first come, first served; across
+    processes whoever finds the buckets full first goes first.
+    """
+    def __init__(self, store: SharedStore, requests_per_minute: int, tokens_per_minute: int):
+        self.store = store
+        self.requests_per_minute = requests_per_minute
+        self.tokens_per_minute = tokens_per_minute
+        self._lock = asyncio.Lock()
+        self.rate_factor = 1.0
+        self.waits = 0
+        self.total_wait_seconds = 0.0
+
+    async def acquire(self, tokens: int = 0):
+        """Wait until one request and the given number of tokens fit in the shared budget"""
+        amounts = {}
+        if self.requests_per_minute > 0:
+            amounts["requests"] = (1, self.requests_per_minute)
+        if self.tokens_per_minute > 0:
+            amounts["tokens"] = (tokens, self.tokens_per_minute)
+        if not amounts:
+            return
+        async with self._lock:
+            while True:
+                wait, self.rate_factor = await asyncio.to_thread(self.store.take, amounts)
+                if wait <= 0:
+                    return
+                self.waits += 1
+                self.total_wait_seconds += wait
+                await asyncio.sleep(wait)
+
+    def _background(self, func: Callable[..., Any], *args: Any) -> asyncio.Future:
+        """Run a store write off the event loop; callers don't wait for it"""
+        return asyncio.get_running_loop().run_in_executor(None, func, *args)
+
+    def _track_rate_factor(self, future: asyncio.Future):
+        if not future.cancelled() and future.exception() is None:
+            self.rate_factor = future.result()
+
+    def record_tokens(self, tokens: int):
+        """Charge tokens only known after the call, such as the output"""
+        if self.tokens_per_minute > 0:
+            self._background(self.store.charge, "tokens", tokens)
+
+    def on_throttled(self):
+        self._background(self.store.update_rate_factor, _halve).add_done_callback(self._track_rate_factor)
+
+    def on_success(self):
+        # No write while the shared factor, as last seen, is at full rate
+        if self.rate_factor < 1.0:
+            self._background(self.store.update_rate_factor, _recover).add_done_callback(self._track_rate_factor)
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "shared": True,
+            "rate_factor": round(self.rate_factor, 3),
+            "waits": self.waits,
+            "total_wait_seconds": round(self.total_wait_seconds, 3),
+        }
+
+class SharedSingleFlight:
+    """SingleFlight across worker processes: identical calls in flight at the same time share one execution.
+
+    Calls are first coalesced within the process. The process-wide call then
+    takes a lease on the key and runs, or, when another process holds the
+    lease, polls until that flight publishes its result. Published results
+    are only read by the processes that waited on that flight, so nothing is
+    cached past the call. If the holder fails, its lease is released and a
+    waiter takes over; a crashed holder's lease expires.
+    """
+    def __init__(self, store: SharedStore, lease_seconds: float, poll_interval: float):
+        self.store = store
+        self.lease_seconds = lease_seconds
+        self.poll_interval = poll_interval
+        self.owner = f"{os.getpid()}-{uuid.uuid4().hex[:8]}"
+        self._local = SingleFlight()
+        self.remote_waits = 0
+        self.handoffs = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        return await self._local.do(key, lambda: self._do_shared(key, func))
+
+    async def _do_shared(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        flight = f"{self.owner}-{uuid.uuid4().hex[:8]}"
+        waited_on: Optional[str] = None
+        while True:
+            holder, value = await asyncio.to_thread(self.store.poll_flight, key, waited_on)
+            if value is not None:
+                self.handoffs += 1
+                await asyncio.to_thread(self.store.count_handoff)
+                return json.loads(value)
+            if holder is None:
+                # Nobody is running it, or the flight waited on failed: run it here
+                if await asyncio.to_thread(self.store.try_lease, key, flight, self.lease_seconds):
+                    break
+                continue
+            if holder != waited_on:
+                self.remote_waits += 1
+                waited_on = holder
+            await asyncio.sleep(self.poll_interval)
+
+        try:
+            value = await func()
+            await asyncio.to_thread(self.store.publish_result, key, flight, json.dumps(value), self.lease_seconds)
+        except BaseException:
+            await asyncio.to_thread(self.store.release_lease, key, flight)
+            raise
+        return value
+
+    def stats(self) -> Dict[str, Any]:
+        return dict(
+            self._local.stats(),
+            shared=True,
+            remote_waits=self.remote_waits,
+            handoffs=self.handoffs,
+        )
+
+def open_shared_store() -> Optional[SharedStore]:
+    """The store at SHARED_STATE_PATH, or None when state is kept per process"""
+    if not settings.SHARED_STATE_PATH:
+        return None
+    return SharedStore(settings.SHARED_STATE_PATH)
+
+def create_shared_single_flight(store: SharedStore) -> SharedSingleFlight:
+    return SharedSingleFlight(store, settings.SHARED_LEASE_SECONDS, settings.SHARED_POLL_INTERVAL_MS / 1000)
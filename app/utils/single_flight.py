@@ -0,0 +1,56 @@
+import asyncio
+import copy
+from typing import Any, Awaitable, Callable, Dict
+
+class _Call:
+    def __init__(self, task: asyncio.Future):
+        self.task = task
+        self.waiters = 0
+        self.joined = 0
+
+class SingleFlight:
+    """Coalesce concurrent calls with the same key into one shared execution.
+
+    The first caller starts the work as its own task; later callers with the
+    same key await that task instead of starting another. Errors reach every
+    waiter. A cancelled waiter only stops waiting, and the shared work is
+    cancelled once nobody is waiting for it anymore.
+    """
+    def __init__(self):
+        self._calls: Dict[str, _Call] = {}
+        self.executions = 0
+        self.coalesced = 0
+
+    async def do(self, key: str, func: Callable[[], Awaitable[Any]]) -> Any:
+        call = self._calls.get(key)
+        if call is None:
+            call = _Call(asyncio.ensure_future(func()))
+            self._calls[key] = call
+            call.task.add_done_callback(lambda _: self._forget(key, call))
+            self.executions += 1
+        else:
+            self.coalesced += 1
+
+        call.waiters += 1
+        call.joined += 1
+        try:
+            result = await asyncio.shield(call.task)
+        finally:
+            call.waiters -= 1
+            if call.waiters == 0 and not call.task.done():
+                self._forget(key, call)
+                call.task.cancel()
+
+        # Each caller of a shared call gets its own copy to mutate freely
+        return copy.deepcopy(result) if call.joined > 1 else result
+
+    def _forget(self, key: str, call: _Call):
+        if self._calls.get(key) is call:
+            del self._calls[key]
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            "in_flight": len(self._calls),
+            "executions": self.executions,
+            "coalesced": self.coalesced,
+        }
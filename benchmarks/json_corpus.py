@@ -0,0 +1,124 @@
+"""Seeded corpus of malformed model outputs for the JSON parser.
+
+Documents are the fake backend's responses to the real prompt templates,
+plus one with escapes, literals and unicode. Each is serialized and then
+damaged the way models damage JSON. Cases expected to be repaired must
+parse to the original value; truncated and non-JSON cases must be rejected.
+"""
+import json
+import random
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, List
+
+from app.prompts.careers import CAREERS
+from app.prompts.persona import PERSONA
+from app.prompts.roadmap import DAILY_CARDS, WEEKLY
+from app.utils.model_backends import FakeBackend
+
+@dataclass
+class Case:
+    kind: str
+    text: str
+    # The value a repair must produce; None for cases that must be rejected
+    expected: Any = None
+
+    @property
+    def rejected(self) -> bool:
+        return self.expected is None
+
+def _documents(seed: int) -> List[Any]:
+    backend = FakeBackend(latency=0, jitter=0, seed=seed)
+    prompts = [
+        WEEKLY.render(False, persona_type="analytical", duration_months=1, weeks=4),
+        DAILY_CARDS.render(False, persona_type="empathetic", first_day=1, last_day=3, focus="Listening",
+                           short_term="Listen", long_term="Lead"),
+        PERSONA.render(False, responses="Question ID: q1, Answer: I plan everything"),
+        CAREERS.render(False, primary_type="analytical", primary_description="Logical", secondary_type="None"),
+    ]
+    documents = [backend.synthesize(prompt) for prompt in prompts]
+    documents.append({
+        "title": "Line one\nline two\twith a tab",
+        "quote": 'She said "hi" \\ left',
+        "unicode": "café 東京 🚀",
+        "done": True, "skipped": False, "note": None,
+        "numbers": [0, -1, 2.5, 1e-3, 12345678901234],
+        "nested": {"empty_list": [], "empty_object": {}},
+    })
+    return documents
+
+def _trailing_commas(text: str) -> str:
+    return re.sub(r'([}\]"\deln])(\s*[}\]])', r"\1,\2", text)
+
+def _missing_commas(text: str) -> str:
+    return text.replace("}, {", "} {").replace('", "', '" "')
+
+def _doubled_commas(text: str) -> str:
+    return text.replace(", ", ",, ")
+
+def _single_quotes(text: str) -> str:
+    # Only safe when no string contains a quote or apostrophe
+    return text if "'" in text or '\\"' in text else text.replace('"', "'")
+
+def _unquoted_keys(text: str) -> str:
+    return re.sub(r'"([A-Za-z_]\w*)":', r"\1:", text)
+
+def _python_literals(text: str) -> str:
+    return re.sub(r"\b(true|false|null)\b", lambda m: {"true": "True", "false": "False", "null": "None"}[m.group()], text)
+
+def _raw_control_characters(text: str) -> str:
+    return text.replace("\\n", "\n").replace("\\t", "\t")
+
+def _fenced(text: str) -> str:
+    return "```json\n" + text + "\n```"
+
+def _prose(text: str) -> str:
+    return "Here is the requested JSON:\n" + text + "\nLet me know if you need changes."
+
+REPAIRS: Dict[str, Callable[[str], str]] = {
+    "trailing_commas": _trailing_commas,
+    "missing_commas": _missing_commas,
+    "doubled_commas": _doubled_commas,
+    "single_quotes": _single_quotes,
+    "unquoted_keys": _unquoted_keys,
+    "python_literals": _python_literals,
+    "control_characters": _raw_control_characters,
+    "fenced": _fenced,
+    "prose": _prose,
+}
+
+def build_corpus(size: int = 1000, seed: int = 0) -> List[Case]:
+    """size cases: clean, single and combined repairs, truncations and outputs without JSON"""
+    rng = random.Random(seed)
+    documents = _documents(seed)
+    cases = []
+    for number in range(size):
+        document = documents[number % len(documents)]
+        text = json.dumps(document, indent=rng.choice((None, 2)), ensure_ascii=rng.random() < 0.5)
+        kind = rng.choice(("clean", "repair", "combined", "truncated", "truncated", "no_json"))
+        if kind == "clean":
+            cases.append(Case("clean", text, document))
+        elif kind == "repair":
+            name = rng.choice(sorted(REPAIRS))
+            cases.append(Case(name, REPAIRS[name](text), document))
+        elif kind == "combined":
+            names = rng.sample(sorted(REPAIRS), 3)
+            # Wrapping comes last, as a model adds it around the damaged document
+            for name in sorted(names, key=lambda name: name in ("fenced", "prose")):
+                text = REPAIRS[name](text)
+            cases.append(Case("combined", text, document))
+        elif kind == "truncated":
+            if rng.random() < 0.5:
+                text = REPAIRS[rng.choice(sorted(REPAIRS))](text)
+            start = min(text.find(char) for char in "{[" if char in text)
+            end = max(text.rfind(char) for char in "}]")
+            # Cut anywhere inside the document, as the token limit would
+            cases.append(Case("truncated", text[:rng.randrange(start + 1, end)]))
+        else:
+            cases.append(Case("no_json", rng.choice((
+                "I'm sorry, I can't produce that right now.",
+                "",
+                "```\n```",
+                "The roadmap is below:",
+            ))))
+    return cases
@@ -0,0 +1,74 @@
+"""Speed and correctness of the model output parser over the malformed-output corpus.
+
+    python -m benchmarks.json_parser
+    python -m benchmarks.json_parser --size 5000 --seed 3
+
+Parses every case of benchmarks.json_corpus with parse_model_json and
+reports cases/s and MB/s per kind, next to json.loads on the clean cases.
+Exits non-zero when a repairable case parses to the wrong value, or a
+truncated or non-JSON case is accepted instead of rejected.
+"""
+import argparse
+import json
+import sys
+import time
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional
+
+from app.utils.json_parser import IncompleteJSONError, parse_model_json
+from benchmarks.json_corpus import Case, build_corpus
+
+def check(case: Case) -> Optional[str]:
+    """None when the parser handles the case as expected, otherwise what went wrong"""
+    try:
+        value = parse_model_json(case.text)
+    except IncompleteJSONError:
+        return None if case.kind == "truncated" else "reported as truncated"
+    except ValueError as e:
+        return None if case.rejected else f"rejected: {e}"
+    if case.rejected:
+        return "accepted"
+    return None if value == case.expected else "repaired to a different value"
+
+def measure(texts: List[str], parse: Callable[[str], object], repeat: int) -> float:
+    """Seconds per pass over texts, best of repeat"""
+    best = float("inf")
+    for _ in range(repeat):
+        started = time.perf_counter()
+        for text in texts:
+            try:
+                parse(text)
+            except ValueError:
+                pass
+        best = min(best, time.perf_counter() - started)
+    return best
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args(argv)
+
+    corpus = build_corpus(args.size, args.seed)
+    failures = [(case, problem) for case in corpus for problem in [check(case)] if problem]
+
+    by_kind: Dict[str, List[str]] = defaultdict(list)
+    for case in corpus:
+        by_kind[case.kind].append(case.text)
+
+    print(f"{'kind':<22}{'cases':>8}{'cases/s':>12}{'MB/s':>10}")
+    rows = [("json.loads (clean)", by_kind["clean"], json.loads)]
+    rows += [(kind, texts, parse_model_json) for kind, texts in sorted(by_kind.items())]
+    for label, texts, parse in rows:
+        seconds = measure(texts, parse, args.repeat)
+        megabytes = sum(len(text) for text in texts) / 1e6
+        print(f"{label:<22}{len(texts):>8}{len(texts) / seconds:>12.0f}{megabytes / seconds:>10.1f}")
+
+    print(f"\n{len(corpus) - len(failures)}/{len(corpus)} cases handled as expected")
+    for case, problem in failures[:20]:
+        print(f"  {case.kind}: {problem}: {case.text[-60:]!r}")
+    return 1 if failures else 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,123 @@
+"""Throughput of the gunicorn deployment as the number of worker processes grows.
+
+    python -m benchmarks.multi_worker
+    python -m benchmarks.multi_worker --workers 1,2,4,8 --scenarios survey_submit
+
+For each worker count, starts `gunicorn -c gunicorn.conf.py main:app` on
+the fake backend with fresh storage, runs the scenarios against it over
+HTTP and stops it. Reports requests per second per scenario and the
+speedup over the first worker count, plus how many in-flight Gemini calls
+one worker handed to others and the peak RSS of the master and workers together. Needs gunicorn (see requirements.txt) and more than one
+core to show scaling; the load generator runs on the same machine.
+"""
+import argparse
+import asyncio
+import os
+import sqlite3
+import subprocess
+import sys
+import tempfile
+import time
+from typing import Dict, List, Optional
+
+import httpx
+
+from benchmarks.run import SCENARIOS, run_all
+
+DEFAULT_SCENARIOS = "survey_questions,survey_submit,roadmap_weekly_3_cached,roadmap_weekly_3"
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+def start_server(workers: int, port: int, directory: str, args: argparse.Namespace) -> subprocess.Popen:
+    env = dict(
+        os.environ,
+        WEB_CONCURRENCY=str(workers),
+        BIND=f"127.0.0.1:{port}",
+        GEMINI_API_KEY=os.environ.get("GEMINI_API_KEY", "benchmark"),
+        GEMINI_BACKEND="fake",
+        FAKE_GEMINI_LATENCY_MS=str(args.latency_ms),
+        FAKE_GEMINI_JITTER_MS="0",
+        GEMINI_REQUESTS_PER_MINUTE="0",
+        GEMINI_TOKENS_PER_MINUTE="0",
+        LOG_LEVEL="WARNING",
+        DATABASE_URL="sqlite:///" + os.path.join(directory, "app.db"),
+        # Shared even for one worker, so every run pays the same bookkeeping
+        SHARED_STATE_PATH=os.path.join(directory, "shared.db"),
+    )
+    return subprocess.Popen(
+        [sys.executable, "-m", "gunicorn", "-c", "gunicorn.conf.py", "main:app"],
+        cwd=ROOT, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL,
+    )
+
+def wait_ready(url: str, process: subprocess.Popen, timeout: float = 60):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if process.poll() is not None:
+            raise RuntimeError("gunicorn exited during startup; is it installed?")
+        try:
+            if httpx.get(url + "/", timeout=1).status_code == 200:
+                return
+        except httpx.HTTPError:
+            pass
+        time.sleep(0.2)
+    raise RuntimeError(f"Server at {url} did not start within {timeout}s")
+
+def shared_calls(path: str) -> int:
+    conn = sqlite3.connect(path)
+    try:
+        row = conn.execute("SELECT value FROM shared_values WHERE name = 'handoffs'").fetchone()
+        return int(row[0]) if row else 0
+    except sqlite3.Error:
+        return 0
+    finally:
+        conn.close()
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", default="1,2,4", help="Comma-separated worker counts")
+    parser.add_argument("--scenarios", default=DEFAULT_SCENARIOS)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args(argv)
+
+    names = args.scenarios.split(",")
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    print(f"{os.cpu_count()} cores")
+    throughput: Dict[int, Dict[str, float]] = {}
+    shared: Dict[int, int] = {}
+    memory: Dict[int, Optional[float]] = {}
+    args.url = f"http://127.0.0.1:{args.port}"
+    for workers in [int(count) for count in args.workers.split(",")]:
+        directory = tempfile.mkdtemp(prefix="bench-workers-")
+        process = start_server(workers, args.port, directory, args)
+        # The rss column then covers the gunicorn master and its workers, not this load generator
+        args.server_pid = process.pid
+        try:
+            wait_ready(args.url, process)
+            print(f"\n{workers} worker(s)")
+            results = asyncio.run(run_all(args, [SCENARIOS[name] for name in names]))
+            throughput[workers] = {name: result["throughput_rps"] for name, result in results.items()}
+            # Peak RSS only grows, so the last scenario's reading covers the whole run
+            memory[workers] = results[names[-1]]["peak_rss_mb"]
+        finally:
+            process.terminate()
+            process.wait(timeout=30)
+        shared[workers] = shared_calls(os.path.join(directory, "shared.db"))
+
+    first = next(iter(throughput))
+    print(f"\n{'req/s':<26}" + "".join(f"{f'{workers}w':>12}" for workers in throughput))
+    for name in names:
+        print(f"{name:<26}" + "".join(f"{throughput[workers][name]:>12}" for workers in throughput))
+    print(f"{'speedup':<26}" + "".join(
+        f"{sum(throughput[workers].values()) / sum(throughput[first].values()):>12.2f}" for workers in throughput
+    ))
+    print(f"{'shared calls':<26}" + "".join(f"{shared[workers]:>12}" for workers in throughput))
+    print(f"{'server peak rss MB':<26}" + "".join(f"{memory[workers] or '-':>12}" for workers in throughput))
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,47 @@
+"""Prompt sizes and output budgets from the prompt registry.
+
+    python -m benchmarks.prompt_budget
+    python -m benchmarks.prompt_budget --months 1 3 6 12
+
+Lists every template's fixed input tokens before and after whitespace
+minimization, then, per roadmap duration, the weekly strategy (single
+call or chunked) and the max_output_tokens each call would ask for.
+"""
+import argparse
+import sys
+from typing import List, Optional
+
+from app.prompts import careers, persona  # noqa: F401 - registers the templates
+from app.prompts.registry import prompts
+from app.prompts.roadmap import DAILY_CARDS, MONTH_WEEKS, OUTLINE, WEEKLY
+from app.services.roadmap_generator import DAYS_PER_BATCH, WEEKS_PER_MONTH, RoadmapGeneratorService
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months", type=int, nargs="+", default=[1, 2, 3, 6, 12])
+    args = parser.parse_args(argv)
+
+    print(f"{'template':<22}{'source':>8}{'text':>8}{'example':>9}{'saved':>8}{'max units':>11}")
+    for entry in prompts.catalog():
+        compiled = entry["prompt_tokens"] + entry["example_tokens"]
+        print(
+            f"{entry['name']:<22}{entry['source_tokens']:>8}{entry['prompt_tokens']:>8}"
+            f"{entry['example_tokens']:>9}{entry['source_tokens'] - compiled:>8}"
+            f"{prompts.get(entry['name']).max_units():>11}"
+        )
+
+    print()
+    print(f"{'months':<8}{'weekly strategy':<18}{'calls':>7}{'max output per call':>22}")
+    for months in args.months:
+        weeks = months * WEEKS_PER_MONTH
+        if RoadmapGeneratorService.use_chunks(months):
+            strategy, calls = "chunked", 1 + months
+            caps = f"{OUTLINE.max_output_tokens(months)} + {MONTH_WEEKS.max_output_tokens(WEEKS_PER_MONTH)}/month"
+        else:
+            strategy, calls, caps = "single call", 1, str(WEEKLY.max_output_tokens(weeks))
+        print(f"{months:<8}{strategy:<18}{calls:>7}{caps:>22}")
+    print(f"daily cards: {DAYS_PER_BATCH} days per call, max output {DAILY_CARDS.max_output_tokens(DAYS_PER_BATCH)}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
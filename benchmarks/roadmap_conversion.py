@@ -0,0 +1,119 @@
+"""Cost of turning parsed model output into roadmap models and response bytes.
+
+    python -m benchmarks.roadmap_conversion
+    python -m benchmarks.roadmap_conversion --months 12 --output-scale 3
+
+Uses synthetic output from the fake backend for a weekly and a daily
+roadmap, and compares the old per-object construction, followed by the
+response_model round trip, with the compiled TypeAdapter path that
+serializes straight to bytes.
+"""
+import argparse
+import sys
+import timeit
+from datetime import date, datetime, time, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from pydantic import TypeAdapter
+
+from app.models.roadmap import DailyCard, Goal, PersonalRoadmap, Quest, Resource, Task, WeeklyTheme
+from app.services.roadmap_generator import _daily_cards_adapter, _weeks_adapter
+from app.utils.model_backends import FakeBackend
+
+_response_adapter = TypeAdapter(PersonalRoadmap)
+
+def legacy_weeks(weeks_data: List[Dict[str, Any]]) -> List[WeeklyTheme]:
+    """The conversion this replaced: every nested model built by hand"""
+    return [
+        WeeklyTheme(
+            week_number=week["week_number"],
+            theme=week["theme"],
+            quests=[
+                Quest(
+                    task_type=quest["task_type"],
+                    task_name=quest["task_name"],
+                    resources=[Resource(title=r["title"], link=r["link"]) for r in quest.get("resources", [])],
+                    time_commitment=quest["time_commitment"],
+                    activity=quest["activity"],
+                )
+                for quest in week.get("quests", [])
+            ],
+        )
+        for week in weeks_data
+    ]
+
+def legacy_daily_cards(cards_data: List[Dict[str, Any]]) -> List[DailyCard]:
+    cards = []
+    for card in cards_data:
+        tasks = []
+        for task in card["tasks"]:
+            start, end = task["start_time"].split(":"), task["end_time"].split(":")
+            tasks.append(Task(
+                title=task["title"],
+                description=task["description"],
+                start_time=time(int(start[0]), int(start[1])),
+                end_time=time(int(end[0]), int(end[1])),
+                time_slot=task["time_slot"],
+                estimated_time=task["estimated_time"],
+                priority=task["priority"],
+                resources=task.get("resources", []),
+            ))
+        cards.append(DailyCard(
+            date=datetime.strptime(card["date"], "%Y-%m-%d").date(),
+            focus_area=card["focus_area"],
+            tasks=tasks,
+            reflection_prompt=card["reflection_prompt"],
+        ))
+    return cards
+
+def synthetic_output(months: int, output_scale: int) -> Dict[str, Any]:
+    fake = FakeBackend(output_scale=output_scale)
+    weeks = fake.synthesize(f"create {months * 4} weeks of content")
+    cards = fake.synthesize(f"Days: 1 to {months * 30}")["daily_cards"]
+    start = date(2025, 1, 1)
+    for offset, card in enumerate(cards):
+        card["date"] = (start + timedelta(days=offset)).isoformat()
+    return {"goals": weeks["overall_goals"], "weeks": weeks["weeks"], "daily_cards": cards, "start": start}
+
+def roadmap(data: Dict[str, Any], months: int, **pieces: Any) -> PersonalRoadmap:
+    return PersonalRoadmap(
+        persona_type="analytical",
+        start_date=data["start"],
+        end_date=data["start"] + timedelta(days=30 * months),
+        duration_months=months,
+        overall_goals=Goal(**data["goals"]),
+        **pieces,
+    )
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months", type=int, default=12)
+    parser.add_argument("--output-scale", type=int, default=1)
+    parser.add_argument("--number", type=int, default=20)
+    args = parser.parse_args(argv)
+
+    data = synthetic_output(args.months, args.output_scale)
+    months = args.months
+    cases: Dict[str, Callable[[], Any]] = {
+        "weekly legacy build": lambda: legacy_weeks(data["weeks"]),
+        "weekly adapter build": lambda: _weeks_adapter.validate_python(data["weeks"]),
+        "weekly legacy + response": lambda: _response_adapter.dump_json(_response_adapter.validate_python(
+            roadmap(data, months, weeks=legacy_weeks(data["weeks"])).model_dump())),
+        "weekly adapter + bytes": lambda: roadmap(
+            data, months, weeks=_weeks_adapter.validate_python(data["weeks"])).model_dump_json(),
+        "daily legacy build": lambda: legacy_daily_cards(data["daily_cards"]),
+        "daily adapter build": lambda: _daily_cards_adapter.validate_python(data["daily_cards"]),
+        "daily legacy + response": lambda: _response_adapter.dump_json(_response_adapter.validate_python(
+            roadmap(data, months, daily_cards=legacy_daily_cards(data["daily_cards"])).model_dump())),
+        "daily adapter + bytes": lambda: roadmap(
+            data, months, daily_cards=_daily_cards_adapter.validate_python(data["daily_cards"])).model_dump_json(),
+    }
+
+    print(f"{months} months: {len(data['weeks'])} weeks, {len(data['daily_cards'])} daily cards")
+    for name, func in cases.items():
+        seconds = min(timeit.repeat(func, number=args.number, repeat=3)) / args.number
+        print(f"{name:<28}{seconds * 1000:>10.3f} ms")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
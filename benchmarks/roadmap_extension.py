@@ -0,0 +1,100 @@
+"""Cost of extending or partly regenerating a stored roadmap versus generating it again.
+
+    python -m benchmarks.roadmap_extension
+    python -m benchmarks.roadmap_extension --months 3 --additional-months 3 --format-type daily
+
+Runs the in-process app on the fake backend. Each case stores a fresh
+roadmap of --months for its own user first, then measures one request:
+a cold /generate of the full extended duration, /extend by
+--additional-months, a cold /generate of the original duration, and
+/regenerate of one week or day. Reports model calls, prompt and output
+tokens and wall time of the measured request only.
+"""
+import argparse
+import asyncio
+import sys
+import time
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+from benchmarks.run import configure_environment
+
+def _totals() -> Dict[str, float]:
+    from app.core.metrics import metrics
+
+    totals = {"calls": 0.0, "prompt": 0.0, "output": 0.0}
+    for key, value in metrics.llm_calls._values.items():
+        if key[-1] == "ok":
+            totals["calls"] += value
+    for key, value in metrics.llm_tokens._values.items():
+        totals[key[-1]] += value
+    return totals
+
+async def measure(client: httpx.AsyncClient, path: str, params: Dict[str, Any]) -> Dict[str, Any]:
+    before = _totals()
+    started = time.perf_counter()
+    response = await client.post(path, params=params)
+    elapsed = time.perf_counter() - started
+    response.raise_for_status()
+    after = _totals()
+    return dict(
+        {key: int(after[key] - before[key]) for key in after},
+        ms=round(elapsed * 1000, 1),
+    )
+
+async def run(args: argparse.Namespace) -> Dict[str, Dict[str, Any]]:
+    import main
+
+    total = args.months + args.additional_months
+    rows = {}
+    async with main.lifespan(main.app):
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+            for case, label in (
+                ("generate_total", f"generate {total} months"),
+                ("extend", f"extend {args.months} -> {total} months"),
+                ("generate_original", f"generate {args.months} months"),
+                ("regenerate", "regenerate 1 unit"),
+            ):
+                user_id = f"bench-{case}"
+                # A unique persona label keeps the template cache out of the comparison
+                persona_type = f"analytical-{case}"
+                if case == "generate_total":
+                    params = {"persona_type": persona_type, "duration_months": total, "format_type": args.format_type}
+                    rows[label] = await measure(client, "/api/roadmap/generate", params)
+                    continue
+                if case == "generate_original":
+                    params = {"persona_type": persona_type, "duration_months": args.months, "format_type": args.format_type}
+                    rows[label] = await measure(client, "/api/roadmap/generate", params)
+                    continue
+
+                setup = {"persona_type": persona_type, "duration_months": args.months,
+                         "format_type": args.format_type, "user_id": user_id}
+                (await client.post("/api/roadmap/generate", params=setup)).raise_for_status()
+                if case == "extend":
+                    params = {"additional_months": args.additional_months, "format_type": args.format_type}
+                    rows[label] = await measure(client, f"/api/roadmap/{user_id}/extend", params)
+                else:
+                    params = {"first": 2, "format_type": args.format_type}
+                    rows[label] = await measure(client, f"/api/roadmap/{user_id}/regenerate", params)
+    return rows
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--months", type=int, default=3)
+    parser.add_argument("--additional-months", type=int, default=3)
+    parser.add_argument("--format-type", choices=("weekly", "daily"), default="weekly")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    args = parser.parse_args(argv)
+    args.jitter_ms, args.error_rate, args.output_scale = 0, 0.0, 1
+    configure_environment(args)
+
+    rows = asyncio.run(run(args))
+    print(f"{'':<28}{'calls':>8}{'prompt':>10}{'output':>10}{'ms':>10}")
+    for label, row in rows.items():
+        print(f"{label:<28}{row['calls']:>8}{row['prompt']:>10}{row['output']:>10}{row['ms']:>10}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
@@ -0,0 +1,404 @@
+"""Benchmark the API against the offline fake Gemini backend.
+
+    python -m benchmarks.run                                 # in-process, every scenario
+    python -m benchmarks.run --scenarios survey_submit       # a subset
+    python -m benchmarks.run --url http://localhost:8010     # a running server (start it with GEMINI_BACKEND=fake)
+    python -m benchmarks.run --url http://localhost:8010 --server-pid 1234   # ...and its memory
+    python -m benchmarks.run --save-baseline                 # record benchmarks/baseline.json
+
+Reports p50/p95/p99 latency, throughput and peak RSS per scenario, and
+exits non-zero when a scenario regresses against the stored baseline.
+Peak RSS is the app's: this process in-process, the server's process tree
+with --url and --server-pid (Linux), and not reported with --url alone.
+"""
+import argparse
+import asyncio
+import contextlib
+import itertools
+import json
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from dataclasses import dataclass, field
+from datetime import datetime
+from typing import Any, Awaitable, Callable, Dict, Iterator, List, Optional
+
+import httpx
+
+BASELINE_PATH = os.path.join(os.path.dirname(__file__), "baseline.json")
+ARCHETYPES = ("analytical", "empathetic", "aggressive", "philosophical")
+
+@dataclass
+class Scenario:
+    name: str
+    method: str
+    path: str
+    # Keyword arguments for httpx for the i-th request
+    build: Callable[[int], Dict[str, Any]]
+    requests: int = 50
+    # Overrides --concurrency for scenarios that are about a specific load level
+    concurrency: Optional[int] = None
+    # Work items per request (e.g. submissions in a batch), for the items/s column
+    items: int = 1
+    # Errors reported inside a successful response, such as failed items of a batch
+    count_errors: Optional[Callable[[httpx.Response], int]] = None
+    # Waits for the work a response stands for, such as a background job, and returns its
+    # queue wait in seconds; latency then runs until the work is done
+    follow: Optional[Callable[[httpx.AsyncClient, httpx.Response], Awaitable[float]]] = None
+    # Settings the in-process app is started with for this scenario, for comparing configurations
+    settings: Dict[str, Any] = field(default_factory=dict)
+
+def _survey_submission(i: int) -> Dict[str, Any]:
+    from app.data.question_bank import question_bank
+
+    rng = random.Random(i)
+    return {
+        "user_id": f"bench-{i}",
+        "responses": [
+            {"question_id": question["id"], "answer": rng.choice(question["options"])["text"]}
+            for question in question_bank.get().questions
+        ],
+    }
+
+def _revalidate_questions(i: int) -> Dict[str, Any]:
+    from app.data.question_bank import question_bank
+
+    return {"headers": {"If-None-Match": question_bank.get().etag}}
+
+def _survey_batch(size: int) -> Callable[[int], Dict[str, Any]]:
+    def build(i: int) -> Dict[str, Any]:
+        return {"json": [_survey_submission(100_000 + i * size + k) for k in range(size)]}
+    return build
+
+def _ndjson_errors(response: httpx.Response) -> int:
+    return sum(1 for line in response.text.splitlines() if line and json.loads(line).get("type") == "error")
+
+def _roadmap(format_type: str, months: int, cold: bool = True, label: str = "", **params: Any) -> Callable[[int], Dict[str, Any]]:
+    def build(i: int) -> Dict[str, Any]:
+        persona = ARCHETYPES[i % len(ARCHETYPES)]
+        return {"params": dict(
+            params,
+            # A unique persona label per request (and per scenario, with label) misses the template cache
+            persona_type=f"{persona}{label}-{i}" if cold else persona,
+            duration_months=months,
+            format_type=format_type,
+        )}
+    return build
+
+class JobFailed(Exception):
+    pass
+
+async def _follow_job(client: httpx.AsyncClient, response: httpx.Response, poll_interval: float = 0.05) -> float:
+    """Poll a background job until it finishes; its queue wait in seconds"""
+    status_url = response.json()["status_url"]
+    while True:
+        job = (await client.get(status_url)).json()
+        if job["status"] == "failed":
+            raise JobFailed(job.get("error"))
+        if job["status"] == "done":
+            return (datetime.fromisoformat(job["started_at"]) - datetime.fromisoformat(job["created_at"])).total_seconds()
+        await asyncio.sleep(poll_interval)
+
+SCENARIOS: Dict[str, Scenario] = {}
+
+def register(scenario: Scenario):
+    SCENARIOS[scenario.name] = scenario
+
+register(Scenario("survey_questions", "GET", "/api/survey/questions", lambda i: {}, requests=500))
+register(Scenario("survey_questions_304", "GET", "/api/survey/questions", _revalidate_questions, requests=500))
+register(Scenario("survey_submit", "POST", "/api/survey/submit", lambda i: {"json": _survey_submission(i)}, requests=200))
+# Thousands of distinct answer sets, scored locally with one model call each for the analysis
+register(Scenario("survey_submit_2000", "POST", "/api/survey/submit", lambda i: {"json": _survey_submission(10_000 + i)}, requests=2000))
+# Cohort imports: submissions/s is the items/s column
+register(Scenario("survey_batch_500", "POST", "/api/survey/batch", _survey_batch(500), requests=4, items=500, count_errors=_ndjson_errors))
+# Career matching started for the locally predicted persona while detection runs, or after it
+for mode in ("pipelined", "sequential"):
+    register(Scenario(
+        f"survey_submit_{mode}", "POST", "/api/survey/submit",
+        lambda i: {"json": _survey_submission(20_000 + i)}, requests=200, settings={"SURVEY_PIPELINE_MODE": mode},
+    ))
+# Batching windows: packing concurrent requests saves calls under load and costs up to one window alone
+for window in (0, 30):
+    for concurrency, requests, offset in ((1, 40, 30_000), (32, 200, 40_000)):
+        register(Scenario(
+            f"survey_submit_window{window}_c{concurrency}", "POST", "/api/survey/submit",
+            lambda i, offset=offset + window * 1_000: {"json": _survey_submission(offset + i)},
+            requests=requests, concurrency=concurrency, settings={"PROMPT_BATCH_WINDOW_MS": window},
+        ))
+# Same answers every time: persona and careers come from the caches, leaving per-request overhead
+register(Scenario("survey_submit_cached", "POST", "/api/survey/submit", lambda i: {"json": _survey_submission(0)}, requests=500))
+for months in (1, 3, 6, 12):
+    register(Scenario(f"roadmap_weekly_{months}", "POST", "/api/roadmap/generate", _roadmap("weekly", months), requests=40))
+# Long weekly roadmaps in both modes: a single prompt overflows the output limit, month chunks don't
+for chunked in (False, True):
+    mode = "chunked" if chunked else "single"
+    register(Scenario(
+        f"roadmap_weekly_12_{mode}", "POST", "/api/roadmap/generate",
+        _roadmap("weekly", 12, label=f"-{mode}", chunked=chunked), requests=20,
+    ))
+for months in (1, 3, 12):
+    register(Scenario(f"roadmap_daily_{months}", "POST", "/api/roadmap/generate", _roadmap("daily", months), requests=max(4, 24 // months)))
+# 360 daily cards: streamed as they are generated, and rebased from a stored template
+register(Scenario("roadmap_daily_12_stream", "POST", "/api/roadmap/generate/stream", _roadmap("daily", 12, label="-stream"), requests=4))
+register(Scenario("roadmap_daily_12_cached", "POST", "/api/roadmap/generate", _roadmap("daily", 12, cold=False), requests=40))
+register(Scenario("roadmap_weekly_3_cached", "POST", "/api/roadmap/generate", _roadmap("weekly", 3, cold=False), requests=200))
+# One model call per request at growing concurrency: throughput should grow until GEMINI_MAX_CONCURRENCY
+for concurrency in (1, 4, 16, 64):
+    register(Scenario(
+        f"llm_load_c{concurrency}", "POST", "/api/roadmap/generate", _roadmap("weekly", 1, label=f"-c{concurrency}"),
+        requests=max(20, 4 * concurrency), concurrency=concurrency,
+    ))
+
+# Background jobs submitted faster than they run: latency is submit to done, req/s is jobs/s,
+# and the queue wait grows as fewer job workers drain the queue
+for workers in (1, 4):
+    register(Scenario(
+        f"roadmap_jobs_w{workers}", "POST", "/api/roadmap/generate",
+        _roadmap("weekly", 1, label=f"-jobs-w{workers}", background=True), requests=40, concurrency=40,
+        follow=_follow_job, settings={"ROADMAP_JOB_WORKERS": workers},
+    ))
+
+def percentile(values: List[float], fraction: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not values:
+        return 0.0
+    return values[min(len(values) - 1, max(0, round(fraction * len(values)) - 1))]
+
+def peak_rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == "darwin" else 1024), 1)
+
+def _process_tree(pid: int) -> List[int]:
+    """pid and all its live descendants, from /proc"""
+    children: Dict[int, List[int]] = {}
+    for entry in os.listdir("/proc"):
+        if not entry.isdigit():
+            continue
+        try:
+            with open(f"/proc/{entry}/stat", encoding="utf-8") as file:
+                # The command name may contain spaces, so the parent pid is read after its closing parenthesis
+                parent = int(file.read().rsplit(")", 1)[1].split()[1])
+        except (OSError, IndexError, ValueError):
+            continue
+        children.setdefault(parent, []).append(int(entry))
+    tree, pending = [], [pid]
+    while pending:
+        current = pending.pop()
+        tree.append(current)
+        pending.extend(children.get(current, []))
+    return tree
+
+def server_peak_rss_mb(pid: int) -> Optional[float]:
+    """Summed peak RSS of a server process and its workers (Linux only); None when unavailable"""
+    total_kb = 0
+    for process in _process_tree(pid):
+        try:
+            with open(f"/proc/{process}/status", encoding="utf-8") as file:
+                total_kb += next(int(line.split()[1]) for line in file if line.startswith("VmHWM:"))
+        except (OSError, StopIteration):
+            continue
+    return round(total_kb / 1024, 1) if total_kb else None
+
+async def run_scenario(
+    client: httpx.AsyncClient, scenario: Scenario, requests: int, concurrency: int,
+    rss: Callable[[], Optional[float]] = peak_rss_mb,
+) -> Dict[str, Any]:
+    latencies: List[float] = []
+    queue_waits: List[float] = []
+    errors = 0
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(i: int):
+        nonlocal errors
+        async with semaphore:
+            started = time.perf_counter()
+            try:
+                response = await client.request(scenario.method, scenario.path, **scenario.build(i))
+                if response.status_code >= 400:
+                    errors += 1
+                elif scenario.count_errors is not None:
+                    errors += scenario.count_errors(response)
+                elif scenario.follow is not None:
+                    queue_waits.append(await scenario.follow(client, response))
+            except (httpx.HTTPError, JobFailed):
+                errors += 1
+            latencies.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(requests)))
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    queue_waits.sort()
+    result = {
+        "requests": requests,
+        "errors": errors,
+        "p50_ms": round(percentile(latencies, 0.50) * 1000, 2),
+        "p95_ms": round(percentile(latencies, 0.95) * 1000, 2),
+        "p99_ms": round(percentile(latencies, 0.99) * 1000, 2),
+        "throughput_rps": round(requests / elapsed, 2),
+        "items_per_s": round(requests * scenario.items / elapsed, 2),
+        "peak_rss_mb": rss(),
+    }
+    if scenario.follow is not None:
+        result["queue_p50_ms"] = round(percentile(queue_waits, 0.50) * 1000, 2)
+        result["queue_p95_ms"] = round(percentile(queue_waits, 0.95) * 1000, 2)
+    return result
+
+@contextlib.contextmanager
+def _overridden(values: Dict[str, Any]) -> Iterator[None]:
+    """Temporarily replace attributes of the app settings"""
+    from app.core.config import settings
+
+    saved = {name: getattr(settings, name) for name in values}
+    for name, value in values.items():
+        setattr(settings, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(settings, name, value)
+
+async def run_all(args: argparse.Namespace, scenarios: List[Scenario]) -> Dict[str, Dict[str, Any]]:
+    results = {}
+    # Over HTTP this process is only the load generator, so its own memory says nothing about the app
+    server_pid = getattr(args, "server_pid", None)
+    if not args.url:
+        rss = peak_rss_mb
+    elif server_pid and os.path.isdir("/proc"):
+        rss = lambda: server_peak_rss_mb(server_pid)
+    else:
+        rss = lambda: None
+
+    async def drive(client: httpx.AsyncClient, group: List[Scenario]):
+        for scenario in group:
+            requests = max(1, int(scenario.requests * args.scale))
+            results[scenario.name] = await run_scenario(
+                client, scenario, requests, scenario.concurrency or args.concurrency, rss
+            )
+            print(format_row(scenario.name, results[scenario.name]), flush=True)
+
+    print(format_header(), flush=True)
+    if args.url:
+        for scenario in scenarios:
+            if scenario.settings:
+                print(f"# {scenario.name}: the server's own settings apply, not {scenario.settings}", flush=True)
+        async with httpx.AsyncClient(base_url=args.url, timeout=None) as client:
+            await drive(client, scenarios)
+        return results
+
+    import main
+
+    # Consecutive scenarios with the same settings share one app; other settings get their own
+    for overrides, group in itertools.groupby(scenarios, key=lambda scenario: sorted(scenario.settings.items())):
+        with _overridden(dict(overrides)):
+            async with main.lifespan(main.app):
+                transport = httpx.ASGITransport(app=main.app)
+                async with httpx.AsyncClient(transport=transport, base_url="http://benchmark", timeout=None) as client:
+                    await drive(client, list(group))
+    return results
+
+def format_header() -> str:
+    return f"{'scenario':<26}{'reqs':>6}{'errors':>8}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'req/s':>10}{'items/s':>10}{'rss MB':>9}"
+
+def format_row(name: str, result: Dict[str, Any]) -> str:
+    return (
+        f"{name:<26}{result['requests']:>6}{result['errors']:>8}{result['p50_ms']:>10}"
+        f"{result['p95_ms']:>10}{result['p99_ms']:>10}{result['throughput_rps']:>10}"
+        f"{result.get('items_per_s', result['throughput_rps']):>10}{result['peak_rss_mb'] or '-':>9}"
+        + (f"   queue p50 {result['queue_p50_ms']} ms, p95 {result['queue_p95_ms']} ms" if "queue_p50_ms" in result else "")
+    )
+
+def compare(results: Dict[str, Dict[str, Any]], baseline: Dict[str, Dict[str, Any]], tolerance: float) -> List[str]:
+    """Regressions: p95 latency above, or throughput below, the baseline by more than tolerance"""
+    regressions = []
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        if result["p95_ms"] > base["p95_ms"] * (1 + tolerance):
+            regressions.append(f"{name}: p95 {result['p95_ms']} ms vs baseline {base['p95_ms']} ms")
+        if result["throughput_rps"] < base["throughput_rps"] * (1 - tolerance):
+            regressions.append(f"{name}: {result['throughput_rps']} req/s vs baseline {base['throughput_rps']} req/s")
+        if result["errors"] > base["errors"]:
+            regressions.append(f"{name}: {result['errors']} errors vs baseline {base['errors']}")
+    return regressions
+
+def configure_environment(args: argparse.Namespace):
+    """Point the in-process app at the fake backend and throwaway storage before it is imported"""
+    os.environ.setdefault("GEMINI_API_KEY", "benchmark")
+    os.environ["GEMINI_BACKEND"] = "fake"
+    os.environ["FAKE_GEMINI_LATENCY_MS"] = str(args.latency_ms)
+    os.environ["FAKE_GEMINI_JITTER_MS"] = str(args.jitter_ms)
+    os.environ["FAKE_GEMINI_ERROR_RATE"] = str(args.error_rate)
+    os.environ["FAKE_GEMINI_THROTTLE_RATE"] = str(args.throttle_rate)
+    os.environ["FAKE_GEMINI_OUTPUT_SCALE"] = str(args.output_scale)
+    # Measure the app, not the client-side Gemini quota
+    os.environ.setdefault("GEMINI_REQUESTS_PER_MINUTE", "0")
+    os.environ.setdefault("GEMINI_TOKENS_PER_MINUTE", "0")
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    os.environ["DATABASE_URL"] = "sqlite:///" + os.path.join(tempfile.mkdtemp(prefix="bench-"), "app.db")
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="Benchmark a running server instead of the in-process app")
+    parser.add_argument("--server-pid", type=int, help="With --url, report the peak RSS of this process and its workers")
+    parser.add_argument("--scenarios", help="Comma-separated scenario names (default: all)")
+    parser.add_argument("--list", action="store_true", help="List the scenarios and exit")
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--scale", type=float, default=1.0, help="Multiply every scenario's request count")
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=10)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="Share of model calls failing with a quota error")
+    parser.add_argument("--output-scale", type=int, default=1)
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+    parser.add_argument("--save-baseline", action="store_true")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed relative regression")
+    parser.add_argument("--output", help="Also write the results as JSON to this file")
+    args = parser.parse_args(argv)
+
+    if args.list:
+        for scenario in SCENARIOS.values():
+            print(f"{scenario.name:<26}{scenario.method:>5} {scenario.path}")
+        return 0
+
+    names = args.scenarios.split(",") if args.scenarios else list(SCENARIOS)
+    unknown = [name for name in names if name not in SCENARIOS]
+    if unknown:
+        parser.error(f"Unknown scenarios: {', '.join(unknown)}")
+
+    if not args.url:
+        configure_environment(args)
+    results = asyncio.run(run_all(args, [SCENARIOS[name] for name in names]))
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline, encoding="utf-8") as file:
+                baseline = json.load(file)
+        baseline.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as file:
+            json.dump(baseline, file, indent=2, sort_keys=True)
+            file.write("\n")
+        print(f"Baseline written to {args.baseline}")
+        return 0
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            regressions = compare(results, json.load(file), args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}")
+        return 1 if regressions else 0
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
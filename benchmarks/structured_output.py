@@ -0,0 +1,96 @@
+"""Compare schema-less prompts with structured-output mode on the fake backend.
+
+    python -m benchmarks.structured_output
+    python -m benchmarks.structured_output --malformed-rate 0.2 --scale 2
+
+Runs the same survey and roadmap requests once per mode, each in a fresh
+process, and reports prompt and output tokens per model call, how model
+output parsed (clean, repaired or failed) and failed requests. Only
+schema-less responses get malformed_rate formatting mistakes: with a
+response schema the fake backend, like constrained decoding, always
+returns conforming JSON.
+"""
+import argparse
+import asyncio
+import json
+import os
+import subprocess
+import sys
+from typing import Any, Dict, List, Optional
+
+from benchmarks.run import SCENARIOS, configure_environment, run_all
+
+WORKLOAD = ["survey_submit", "roadmap_weekly_1", "roadmap_weekly_3", "roadmap_daily_1"]
+
+def _totals(counter: Any) -> Dict[str, float]:
+    """Sum a labelled counter over endpoints, keyed by its last label"""
+    totals: Dict[str, float] = {}
+    for key, value in counter._values.items():
+        totals[key[-1]] = totals.get(key[-1], 0.0) + value
+    return totals
+
+def measure(args: argparse.Namespace) -> Dict[str, Any]:
+    """Run the workload in this process under the mode selected by the environment"""
+    configure_environment(args)
+    os.environ["FAKE_GEMINI_MALFORMED_RATE"] = str(args.malformed_rate)
+    # Let failed requests fail instead of retrying them away
+    os.environ["GEMINI_MAX_RETRIES"] = "0"
+
+    with open(os.devnull, "w") as devnull:
+        stdout, sys.stdout = sys.stdout, devnull
+        try:
+            results = asyncio.run(run_all(args, [SCENARIOS[name] for name in WORKLOAD]))
+        finally:
+            sys.stdout = stdout
+
+    from app.core.metrics import metrics
+
+    calls = _totals(metrics.llm_calls)
+    tokens = _totals(metrics.llm_tokens)
+    parses = _totals(metrics.llm_parses)
+    ok_calls = calls.get("ok", 0) or 1
+    return {
+        "model_calls": int(calls.get("ok", 0)),
+        "prompt_tokens_per_call": round(tokens.get("prompt", 0) / ok_calls, 1),
+        "output_tokens_per_call": round(tokens.get("output", 0) / ok_calls, 1),
+        "parse_clean": int(parses.get("clean", 0)),
+        "parse_repaired": int(parses.get("repaired", 0)),
+        "parse_failed": int(parses.get("failed", 0)),
+        "requests": sum(result["requests"] for result in results.values()),
+        "failed_requests": sum(result["errors"] for result in results.values()),
+    }
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--malformed-rate", type=float, default=0.1)
+    parser.add_argument("--scale", type=float, default=1.0)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--latency-ms", type=float, default=5)
+    parser.add_argument("--child", choices=("text", "structured"), help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+    args.url = None
+    args.jitter_ms, args.error_rate, args.output_scale = 0, 0.0, 1
+
+    if args.child:
+        os.environ["GEMINI_STRUCTURED_OUTPUT"] = "true" if args.child == "structured" else "false"
+        print(json.dumps(measure(args)))
+        return 0
+
+    rows = {}
+    for mode in ("text", "structured"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.structured_output", "--child", mode,
+             "--malformed-rate", str(args.malformed_rate), "--scale", str(args.scale),
+             "--concurrency", str(args.concurrency), "--latency-ms", str(args.latency_ms)],
+            check=True, capture_output=True, text=True,
+        ).stdout
+        rows[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"malformed rate for schema-less output: {args.malformed_rate}")
+    print(f"{'':<24}{'text':>12}{'structured':>12}")
+    for metric in rows["text"]:
+        print(f"{metric:<24}{rows['text'][metric]:>12}{rows['structured'][metric]:>12}")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
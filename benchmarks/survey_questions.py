@@ -0,0 +1,66 @@
+"""Per-request cost of GET /survey/questions, without the HTTP stack.
+
+    python -m benchmarks.survey_questions
+
+Compares rebuilding and re-serializing the question models on every call,
+as the endpoint used to, with serving the pre-serialized bank bytes.
+"""
+import argparse
+import sys
+import timeit
+from typing import Dict, List, Optional
+
+from fastapi.responses import Response
+from pydantic import TypeAdapter
+
+from app.core.config import settings
+from app.data.question_bank import question_bank
+from app.models.survey import SurveyQuestion
+
+# FastAPI builds the response_model validator once per route, not per request
+_response_adapter = TypeAdapter(Dict[str, List[SurveyQuestion]])
+
+def rebuild() -> bytes:
+    """The old path: build the models, then let response_model validate and serialize them"""
+    bank = question_bank.get()
+    questions = [
+        SurveyQuestion(
+            id=question["id"],
+            text=question["text"],
+            type=question["type"],
+            options=[option["text"] for option in question["options"]],
+        )
+        for question in bank.questions
+    ]
+    return _response_adapter.dump_json(_response_adapter.validate_python({"questions": questions}))
+
+def prebuilt(if_none_match: Optional[str] = None) -> Response:
+    bank = question_bank.negotiate(None, None, None, "es-MX,es;q=0.9,en;q=0.8")
+    headers = {
+        "ETag": bank.etag,
+        "Cache-Control": f"public, max-age={settings.SURVEY_QUESTIONS_MAX_AGE}",
+        "Content-Language": bank.locale,
+        "Vary": "Accept-Language",
+    }
+    if if_none_match == bank.etag:
+        return Response(status_code=304, headers=headers)
+    return Response(content=bank.body, media_type="application/json", headers=headers)
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--number", type=int, default=20000)
+    args = parser.parse_args(argv)
+
+    etag = question_bank.negotiate(None, None, None, "es-MX,es;q=0.9,en;q=0.8").etag
+    cases = {
+        "rebuild + serialize": rebuild,
+        "pre-serialized 200": prebuilt,
+        "pre-serialized 304": lambda: prebuilt(etag),
+    }
+    for name, func in cases.items():
+        seconds = min(timeit.repeat(func, number=args.number, repeat=3)) / args.number
+        print(f"{name:<22}{seconds * 1e6:>10.2f} us/request")
+    return 0
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
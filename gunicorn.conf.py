@@ -0,0 +1,54 @@
+"""Gunicorn settings for running the API on several worker processes.
+
+    gunicorn -c gunicorn.conf.py main:app
+    WEB_CONCURRENCY=4 gunicorn -c gunicorn.conf.py main:app
+
+With more than one worker, the workers share in-flight Gemini calls and
+the Gemini quota through SHARED_STATE_PATH, and persona results
+through the DATABASE_URL SQLite file, so adding workers neither multiplies
+quota use nor splits cache hits.
+"""
+import asyncio
+import multiprocessing
+import os
+import tempfile
+
+bind = os.getenv("BIND", "0.0.0.0:8010")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = "uvicorn.workers.UvicornWorker"
+# Long roadmaps stream for a while; keep in line with the slowest Gemini calls
+timeout = int(os.getenv("GUNICORN_TIMEOUT", "120"))
+graceful_timeout = 30
+keepalive = 5
+
+if workers > 1:
+    os.environ.setdefault("SHARED_STATE_PATH", os.path.join(tempfile.gettempdir(), "ai-personal-guide-shared.db"))
+    os.environ.setdefault("PERSONA_CACHE_PERSISTENT", "true")
+    os.environ.setdefault("CAREER_CACHE_PERSISTENT", "true")
+# Interrupted jobs are requeued once, below, rather than by each worker as it starts; jobs of
+# a worker that dies later are reclaimed by the others when their lease lapses
+os.environ["ROADMAP_JOB_RECOVERY"] = "false"
+
+def on_starting(server):
+    """Runs once in the master before any worker exists"""
+    from app.core.config import settings
+    from app.db.pool import create_pool
+    from app.db.repositories import JobRepository, create_tables
+    from app.utils.shared_state import open_shared_store
+
+    async def requeue_interrupted() -> int:
+        pool = create_pool(settings.DATABASE_URL, 1)
+        try:
+            await create_tables(pool)
+            return await JobRepository(pool).requeue_interrupted()
+        finally:
+            pool.close()
+
+    requeued = asyncio.run(requeue_interrupted())
+    server.log.info("Requeued %d interrupted roadmap jobs", requeued)
+
+    # Leases and results left by workers of a previous run can't be released by anyone else
+    store = open_shared_store()
+    if store is not None:
+        store.clear_leases()
+        store.close()
@@ -1,13 +1,99 @@
-from fastapi import FastAPI
+import asyncio
+import time
+from contextlib import asynccontextmanager
+
+from fastapi import Depends, FastAPI, Request
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse
 
 from app.api.router import api_router
 from app.core.config import settings
+from app.core.logging import configure_logging
+from app.core.metrics import metrics, track_endpoint
+from app.db.pool import create_pool
+from app.db.repositories import JobRepository, RoadmapRepository, create_tables
+from app.prompts.careers import PACKED_CAREERS
+from app.services.career_matcher import CareerMatcherService
+from app.services.persona_detector import PersonaBatchers, PersonaDetectorService
+from app.services.roadmap_generator import RoadmapGeneratorService
+from app.services.roadmap_jobs import RoadmapJobQueue
+from app.utils.cache import build_tiered_cache
+from app.utils.gemini_client import GeminiClient
+from app.utils.micro_batcher import MicroBatcher
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    configure_logging()
+    # Build the Gemini client once; genai.configure and model setup are not per request
+    app.state.gemini_client = GeminiClient()
+    app.state.db = create_pool(settings.DATABASE_URL, settings.DATABASE_POOL_SIZE)
+    await create_tables(app.state.db)
+    app.state.persona_cache = build_tiered_cache(
+        "persona",
+        max_size=settings.PERSONA_CACHE_SIZE,
+        ttl=settings.PERSONA_CACHE_TTL_SECONDS,
+        persistent=settings.PERSONA_CACHE_PERSISTENT,
+    )
+    app.state.career_cache = build_tiered_cache(
+        "career",
+        max_size=settings.CAREER_CACHE_SIZE,
+        ttl=settings.CAREER_CACHE_TTL_SECONDS,
+        persistent=settings.CAREER_CACHE_PERSISTENT,
+    )
+    app.state.roadmap_template_cache = build_tiered_cache(
+        "roadmap_template",
+        max_size=settings.ROADMAP_TEMPLATE_CACHE_SIZE,
+        ttl=settings.ROADMAP_TEMPLATE_TTL_SECONDS,
+        persistent=settings.ROADMAP_TEMPLATE_PERSISTENT,
+        max_entries=settings.ROADMAP_TEMPLATE_STORE_SIZE,
+    )
+
+    # Batch handlers call Gemini directly; only request-facing services submit to the batchers
+    app.state.persona_batchers = None
+    app.state.career_batcher = None
+    if settings.PROMPT_BATCH_WINDOW_MS > 0:
+        window = settings.PROMPT_BATCH_WINDOW_MS / 1000
+        app.state.persona_batchers = PersonaBatchers(
+            PersonaDetectorService(app.state.gemini_client, app.state.persona_cache, None),
+            window, settings.PERSONA_PACK_SIZE,
+        )
+        app.state.career_batcher = MicroBatcher(
+            CareerMatcherService(app.state.gemini_client, app.state.career_cache, None).match_careers_many,
+            window, min(settings.PERSONA_PACK_SIZE, PACKED_CAREERS.max_units()),
+        )
+
+    app.state.roadmap_jobs = RoadmapJobQueue(
+        JobRepository(app.state.db),
+        RoadmapRepository(app.state.db),
+        RoadmapGeneratorService(app.state.gemini_client, app.state.roadmap_template_cache),
+        workers=settings.ROADMAP_JOB_WORKERS,
+        lease_seconds=settings.ROADMAP_JOB_LEASE_SECONDS,
+    )
+    await app.state.roadmap_jobs.start()
+
+    # Warm the career memo table in the background so startup is not blocked
+    prewarm_task = None
+    if settings.CAREER_CACHE_PREWARM:
+        career_matcher = CareerMatcherService(
+            app.state.gemini_client, app.state.career_cache, app.state.career_batcher
+        )
+        prewarm_task = asyncio.create_task(career_matcher.prewarm())
+
+    yield
+    if prewarm_task is not None:
+        prewarm_task.cancel()
+    await app.state.roadmap_jobs.close()
+    app.state.roadmap_template_cache.close()
+    app.state.persona_cache.close()
+    app.state.career_cache.close()
+    app.state.gemini_client.close()
+    app.state.db.close()
 
 app = FastAPI(
     title="AI Personal Guide API",
     description="Survey-Based Persona Detection and AI-Generated Roadmap API",
     version="1.0.0",
+    lifespan=lifespan,
 )
 
 # Configure CORS
@@ -19,13 +105,44 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
+@app.middleware("http")
+async def record_request_time(request: Request, call_next):
+    started = time.perf_counter()
+    response = await call_next(request)
+    # Label by route template so ids in paths don't multiply the series
+    route = request.scope.get("route")
+    if route is not None:
+        metrics.record_request(route.path, request.method, response.status_code, time.perf_counter() - started)
+    return response
+
 # Include API router
-app.include_router(api_router, prefix="/api")
+app.include_router(api_router, prefix="/api", dependencies=[Depends(track_endpoint)])
 
 @app.get("/")
 async def root():
     return {"message": "Welcome to AI Personal Guide API", "version": "1.0.0"}
 
+@app.get("/stats")
+async def stats(request: Request):
+    """Runtime counters for the Gemini client and caches"""
+    return {
+        "gemini": request.app.state.gemini_client.stats(),
+        "persona_cache": request.app.state.persona_cache.stats(),
+        "career_cache": request.app.state.career_cache.stats(),
+        "roadmap_template_cache": request.app.state.roadmap_template_cache.stats(),
+        "db": request.app.state.db.stats(),
+        "roadmap_jobs": request.app.state.roadmap_jobs.stats(),
+        "persona_batchers": batchers.stats() if (batchers := request.app.state.persona_batchers) else None,
+        "career_batcher": batcher.stats() if (batcher := request.app.state.career_batcher) else None,
+    }
+
+@app.get("/metrics", response_class=PlainTextResponse)
+async def prometheus_metrics():
+    """Prometheus text exposition of request, stage, token and cache metrics"""
+    if not metrics.enabled:
+        return PlainTextResponse("Metrics are disabled\n", status_code=404)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
 if __name__ == "__main__":
     import uvicorn
     uvicorn.run("app.main:app", host="0.0.0.0", port=8010, reload=True)
\ No newline at end of file
@@ -0,0 +1,24 @@
+import pytest
+from fastapi import HTTPException
+
+from app.api.errors import http_errors
+from app.utils.resilience import RateLimitedError
+
+def test_http_exceptions_pass_through():
+    with pytest.raises(HTTPException) as error:
+        with http_errors():
+            raise HTTPException(status_code=404, detail="missing")
+    assert error.value.status_code == 404
+
+def test_upstream_errors_become_503_with_retry_after():
+    with pytest.raises(HTTPException) as error:
+        with http_errors():
+            raise RateLimitedError("quota", retry_after=2.2)
+    assert error.value.status_code == 503
+    assert error.value.headers == {"Retry-After": "3"}
+
+def test_other_errors_become_500():
+    with pytest.raises(HTTPException) as error:
+        with http_errors():
+            raise KeyError("weeks")
+    assert error.value.status_code == 500
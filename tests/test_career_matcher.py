@@ -0,0 +1,30 @@
+import asyncio
+
+from app.services.career_matcher import CareerMatcherService
+from app.utils.cache import LRUCache, TieredCache
+
+PERSONA = {"primary": {"type": "analytical", "description": "Analytical people"}, "secondary": None}
+
+class CountingClient:
+    structured_output = False
+
+    def __init__(self):
+        self.calls = 0
+
+    async def generate_content(self, prompt, output_type=None, max_output_tokens=None):
+        self.calls += 1
+        return [{"career": "engineer", "confidence": 0.8, "description": "Builds systems"}]
+
+def test_callers_cannot_change_memoized_careers():
+    async def scenario():
+        client = CountingClient()
+        service = CareerMatcherService(client, TieredCache(LRUCache(16)), None)
+        first = await service.match_careers(PERSONA)
+        first[0]["career"] = "changed"
+        second = await service.match_careers(PERSONA)
+        second.append({"career": "extra"})
+        return client, await service.match_careers(PERSONA)
+
+    client, careers = asyncio.run(scenario())
+    assert client.calls == 1
+    assert careers == [{"career": "engineer", "confidence": 0.8, "description": "Builds systems"}]
@@ -0,0 +1,85 @@
+import asyncio
+import http.server
+import os
+import threading
+import urllib.error
+import urllib.request
+
+import pytest
+
+from app.core.config import settings
+from app.db.pool import SQLitePool
+from app.db.repositories import JobRepository, create_tables
+from app.services.roadmap_jobs import RoadmapJobQueue, _callback_opener, check_callback_url
+
+@pytest.mark.parametrize("url", [
+    "ftp://example.com/hook",
+    "example.com/hook",
+    "http:///hook",
+    "http://127.0.0.1/hook",
+    "http://localhost:8010/hook",
+    "http://10.0.0.5/hook",
+    "http://192.168.1.1/hook",
+    "http://169.254.169.254/latest/meta-data",
+    "http://[::1]/hook",
+    "http://[::ffff:127.0.0.1]/hook",
+    "http://0.0.0.0/hook",
+])
+def test_unsafe_callback_urls_are_rejected(url):
+    with pytest.raises(ValueError):
+        asyncio.run(check_callback_url(url))
+
+def test_public_addresses_are_allowed():
+    asyncio.run(check_callback_url("https://8.8.8.8/hook"))
+
+def test_allowlist_replaces_the_address_check(monkeypatch):
+    monkeypatch.setattr(settings, "ROADMAP_JOB_CALLBACK_HOSTS", "hooks.internal, LOCALHOST")
+    asyncio.run(check_callback_url("http://localhost:9000/hook"))
+    asyncio.run(check_callback_url("http://hooks.internal/hook"))
+    with pytest.raises(ValueError):
+        asyncio.run(check_callback_url("https://8.8.8.8/hook"))
+
+class _Redirecting(http.server.BaseHTTPRequestHandler):
+    hits = []
+
+    def do_POST(self):
+        self.hits.append(self.path)
+        self.send_response(302 if self.path == "/hook" else 200)
+        self.send_header("Location", "/internal")
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def log_message(self, *args):
+        pass
+
+def test_callbacks_do_not_follow_redirects():
+    server = http.server.HTTPServer(("127.0.0.1", 0), _Redirecting)
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    try:
+        request = urllib.request.Request(f"http://127.0.0.1:{server.server_port}/hook", data=b"{}", method="POST")
+        with pytest.raises(urllib.error.HTTPError) as error:
+            _callback_opener.open(request, timeout=5)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert error.value.code == 302
+    assert _Redirecting.hits == ["/hook"]
+
+def test_priorities_are_clamped(tmp_path, monkeypatch):
+    monkeypatch.setattr(settings, "ROADMAP_JOB_MAX_PRIORITY", 3)
+
+    async def scenario():
+        pool = SQLitePool(os.path.join(tmp_path, "app.db"), 1)
+        await create_tables(pool)
+        jobs = JobRepository(pool)
+        # Not started, so the jobs stay queued
+        queue = RoadmapJobQueue(jobs, None, None)
+        priorities = []
+        for priority in (-5, 0, 2, 10**9):
+            job_id = await queue.submit({"persona_type": "analytical"}, priority=priority)
+            priorities.append((await jobs.get(job_id)).priority)
+        pool.close()
+        return priorities
+
+    assert asyncio.run(scenario()) == [0, 0, 2, 3]
@@ -0,0 +1,203 @@
+import asyncio
+import os
+import time
+
+import pytest
+
+from app.core.config import settings
+from app.db.pool import SQLitePool
+from app.db.repositories import JobRepository, create_tables
+from app.models.job import JobState
+from app.services.roadmap_jobs import RoadmapJobQueue
+
+class StubGenerator:
+    """Roadmap generator stand-in: hangs while hang is set, as a dying worker would, and otherwise fails at once"""
+    def __init__(self, hang: bool = False):
+        self.hang = hang
+        self.calls = 0
+
+    async def generate_roadmap(self, **params):
+        self.calls += 1
+        if self.hang:
+            await asyncio.Event().wait()
+        raise RuntimeError("no roadmap in tests")
+
+class StubRoadmaps:
+    async def save(self, roadmap):
+        pass
+
+@pytest.fixture
+def database(tmp_path):
+    return os.path.join(tmp_path, "app.db")
+
+async def _repository(path: str) -> JobRepository:
+    pool = SQLitePool(path, 2)
+    await create_tables(pool)
+    return JobRepository(pool)
+
+async def _status(jobs: JobRepository, job_id: str) -> str:
+    return (await jobs.get(job_id)).status
+
+def test_running_job_is_only_claimed_again_once_its_lease_expires(database):
+    async def scenario():
+        jobs = await _repository(database)
+        await jobs.create("job", None, 0, {}, None)
+        assert await jobs.claim("job", "worker-a", lease_seconds=0.2)
+        assert not await jobs.claim("job", "worker-b", lease_seconds=0.2)
+        assert await jobs.reclaimable(lease_seconds=60) == []
+        await asyncio.sleep(0.3)
+        assert [row[0] for row in await jobs.reclaimable(lease_seconds=60)] == ["job"]
+        assert await jobs.claim("job", "worker-b", lease_seconds=0.2)
+        # The first worker finds out at its next renewal
+        assert not await jobs.renew_lease("job", "worker-a", 0.2)
+        assert await jobs.renew_lease("job", "worker-b", 0.2)
+        jobs.db.close()
+
+    asyncio.run(scenario())
+
+def test_jobs_left_queued_by_another_process_become_reclaimable(database):
+    async def scenario():
+        jobs = await _repository(database)
+        await jobs.create("job", None, 0, {}, None)
+        assert await jobs.reclaimable(lease_seconds=60) == []
+        await jobs.db.execute("UPDATE jobs SET created_at = ?", (time.time() - 120,))
+        assert [row[0] for row in await jobs.reclaimable(lease_seconds=60)] == ["job"]
+        jobs.db.close()
+
+    asyncio.run(scenario())
+
+def test_surviving_worker_takes_over_the_jobs_of_a_dead_one(database, monkeypatch):
+    # As under gunicorn, where only the master requeues interrupted jobs, at startup
+    monkeypatch.setattr(settings, "ROADMAP_JOB_RECOVERY", False)
+
+    async def scenario():
+        crashed_jobs, surviving_jobs = await _repository(database), await _repository(database)
+        crashed = RoadmapJobQueue(crashed_jobs, StubRoadmaps(), StubGenerator(hang=True), workers=1, lease_seconds=0.3)
+        surviving_generator = StubGenerator()
+        surviving = RoadmapJobQueue(surviving_jobs, StubRoadmaps(), surviving_generator, workers=1, lease_seconds=0.3)
+        await crashed.start()
+        job_id = await crashed.submit({"persona_type": "analytical"})
+        while await _status(crashed_jobs, job_id) != JobState.RUNNING:
+            await asyncio.sleep(0.01)
+
+        # The process dies: nothing renews the lease or finishes the job
+        for task in crashed._workers:
+            task.cancel()
+        await asyncio.gather(*crashed._workers, return_exceptions=True)
+        assert await _status(surviving_jobs, job_id) == JobState.RUNNING
+
+        await surviving.start()
+        deadline = time.monotonic() + 5
+        while await _status(surviving_jobs, job_id) not in (JobState.DONE, JobState.FAILED) and time.monotonic() < deadline:
+            await asyncio.sleep(0.05)
+        status = await _status(surviving_jobs, job_id)
+        await surviving.close()
+        crashed_jobs.db.close()
+        surviving_jobs.db.close()
+        return status, surviving_generator.calls, surviving.stats()
+
+    status, calls, stats = asyncio.run(scenario())
+    assert status == JobState.FAILED
+    assert calls == 1
+    assert stats["reclaimed"] == 1
+
+def test_lease_is_renewed_while_a_long_job_runs(database):
+    async def scenario():
+        jobs = await _repository(database)
+        generator = StubGenerator(hang=True)
+        queue = RoadmapJobQueue(jobs, StubRoadmaps(), generator, workers=1, lease_seconds=0.15)
+        await queue.start()
+        job_id = await queue.submit({"persona_type": "analytical"})
+        # Several lease periods go by
+        await asyncio.sleep(0.6)
+        reclaimable = await jobs.reclaimable(lease_seconds=0.15)
+        status = await _status(jobs, job_id)
+        await queue.close()
+        jobs.db.close()
+        return reclaimable, status, generator.calls, queue.stats()
+
+    reclaimable, status, calls, stats = asyncio.run(scenario())
+    assert reclaimable == []
+    assert status == JobState.RUNNING
+    assert calls == 1
+    assert stats["lost_leases"] == 0
+
+class ReleasableGenerator:
+    """Roadmap generator stand-in that finishes, with a roadmap or an error, once released"""
+    def __init__(self, fail: bool):
+        self.fail = fail
+        self.release = asyncio.Event()
+
+    async def generate_roadmap(self, **params):
+        await self.release.wait()
+        if self.fail:
+            raise RuntimeError("upstream down")
+        return StubRoadmap()
+
+class StubRoadmap:
+    user_id = "user"
+
+    def model_dump_json(self):
+        return "{}"
+
+class RecordingRoadmaps:
+    def __init__(self):
+        self.saved = []
+
+    async def save(self, roadmap):
+        self.saved.append(roadmap)
+
+def test_finishing_needs_the_lease(database):
+    async def scenario():
+        jobs = await _repository(database)
+        await jobs.create("job", None, 0, {}, None)
+        assert await jobs.claim("job", "worker-a", lease_seconds=60)
+        assert not await jobs.mark_done("job", "worker-b", StubRoadmap())
+        assert not await jobs.mark_failed("job", "worker-b", "error")
+        assert await jobs.mark_failed("job", "worker-a", "error")
+        # A finished job is not finished again
+        assert not await jobs.mark_done("job", "worker-a", StubRoadmap())
+        status = await _status(jobs, "job")
+        jobs.db.close()
+        return status
+
+    assert asyncio.run(scenario()) == JobState.FAILED
+
+@pytest.mark.parametrize("fail", [False, True], ids=["done", "failed"])
+def test_old_owner_finishing_after_the_job_was_reclaimed_changes_nothing(database, fail):
+    async def scenario():
+        jobs = await _repository(database)
+        generator = ReleasableGenerator(fail)
+        roadmaps = RecordingRoadmaps()
+        # A long lease: the old owner would only notice the loss at its next renewal
+        queue = RoadmapJobQueue(jobs, roadmaps, generator, workers=1, lease_seconds=60)
+        notified = []
+
+        async def notify(job_id, callback_url):
+            notified.append(job_id)
+
+        queue._notify = notify
+        await queue.start()
+        job_id = await queue.submit({"persona_type": "analytical"}, callback_url="https://8.8.8.8/hook")
+        while await _status(jobs, job_id) != JobState.RUNNING:
+            await asyncio.sleep(0.01)
+
+        # The lease lapses, say while the worker was stalled, and another process reclaims the job
+        await jobs.db.execute("UPDATE jobs SET lease_expires_at = 0 WHERE id = ?", (job_id,))
+        assert await jobs.claim(job_id, "worker-b", lease_seconds=60)
+
+        generator.release.set()
+        while queue.running:
+            await asyncio.sleep(0.01)
+        status = await _status(jobs, job_id)
+        owner = (await jobs.db.fetchone("SELECT lease_owner FROM jobs WHERE id = ?", (job_id,)))[0]
+        await queue.close()
+        jobs.db.close()
+        return status, owner, roadmaps.saved, notified, queue.stats()
+
+    status, owner, saved, notified, stats = asyncio.run(scenario())
+    assert status == JobState.RUNNING
+    assert owner == "worker-b"
+    assert saved == [] and notified == []
+    assert stats["lost_leases"] == 1
+    assert stats["completed"] == 0 and stats["failed"] == 0
@@ -0,0 +1,30 @@
+import pytest
+
+from app.utils.json_parser import IncompleteJSONError, parse_model_json
+from benchmarks.json_corpus import build_corpus
+
+CORPUS = build_corpus(size=1500, seed=7)
+
+@pytest.mark.parametrize("case", [case for case in CORPUS if not case.rejected], ids=lambda case: case.kind)
+def test_malformed_output_is_repaired_to_the_original_value(case):
+    assert parse_model_json(case.text) == case.expected
+
+@pytest.mark.parametrize("case", [case for case in CORPUS if case.kind == "truncated"], ids=lambda case: case.kind)
+def test_truncated_output_is_rejected(case):
+    with pytest.raises(IncompleteJSONError):
+        parse_model_json(case.text)
+
+@pytest.mark.parametrize("case", [case for case in CORPUS if case.kind == "no_json"], ids=lambda case: case.kind)
+def test_output_without_json_is_rejected(case):
+    with pytest.raises(ValueError):
+        parse_model_json(case.text)
+
+def test_truncation_is_only_tolerated_when_asked_for():
+    text = '{"weeks": [{"week_number": 1}, {"week_number": 2}, {"week_'
+    with pytest.raises(IncompleteJSONError):
+        parse_model_json(text)
+    assert parse_model_json(text, allow_truncated=True) == {"weeks": [{"week_number": 1}, {"week_number": 2}]}
+
+def test_corpus_covers_every_kind():
+    kinds = {case.kind for case in CORPUS}
+    assert {"clean", "combined", "truncated", "no_json", "fenced", "single_quotes", "python_literals"} <= kinds
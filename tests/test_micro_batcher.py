@@ -0,0 +1,91 @@
+import asyncio
+
+import pytest
+
+from app.services.career_matcher import CareerMatcherService
+from app.utils.cache import LRUCache, TieredCache
+from app.utils.micro_batcher import MicroBatcher
+
+class RecordingHandler:
+    """Batch handler that records each batch and returns one result per item"""
+    def __init__(self, results=None):
+        self.batches = []
+        self.results = results
+
+    async def __call__(self, items):
+        self.batches.append(list(items))
+        return self.results or [item * 10 for item in items]
+
+def test_a_full_batch_is_sent_without_waiting_for_the_window():
+    async def scenario():
+        handler = RecordingHandler()
+        batcher = MicroBatcher(handler, window=60, max_batch=3)
+        results = await asyncio.wait_for(asyncio.gather(*(batcher.submit(i) for i in (1, 2, 3))), timeout=1)
+        return handler, results
+
+    handler, results = asyncio.run(scenario())
+    assert handler.batches == [[1, 2, 3]]
+    assert results == [10, 20, 30]
+
+def test_cancelled_waiters_are_left_out_of_the_batch():
+    async def scenario():
+        handler = RecordingHandler()
+        batcher = MicroBatcher(handler, window=0.02, max_batch=10)
+        kept = asyncio.ensure_future(batcher.submit(1))
+        dropped = asyncio.ensure_future(batcher.submit(2))
+        await asyncio.sleep(0)
+        dropped.cancel()
+        return handler, await kept, batcher.stats()
+
+    handler, result, stats = asyncio.run(scenario())
+    assert handler.batches == [[1]]
+    assert result == 10
+    assert stats["items"] == 1
+
+def test_an_exception_result_reaches_only_its_caller():
+    async def scenario():
+        batcher = MicroBatcher(RecordingHandler([1, ValueError("bad item"), 3]), window=0.01, max_batch=10)
+        return await asyncio.gather(*(batcher.submit(i) for i in range(3)), return_exceptions=True)
+
+    first, second, third = asyncio.run(scenario())
+    assert (first, third) == (1, 3)
+    assert isinstance(second, ValueError)
+
+def _careers(name):
+    return [{"career": name, "confidence": 0.9, "description": f"Works as a {name}"}]
+
+def _persona(primary):
+    return {"primary": {"type": primary, "description": f"{primary} people"}, "secondary": None}
+
+class PackedClient:
+    """Answers packed prompts for profile 0, with garbage for profile 1, and single prompts for creative personas only"""
+    structured_output = False
+
+    def __init__(self):
+        self.single_prompts = []
+
+    async def generate_content(self, prompt, output_type=None, max_output_tokens=None):
+        if "Profile 0:" in prompt:
+            return [{"id": 0, "careers": _careers("doctor")}, {"id": 1, "careers": "not a list"}]
+        self.single_prompts.append(prompt)
+        if "creative" in prompt:
+            return _careers("artist")
+        raise RuntimeError("upstream down")
+
+def test_packed_items_missing_or_invalid_fall_back_to_their_own_calls():
+    async def scenario():
+        client = PackedClient()
+        service = CareerMatcherService(client, TieredCache(LRUCache(16)), None)
+        service.batcher = MicroBatcher(service.match_careers_many, window=0.01, max_batch=10)
+        results = await asyncio.gather(
+            *(service.match_careers(_persona(primary)) for primary in ("analytical", "creative", "empathetic")),
+            return_exceptions=True,
+        )
+        return client, results
+
+    client, (analytical, creative, empathetic) = asyncio.run(scenario())
+    assert analytical == _careers("doctor")
+    # Profile 1 came back invalid and profile 2 missing; each retried alone
+    assert creative == _careers("artist")
+    assert isinstance(empathetic, RuntimeError)
+    assert len(client.single_prompts) == 2
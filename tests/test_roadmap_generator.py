@@ -0,0 +1,28 @@
+import asyncio
+
+from app.prompts.roadmap import WEEKLY
+from app.services.roadmap_generator import RoadmapGeneratorService
+from app.utils.model_backends import FakeBackend
+
+class ScriptedClient:
+    """Gemini client stand-in returning one prepared response"""
+    structured_output = False
+
+    def __init__(self, response):
+        self.response = response
+
+    async def generate_content(self, prompt, output_type=None, max_output_tokens=None):
+        return self.response
+
+def test_single_prompt_weeks_are_renumbered_in_order():
+    prompt = WEEKLY.render(False, persona_type="analytical", duration_months=1, weeks=5)
+    response = FakeBackend(latency=0, jitter=0).synthesize(prompt)
+    # Models restart, repeat and skip week numbers, and sometimes write a week too many
+    for week, number in zip(response["weeks"], (3, 3, 9, 0, 11)):
+        week["week_number"] = number
+
+    generator = RoadmapGeneratorService(ScriptedClient(response), None)
+    _, weeks = asyncio.run(generator._generate_weeks_monolithic("analytical", 1))
+
+    assert [week.week_number for week in weeks] == [1, 2, 3, 4]
+    assert [week.theme for week in weeks] == [week["theme"] for week in response["weeks"][:4]]
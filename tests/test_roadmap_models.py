@@ -0,0 +1,35 @@
+from datetime import time
+
+import pytest
+from pydantic import TypeAdapter, ValidationError
+
+from app.models.roadmap import LenientTime, Priority
+
+TIME = TypeAdapter(LenientTime)
+PRIORITY = TypeAdapter(Priority)
+
+@pytest.mark.parametrize("value, expected", [
+    ("09:30", time(9, 30)),
+    ("9:00", time(9, 0)),
+    ("21:00:00", time(21, 0)),
+    ("9:00 PM", time(21, 0)),
+    ("12:15 am", time(0, 15)),
+    ("12:00 PM", time(12, 0)),
+    ("0:30 AM", time(0, 30)),
+])
+def test_model_time_formats_are_accepted(value, expected):
+    assert TIME.validate_python(value) == expected
+
+@pytest.mark.parametrize("value", ["25:00", "24:00", "9:60", "23:59:60", "13:00 PM", "99:99", "noon", "9"])
+def test_out_of_range_times_are_rejected(value):
+    with pytest.raises(ValidationError):
+        TIME.validate_python(value)
+
+@pytest.mark.parametrize("value, expected", [(3, 3), ("high", 1), ("7", 5), (-2, 1), (2.6, 3)])
+def test_priorities_are_clamped(value, expected):
+    assert PRIORITY.validate_python(value) == expected
+
+@pytest.mark.parametrize("value", ["inf", "-inf", "nan", float("inf"), float("nan"), "urgent", None])
+def test_invalid_and_non_finite_priorities_are_rejected(value):
+    with pytest.raises(ValidationError):
+        PRIORITY.validate_python(value)
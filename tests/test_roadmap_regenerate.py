@@ -0,0 +1,40 @@
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+
+from app.core.config import settings
+
+@pytest.fixture
+def client(monkeypatch, tmp_path):
+    """The app on an instant fake backend, with a stored 1-month weekly roadmap for user "reader" """
+    for name, value in {
+        "GEMINI_BACKEND": "fake",
+        "FAKE_GEMINI_LATENCY_MS": 0.0,
+        "FAKE_GEMINI_JITTER_MS": 0.0,
+        "FAKE_GEMINI_ERROR_RATE": 0.0,
+        "FAKE_GEMINI_THROTTLE_RATE": 0.0,
+        "GEMINI_REQUESTS_PER_MINUTE": 0,
+        "GEMINI_TOKENS_PER_MINUTE": 0,
+        "SHARED_STATE_PATH": "",
+        "DATABASE_URL": "sqlite:///" + os.path.join(tmp_path, "app.db"),
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    from main import app
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/roadmap/generate",
+            params={"persona_type": "analytical", "duration_months": 1, "user_id": "reader"},
+        )
+        assert response.status_code == 200
+        yield client
+
+def test_last_defaults_to_first(client):
+    response = client.post("/api/roadmap/reader/regenerate", params={"first": 2})
+    assert response.status_code == 200
+
+@pytest.mark.parametrize("first, last", [(1, 0), (2, 1), (0, 1), (1, 99)])
+def test_ranges_outside_the_roadmap_are_rejected(client, first, last):
+    response = client.post("/api/roadmap/reader/regenerate", params={"first": first, "last": last})
+    assert response.status_code == 400
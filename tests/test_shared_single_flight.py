@@ -0,0 +1,110 @@
+import asyncio
+import os
+
+import pytest
+
+from app.utils.shared_state import SharedSingleFlight, SharedStore
+
+class CountingCall:
+    """Upstream stand-in that counts its calls and blocks until released"""
+    def __init__(self, result=None, error=None):
+        self.result = {"weeks": [1, 2]} if result is None else result
+        self.error = error
+        self.calls = 0
+        self.release = asyncio.Event()
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+@pytest.fixture
+def workers(tmp_path):
+    """Two single-flights on one shared file, as two worker processes would have"""
+    path = os.path.join(tmp_path, "shared.db")
+    stores = [SharedStore(path), SharedStore(path)]
+    yield [SharedSingleFlight(store, lease_seconds=30, poll_interval=0.01) for store in stores]
+    for store in stores:
+        store.close()
+
+async def _started(call: CountingCall):
+    while call.calls == 0:
+        await asyncio.sleep(0.005)
+
+def test_identical_calls_in_two_workers_share_one_upstream_call(workers):
+    async def scenario():
+        call = CountingCall()
+        first = asyncio.ensure_future(workers[0].do("key", call))
+        await _started(call)
+        second = asyncio.ensure_future(workers[1].do("key", call))
+        await asyncio.sleep(0.05)
+        call.release.set()
+        return call, await first, await second
+
+    call, first, second = asyncio.run(scenario())
+    assert call.calls == 1
+    assert first == second == {"weeks": [1, 2]}
+    assert workers[1].stats()["handoffs"] == 1
+    assert workers[1].stats()["remote_waits"] == 1
+
+def test_finished_calls_are_not_cached(workers):
+    async def scenario():
+        call = CountingCall()
+        call.release.set()
+        await workers[0].do("key", call)
+        await workers[1].do("key", call)
+        await workers[0].do("key", call)
+        return call
+
+    assert asyncio.run(scenario()).calls == 3
+
+def test_polling_does_not_write(workers):
+    async def scenario():
+        call = CountingCall()
+        first = asyncio.ensure_future(workers[0].do("key", call))
+        await _started(call)
+        second = asyncio.ensure_future(workers[1].do("key", call))
+        await asyncio.sleep(0.03)
+        changes = workers[1].store._conn.total_changes
+        # Several poll intervals pass while the first worker still runs the call
+        await asyncio.sleep(0.1)
+        polled_changes = workers[1].store._conn.total_changes
+        call.release.set()
+        await asyncio.gather(first, second)
+        return changes, polled_changes
+
+    changes, polled_changes = asyncio.run(scenario())
+    assert polled_changes == changes
+
+def test_waiter_takes_over_when_the_holder_fails(workers):
+    async def scenario():
+        failing = CountingCall(error=RuntimeError("upstream down"))
+        succeeding = CountingCall(result={"ok": True})
+        succeeding.release.set()
+        first = asyncio.ensure_future(workers[0].do("key", failing))
+        await _started(failing)
+        second = asyncio.ensure_future(workers[1].do("key", succeeding))
+        await asyncio.sleep(0.03)
+        failing.release.set()
+        with pytest.raises(RuntimeError):
+            await first
+        return await second, succeeding.calls
+
+    result, calls = asyncio.run(scenario())
+    assert result == {"ok": True}
+    assert calls == 1
+
+def test_cancelled_holder_releases_its_lease(workers):
+    async def scenario():
+        call = CountingCall()
+        first = asyncio.ensure_future(workers[0].do("key", call))
+        await _started(call)
+        first.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await first
+        return await asyncio.to_thread(workers[1].store.poll_flight, "key", None)
+
+    holder, value = asyncio.run(scenario())
+    assert holder is None and value is None
@@ -0,0 +1,133 @@
+import asyncio
+
+import pytest
+
+from app.utils.single_flight import SingleFlight
+
+N = 50
+
+class CountingCall:
+    """Upstream stand-in that counts calls and finishes when released"""
+    def __init__(self, result=None, error=None):
+        self.calls = 0
+        self.release = asyncio.Event()
+        self.result = result
+        self.error = error
+
+    async def __call__(self):
+        self.calls += 1
+        await self.release.wait()
+        if self.error is not None:
+            raise self.error
+        return self.result
+
+async def start(flight, key, upstream, count=N):
+    """Start count identical callers and let all of them join before the upstream call finishes"""
+    tasks = [asyncio.create_task(flight.do(key, upstream)) for _ in range(count)]
+    await asyncio.sleep(0)
+    return tasks
+
+def test_identical_concurrent_calls_share_one_upstream_call():
+    async def run():
+        flight = SingleFlight()
+        upstream = CountingCall({"weeks": [1, 2, 3]})
+        tasks = await start(flight, "prompt", upstream)
+        upstream.release.set()
+        results = await asyncio.gather(*tasks)
+
+        assert upstream.calls == 1
+        assert results == [{"weeks": [1, 2, 3]}] * N
+        # Callers get independent copies
+        assert len({id(result) for result in results}) == N
+        assert flight.stats() == {"in_flight": 0, "executions": 1, "coalesced": N - 1}
+
+    asyncio.run(run())
+
+def test_different_keys_are_not_coalesced():
+    async def run():
+        flight = SingleFlight()
+        upstream = CountingCall("ok")
+        tasks = [asyncio.create_task(flight.do(f"prompt-{i}", upstream)) for i in range(5)]
+        await asyncio.sleep(0)
+        upstream.release.set()
+        await asyncio.gather(*tasks)
+        assert upstream.calls == 5
+
+    asyncio.run(run())
+
+def test_error_reaches_every_waiter():
+    async def run():
+        flight = SingleFlight()
+        upstream = CountingCall(error=ValueError("bad output"))
+        tasks = await start(flight, "prompt", upstream)
+        upstream.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert upstream.calls == 1
+        assert all(isinstance(result, ValueError) for result in results)
+        # A failed call is not remembered; the next caller runs again
+        upstream.error = None
+        upstream.result = "recovered"
+        assert await flight.do("prompt", upstream) == "recovered"
+        assert upstream.calls == 2
+
+    asyncio.run(run())
+
+def test_cancelled_upstream_call_cancels_every_waiter():
+    async def run():
+        flight = SingleFlight()
+        upstream = CountingCall(error=asyncio.CancelledError())
+        tasks = await start(flight, "prompt", upstream)
+        upstream.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert upstream.calls == 1
+        assert all(isinstance(result, asyncio.CancelledError) for result in results)
+
+    asyncio.run(run())
+
+def test_cancelling_one_waiter_leaves_the_others_served():
+    async def run():
+        flight = SingleFlight()
+        upstream = CountingCall("ok")
+        tasks = await start(flight, "prompt", upstream)
+        tasks[0].cancel()
+        await asyncio.sleep(0)
+        upstream.release.set()
+        results = await asyncio.gather(*tasks, return_exceptions=True)
+
+        assert isinstance(results[0], asyncio.CancelledError)
+        assert results[1:] == ["ok"] * (N - 1)
+        assert upstream.calls == 1
+
+    asyncio.run(run())
+
+def test_shared_call_is_cancelled_once_every_waiter_is_gone():
+    async def run():
+        flight = SingleFlight()
+        upstream = CountingCall("ok")
+        tasks = await start(flight, "prompt", upstream, count=3)
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        await asyncio.sleep(0)
+
+        assert flight.stats()["in_flight"] == 0
+        # The abandoned call is gone, so a new caller starts fresh
+        upstream.release.set()
+        assert await flight.do("prompt", upstream) == "ok"
+        assert upstream.calls == 2
+
+    asyncio.run(run())
+
+@pytest.mark.parametrize("count", [2, 10, 200])
+def test_burst_sizes(count):
+    async def run():
+        flight = SingleFlight()
+        upstream = CountingCall("ok")
+        tasks = await start(flight, "prompt", upstream, count=count)
+        upstream.release.set()
+        assert await asyncio.gather(*tasks) == ["ok"] * count
+        assert upstream.calls == 1
+
+    asyncio.run(run())
@@ -0,0 +1,50 @@
+import asyncio
+import json
+
+import pytest
+
+from app.core.config import settings
+from app.core.metrics import metrics
+from app.models.llm_output import DailyCardsOutput, PersonaOutput
+from app.utils.gemini_client import GeminiClient
+from app.utils.response_schema import response_schema
+
+PROMPTS = {
+    PersonaOutput: "Detect the persona type of this survey respondent.",
+    DailyCardsOutput: "Write the daily cards of this roadmap. Days: 1 to 3",
+}
+
+@pytest.fixture
+def client(monkeypatch):
+    """A structured-output client on a fake backend that garbles every schema-less response"""
+    for name, value in {
+        "GEMINI_BACKEND": "fake",
+        "GEMINI_STRUCTURED_OUTPUT": True,
+        "FAKE_GEMINI_LATENCY_MS": 0.0,
+        "FAKE_GEMINI_JITTER_MS": 0.0,
+        "FAKE_GEMINI_ERROR_RATE": 0.0,
+        "FAKE_GEMINI_THROTTLE_RATE": 0.0,
+        "FAKE_GEMINI_MALFORMED_RATE": 1.0,
+        "FAKE_GEMINI_RECORDINGS": "",
+        "GEMINI_REQUESTS_PER_MINUTE": 0,
+        "GEMINI_TOKENS_PER_MINUTE": 0,
+        "SHARED_STATE_PATH": "",
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+    client = GeminiClient()
+    yield client
+    client.close()
+
+@pytest.mark.parametrize("output_type", [PersonaOutput, DailyCardsOutput])
+def test_response_schema_uses_only_the_gemini_subset(output_type):
+    text = json.dumps(response_schema(output_type))
+    for keyword in ("$ref", "$defs", "anyOf"):
+        assert keyword not in text
+
+@pytest.mark.parametrize("output_type", [PersonaOutput, DailyCardsOutput])
+def test_structured_responses_parse_without_repair(client, monkeypatch, output_type):
+    outcomes = []
+    monkeypatch.setattr(metrics, "record_parse", outcomes.append)
+    result = asyncio.run(client.generate_content(PROMPTS[output_type], output_type))
+    assert outcomes == ["clean"]
+    output_type.model_validate(result)
@@ -0,0 +1,37 @@
+import asyncio
+
+from app.services.survey_pipeline import SurveyPipelineService
+
+PREDICTED = {"primary": {"type": "analytical"}, "secondary": None, "analysis": ""}
+DETECTED = {"primary": {"type": "creative"}, "secondary": None, "analysis": "detected"}
+
+class Detector:
+    def predict_persona(self, responses):
+        return PREDICTED
+
+    async def detect_persona(self, responses):
+        await asyncio.sleep(0.01)
+        return DETECTED
+
+class Matcher:
+    """Blocks matches for the predicted persona until cancelled, recording that they finished unwinding"""
+    def __init__(self):
+        self.unwound = False
+
+    async def match_careers(self, persona):
+        if persona is DETECTED:
+            return ["careers for detected"]
+        try:
+            await asyncio.Event().wait()
+        finally:
+            await asyncio.sleep(0)
+            self.unwound = True
+
+def test_mismatched_speculation_is_cancelled_and_awaited():
+    matcher = Matcher()
+    pipeline = SurveyPipelineService(Detector(), matcher)
+
+    persona, careers = asyncio.run(pipeline._run_pipelined([]))
+    assert persona is DETECTED
+    assert careers == ["careers for detected"]
+    assert matcher.unwound
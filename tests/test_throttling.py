@@ -0,0 +1,59 @@
+import asyncio
+import os
+
+import pytest
+from fastapi.testclient import TestClient
+from google.api_core import exceptions as google_exceptions
+
+from app.core.config import settings
+from app.utils.gemini_client import GeminiClient
+from app.utils.model_backends import FakeBackend
+from app.utils.resilience import RateLimitedError
+
+@pytest.fixture
+def throttled(monkeypatch, tmp_path):
+    """Run the app on a fake backend that answers every call with a quota error"""
+    for name, value in {
+        "GEMINI_BACKEND": "fake",
+        "FAKE_GEMINI_LATENCY_MS": 0.0,
+        "FAKE_GEMINI_JITTER_MS": 0.0,
+        "FAKE_GEMINI_THROTTLE_RATE": 1.0,
+        "GEMINI_MAX_RETRIES": 2,
+        "GEMINI_RETRY_BASE_DELAY": 0.0,
+        "GEMINI_RETRY_MAX_DELAY": 0.0,
+        "GEMINI_REQUESTS_PER_MINUTE": 0,
+        "GEMINI_TOKENS_PER_MINUTE": 0,
+        "SHARED_STATE_PATH": "",
+        "DATABASE_URL": "sqlite:///" + os.path.join(tmp_path, "app.db"),
+    }.items():
+        monkeypatch.setattr(settings, name, value)
+
+def test_throttle_rate_raises_quota_errors():
+    backend = FakeBackend(latency=0, jitter=0, throttle_rate=1.0)
+    with pytest.raises(google_exceptions.ResourceExhausted):
+        backend.generate_content("Create exactly 1 months")
+
+def test_quota_errors_back_off_the_limiter_and_raise_rate_limited(throttled):
+    client = GeminiClient()
+    try:
+        with pytest.raises(RateLimitedError):
+            asyncio.run(client.generate_content("Create exactly 1 months"))
+        # Every attempt, the first and both retries, halved the rate
+        assert client.limiter.rate_factor == 0.125
+        assert client.retry_policy.exhausted == 1
+        # Throttling is not an outage, so the breaker stays closed
+        assert client.breaker.state == client.breaker.CLOSED
+    finally:
+        client.close()
+
+def test_quota_errors_reach_clients_as_503_with_retry_after(throttled):
+    from main import app
+
+    with TestClient(app) as client:
+        response = client.post(
+            "/api/roadmap/generate",
+            params={"persona_type": "analytical-throttled", "duration_months": 1},
+        )
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert "quota" in response.json()["detail"]